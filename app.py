@@ -1,17 +1,74 @@
 """COGS Manufacturing Calculator - Streamlit Application."""
 
+import csv
 import json
 import os
-from copy import deepcopy
+import time
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import streamlit as st
 import streamlit.components.v1 as components
 import streamlit_authenticator as stauth
 import yaml
 
+from cogs.assemblies import evaluate_assemblies, pack_assemblies, resolve_subassemblies
+from cogs.attribution import attribute_change
+from cogs.budget import budget_curve, optimize_budget
+from cogs.capacity import DEFAULT_SHIFT, capacity
+from cogs.cache import RESULT_CACHE, cached_cogs, model_key
+from cogs.doe import (
+    FACTOR_LETTERS,
+    fractional_factorial,
+    full_factorial,
+    interaction_means,
+    interaction_strengths,
+    main_effects,
+    run_doe,
+)
+from cogs.engine import component_prices, pack_routing, param_columns, param_index, param_vector
+from cogs.equipment import (
+    DEPRECIATION_METHODS,
+    apply_equipment,
+    equipment_configurations,
+    evaluate_equipment,
+    pack_equipment,
+)
+from cogs.goalseek import parameter_groups, required_values, solve_groups, target_from_margin
+from cogs.incremental import IncrementalCascade
+from cogs.model import (
+    RATIO_PARAMS,
+    SCENARIO_PARAMS,
+    STEP_PARAMS,
+    component_name,
+    new_step,
+    normalize_product,
+    product_to_json,
+    step_name,
+)
+from cogs.network import (
+    evaluate_network,
+    expected_visits,
+    is_linear,
+    network_summary,
+    routing_graph,
+)
+from cogs.montecarlo import collect_distributions, run_monte_carlo, summarize_samples
+from cogs.portfolio import PortfolioCosting, pack_portfolio
+from cogs.scenarios import (
+    apply_modifications,
+    compile_scenarios,
+    iter_scenario_results,
+    read_scenario_rows,
+)
+from cogs.sensitivity import run_sensitivity, run_sobol
+from cogs.sourcing import annual_quantities, pack_quotes, select_suppliers
+from cogs.staffing import allocate_operators, line_throughput, staffing_options
+from cogs.timephased import PERIODS_PER_YEAR, time_phased_cogs
+from cogs.volume import breakeven_volume, cogs_at_volumes, variable_cost, volume_sweep
+
 # ─── Page config ────────────────────────────────────────────────────────────────
 st.set_page_config(
     page_title="COGS Calculator",
@@ -77,7 +134,8 @@ TRANSLATIONS = {
         "study_header": "Études",
         "annex_header": "Annexes",
         "gen_pages": ["Accueil", "Simulateur COGS"],
-        "study_pages": ["Analyse de sensibilité", "Scénarios what-if"],
+        "study_pages": ["Analyse de sensibilité", "Scénarios what-if", "Monte Carlo", "Volume et point mort", "Recherche d'objectif", "Budget d'amélioration", "Affectation des opérateurs", "COGS dans le temps", "Capacité et goulot", "Portefeuille multi-produits",
+         "Sélection des fournisseurs", "Équipements et amortissements", "Attribution des écarts"],
         "annex_pages": ["Méthodologie"],
         "lang_fr": "Français",
         "lang_en": "English",
@@ -132,6 +190,31 @@ TRANSLATIONS = {
         "col_yield": "Yield",
         "col_yielded_cost": "Coût cumulé (yielded)",
         "col_scrap_cost": "Coût rebut",
+        # Routing graph
+        "routing_title": "Enchaînement",
+        "routing_next": "Étape suivante",
+        "routing_exit": "Sortie (produit fini)",
+        "routing_rework": "Retouche (fraction des rebuts)",
+        "routing_rework_to": "Retouche vers",
+        "routing_graph_title": "Gamme non linéaire (chaîne de Markov absorbante)",
+        "routing_graph_note": "La gamme comporte des branches, fusions ou retouches : COGS, RTY, unités à lancer et coût rebut ci-dessus sont calculés sur le graphe. Le graphique en cascade et le tableau par étape montrent la vue linéaire.",
+        "routing_error": "Gamme invalide",
+        "routing_visits": "Passages / bonne unité",
+        "routing_starts": "Lancements / bonne unité",
+        "routing_cost_visit": "Coût par passage",
+        "routing_contribution": "Contribution au COGS",
+        "routing_hours": "Heures / 1000 bonnes unités",
+        "routing_bottleneck": "Goulot",
+        "routing_throughput": "Débit de ligne (bonnes unités/h)",
+        # Sub-assemblies
+        "sub_title": "Sous-ensembles",
+        "sub_id": "Sous-ensemble",
+        "sub_name": "Nom",
+        "sub_demand": "Demande (unités/an)",
+        "sub_rty": "RTY (%)",
+        "sub_ref_help": "Prix = COGS/unité du sous-ensemble « {ref} », recalculé à chaque modification.",
+        "tier_help": "Prix sous le premier palier. Paliers (quantité annuelle achetée → prix) : {tiers}",
+        "sub_error": "Nomenclature multi-niveaux invalide",
         # Price / Margin
         "price_margin_title": "Calculateur prix / marge",
         "calc_mode": "Mode de calcul",
@@ -149,9 +232,17 @@ TRANSLATIONS = {
         "param_name": "Paramètre",
         "impact": "Impact sur COGS/unité",
         "variation": "Variation",
+        "elasticity": "Élasticité",
+        "sobol_enable": "Sensibilité globale (indices de Sobol)",
+        "sobol_samples": "Budget d'échantillons (N)",
+        "sobol_title": "Indices de Sobol - Top 15 paramètres",
+        "sobol_desc": "Part de la variance du COGS/unité expliquée par chaque paramètre, tous variant simultanément de ±10%. L'écart entre indice total et indice de premier ordre mesure les interactions (ex. yield × coût amont).",
+        "sobol_first": "Premier ordre (S1)",
+        "sobol_total": "Ordre total (ST)",
+        "sobol_index": "Indice de Sobol",
         # Scenarios
         "scenarios_title": "Scénarios what-if",
-        "scenarios_desc": "Comparez jusqu'à 3 scénarios avec la configuration de base.",
+        "scenarios_desc": "Comparez jusqu'à 3 scénarios avec la configuration de base, ou explorez des milliers de combinaisons avec un plan d'expériences.",
         "nb_scenarios": "Nombre de scénarios",
         "scenario": "Scénario",
         "base": "Base",
@@ -164,11 +255,313 @@ TRANSLATIONS = {
         "scenario_detail": "Détail du scénario",
         "scenario_delta": "Delta vs base",
         "all_steps": "Toutes les étapes",
+        # Design of experiments
+        "sc_mode": "Mode",
+        "sc_mode_manual": "Scénarios manuels",
+        "sc_mode_doe": "Plan d'expériences (DOE)",
+        "doe_desc": "Choisissez des facteurs (paramètre, étape) et leurs niveaux : toutes les combinaisons d'un plan factoriel complet ou fractionnaire sont évaluées en un seul calcul vectorisé.",
+        "doe_factors": "Facteurs",
+        "doe_levels": "Niveaux",
+        "doe_levels_help": "Valeurs séparées par des virgules, ex. 0.90, 0.95, 0.99",
+        "doe_invalid": "Facteur invalide",
+        "doe_design": "Plan",
+        "doe_full": "Factoriel complet",
+        "doe_fractional": "Factoriel fractionnaire 2^(k-p)",
+        "doe_fraction": "Fraction p",
+        "doe_two_levels": "Le plan fractionnaire requiert exactement 2 niveaux par facteur.",
+        "doe_generators": "Générateurs",
+        "doe_runs": "Essais",
+        "doe_too_many": "Plan trop grand ({runs:,} essais, max {max_runs:,}). Réduisez les niveaux ou utilisez un plan fractionnaire.",
+        "doe_results": "Résultats",
+        "doe_cogs_range": "Filtre COGS / unité",
+        "doe_better_only": "Seulement les essais meilleurs que la base",
+        "doe_shown": "{shown:,} essais affichés sur {total:,} (triés par COGS / unité)",
+        "doe_download": "Télécharger les résultats (CSV)",
+        "doe_main_effects": "Effets principaux",
+        "doe_interaction": "Interaction",
+        "doe_factor_a": "Facteur (axe X)",
+        "doe_factor_b": "Facteur (courbes)",
+        "doe_mean": "Moyenne",
+        # Goal seek
+        "gs_title": "Recherche d'objectif",
+        "gs_desc": "Valeur que doit atteindre chaque paramètre (seul, ou par variation proportionnelle d'un groupe) pour ramener le COGS/unité à une cible.",
+        "gs_mode": "Objectif",
+        "gs_mode_cogs": "COGS / unité cible",
+        "gs_mode_margin": "Marge cible",
+        "gs_target": "COGS / unité cible",
+        "gs_base": "COGS / unité actuel",
+        "gs_reachable_only": "Seulement les objectifs atteignables",
+        "gs_include_prices": "Inclure les prix composants",
+        "gs_single_title": "Valeur requise par paramètre",
+        "gs_single_desc": "Un seul paramètre change, tous les autres gardent leur valeur. Trié par variation croissante (leviers les plus accessibles en premier).",
+        "gs_group_title": "Variation proportionnelle par groupe",
+        "gs_group_desc": "Tous les paramètres du groupe (toutes étapes) sont multipliés par le même facteur.",
+        "gs_current": "Actuel",
+        "gs_required": "Requis",
+        "gs_change": "Variation (%)",
+        "gs_unreachable": "Non atteignable",
+        "gs_group": "Groupe",
+        "gs_scale": "Facteur",
+        "gs_all_steps": "{param} (toutes étapes)",
+        "gs_all_prices": "Prix composants (tous)",
+        # Improvement budget
+        "ib_title": "Budget d'amélioration",
+        "ib_desc": "Répartit un budget d'amélioration entre leviers (ex. +1 pt de rendement à l'étape i pour 10 000 €) pour minimiser le COGS/unité, à partir des gradients du modèle en cascade.",
+        "ib_levers": "Leviers",
+        "ib_unit": "Variation par unité",
+        "ib_cost": "Coût par unité",
+        "ib_limit": "Limite",
+        "ib_limit_help": "Valeur à ne pas dépasser (vide : 1 pour les ratios, 0 à la baisse, sinon illimité)",
+        "ib_budget": "Budget",
+        "ib_invalid": "Levier invalide",
+        "ib_base": "COGS / unité actuel",
+        "ib_optimized": "COGS / unité optimisé",
+        "ib_savings": "Économies annuelles",
+        "ib_payback": "Retour sur investissement",
+        "ib_years": "{years:.1f} ans",
+        "ib_plan": "Plan optimal",
+        "ib_lever": "Levier",
+        "ib_units": "Unités achetées",
+        "ib_spent": "Dépensé",
+        "ib_new_value": "Nouvelle valeur",
+        "ib_curve_title": "COGS / unité optimal en fonction du budget",
+        "ib_marginal_title": "Rendement marginal : économies annuelles par euro investi",
+        "ib_marginal": "Économies annuelles / €",
+        # Change attribution
+        "at_title": "Attribution des écarts",
+        "at_desc": "Comparez deux versions d'un produit (exports JSON) : l'écart de COGS/unité est réparti entre chaque paramètre modifié par valeurs de Shapley, qui partagent équitablement les interactions de la cascade (un rendement qui amplifie un prix en amont, des frais fixes sur un volume modifié). Les contributions s'additionnent exactement à l'écart total. Calcul exact jusqu'au seuil choisi de modifications, estimation par ordres d'arrivée tirés au hasard au-delà ; toutes les coalitions sont chiffrées par lots et mémorisées.",
+        "at_upload_before": "Version de départ (JSON)",
+        "at_upload_after": "Version d'arrivée (JSON)",
+        "at_upload_after_help": "Vide : le modèle en cours du simulateur.",
+        "at_empty": "Chargez la version de départ et la version d'arrivée (ou un modèle dans le simulateur).",
+        "at_incompatible": "Versions non comparables paramètre par paramètre",
+        "at_no_change": "Aucun paramètre ne diffère entre les deux versions.",
+        "at_exact_max": "Calcul exact jusqu'à (modifications)",
+        "at_exact_max_help": "Au-delà, les valeurs de Shapley sont estimées par échantillonnage (2^n coalitions en exact).",
+        "at_orders": "Ordres d'arrivée tirés",
+        "at_orders_help": "Nombre d'ordres aléatoires (par paires inversées) de l'estimation échantillonnée.",
+        "at_before": "COGS/unité de départ",
+        "at_after": "COGS/unité d'arrivée",
+        "at_changes": "Paramètres modifiés",
+        "at_method_exact": "Valeurs de Shapley exactes : {n} coalitions chiffrées en {ms:.0f} ms",
+        "at_method_sampled": "Valeurs de Shapley estimées sur {orders} ordres d'arrivée : {n} coalitions distinctes chiffrées en {ms:.0f} ms",
+        "at_chart_title": "Du COGS/unité de départ à celui d'arrivée",
+        "at_others": "{n} autres",
+        "at_param": "Paramètre",
+        "at_value_before": "Avant",
+        "at_value_after": "Après",
+        "at_contribution": "Contribution",
+        "at_std_err": "Erreur type",
+        "at_alone": "Effet seul",
+        "at_interaction": "Part des interactions",
+        "at_share": "% de l'écart",
+        # Equipment
+        "eq_title": "Équipements et amortissements",
+        "eq_desc": "Chaque étape peut recevoir des équipements candidats (investissement, durée de vie, méthode d'amortissement, maintenance, UPH et disponibilité obtenues) dont découlent son FOH et ses paramètres de procédé. Toutes les combinaisons (ou chaque option seule au-delà de 200 000) sont chiffrées en un seul calcul par lots : COGS/unité, retour sur investissement et VAN face à la configuration actuelle. Pour comparer au maintien d'une machine existante, ajoutez-la avec un investissement nul.",
+        "eq_options": "Équipements candidats",
+        "eq_step": "Étape",
+        "eq_name": "Équipement",
+        "eq_capex": "Investissement",
+        "eq_life": "Durée de vie (ans)",
+        "eq_method": "Amortissement",
+        "eq_straight_line": "Linéaire",
+        "eq_declining_balance": "Dégressif",
+        "eq_salvage": "Valeur résiduelle",
+        "eq_maintenance": "Maintenance (% invest./an)",
+        "eq_uph": "UPH",
+        "eq_availability": "Disponibilité",
+        "eq_blank_help": "Vide : la valeur de l'étape est conservée.",
+        "eq_current": "Actuel",
+        "eq_current_help": "Option retenue aujourd'hui (la première cochée de l'étape, sinon sa première option) : c'est la référence du retour sur investissement et de la VAN.",
+        "eq_other_foh": "FOH hors équipement / an",
+        "eq_other_foh_help": "Frais fixes de l'étape indépendants de l'équipement (surface, encadrement...).",
+        "eq_rate": "Taux d'actualisation (%)",
+        "eq_horizon": "Horizon (ans)",
+        "eq_no_options": "Aucun équipement : ajoutez des lignes au tableau des équipements.",
+        "eq_invalid": "Équipement invalide",
+        "eq_alternatives": "Alternatives chiffrées",
+        "eq_solver": "{n} alternatives chiffrées en {ms:.0f} ms",
+        "eq_best_npv": "Meilleure VAN",
+        "eq_configuration": "Configuration",
+        "eq_current_config": "Configuration actuelle",
+        "eq_investment": "Investissement",
+        "eq_saving": "Économie / an",
+        "eq_payback": "Retour (ans)",
+        "eq_npv": "VAN",
+        "eq_never": "jamais",
+        "eq_chart_title": "VAN des alternatives selon l'investissement",
+        "eq_pick": "Configuration à appliquer",
+        "eq_apply": "Appliquer au produit",
+        "eq_applied": "Équipements, FOH et paramètres de procédé enregistrés dans le produit.",
+        # Supplier selection
+        "src_title": "Sélection des fournisseurs",
+        "src_desc": "Choix d'un devis par composant (MOQ, paliers de prix, frais fixes par pièce et par fournisseur) minimisant le coût matière annuel au volume prévu, quantités majorées des rebuts de la cascade. Résolution exacte par séparation et évaluation sur les fournisseurs retenus.",
+        "src_quotes": "Devis",
+        "src_component": "Composant",
+        "src_supplier": "Fournisseur",
+        "src_moq": "MOQ",
+        "src_tiers": "Paliers (qté:prix, ...)",
+        "src_tiers_help": "Prix unitaire à partir de chaque quantité annuelle, par ex. 10000:0.95, 50000:0.88. En dessous du premier palier, le prix du devis s'applique.",
+        "src_fixed": "Frais fixes / an",
+        "src_supplier_fixed": "Frais fixes fournisseur / an",
+        "src_suppliers": "Fournisseurs",
+        "src_max_suppliers": "Nombre max de fournisseurs (0 = sans limite)",
+        "src_invalid": "Devis invalide",
+        "src_no_quotes": "Aucun devis : ajoutez des lignes au tableau des devis.",
+        "src_infeasible": "Aucun choix ne couvre tous les composants avec ce nombre de fournisseurs.",
+        "src_current_spend": "Dépense matière actuelle / an",
+        "src_optimized_spend": "Dépense optimisée / an",
+        "src_used": "Fournisseurs retenus",
+        "src_solver": "Nœuds explorés : {nodes} — {ms:.0f} ms",
+        "src_annual_qty": "Quantité annuelle",
+        "src_current_price": "Prix actuel",
+        "src_unit_price": "Prix devis",
+        "src_effective_price": "Prix effectif",
+        "src_effective_help": "Coût annuel du devis (MOQ et frais fixes compris) plus la part des frais fixes du fournisseur, par unité achetée.",
+        "src_apply": "Appliquer au produit",
+        "src_applied": "Devis, fournisseurs et prix effectifs enregistrés dans le produit.",
+        # Portfolio
+        "pf_title": "Portefeuille multi-produits",
+        "pf_desc": "Chiffrage simultané de plusieurs produits partageant des lignes : le FOH de chaque ressource partagée est réparti entre les produits selon l'inducteur choisi, au lieu d'être imputé en totalité au volume d'un seul produit. Un changement de volume ne recalcule que les produits concernés.",
+        "pf_upload": "Produits du portefeuille (JSON)",
+        "pf_include_current": "Inclure le produit courant",
+        "pf_driver": "Inducteur de répartition du FOH",
+        "pf_driver_hours": "Heures machine",
+        "pf_driver_volume": "Volume",
+        "pf_empty": "Chargez au moins un produit.",
+        "pf_current": "Produit courant",
+        "pf_product": "Produit",
+        "pf_resources": "Ressources partagées",
+        "pf_no_shared": "Aucune ressource partagée : indiquez le même identifiant de ressource sur les étapes concernées (page Capacité ou champ `resource` du JSON).",
+        "pf_foh": "FOH annuel",
+        "pf_volumes": "Volumes",
+        "pf_standalone": "COGS seul",
+        "pf_cogs": "COGS portefeuille",
+        "pf_delta": "Écart",
+        "pf_total": "COGS total portefeuille",
+        "pf_avg_delta": "Écart moyen pondéré",
+        "pf_recosted": "Produits recalculés",
+        "pf_chart_title": "COGS / unité : seul vs portefeuille",
+        # Capacity
+        "cap_title": "Capacité et goulot",
+        "cap_desc": "Charge de chaque étape à partir du flux réel (unités entrantes après rendements) et de l'UPH effective : heures, postes nécessaires pour l'horaire choisi et taux d'utilisation. Les étapes de plusieurs produits partageant une ressource cumulent leur charge.",
+        "cap_shifts": "Équipes par jour",
+        "cap_hours": "Heures par équipe",
+        "cap_days": "Jours par semaine",
+        "cap_weeks": "Semaines par an",
+        "cap_available": "Heures disponibles / poste / an",
+        "cap_resource": "Ressource",
+        "cap_resource_help": "Identifiant de la ligne ou de la machine partagée (vide : ressource propre à l'étape).",
+        "cap_stations": "Postes installés",
+        "cap_entering": "Unités entrantes / an",
+        "cap_hours_needed": "Heures / an",
+        "cap_load": "Charge (postes)",
+        "cap_stations_needed": "Postes nécessaires",
+        "cap_utilization": "Utilisation (%)",
+        "cap_bottleneck": "Goulot",
+        "cap_bottleneck_step": "Étape goulot",
+        "cap_bottleneck_util": "Utilisation du goulot",
+        "cap_overloaded": "Ressources en surcharge",
+        "cap_others": "Autres produits sur les mêmes ressources (JSON)",
+        "cap_others_help": "Les étapes portant le même identifiant de ressource que celles du produit courant partagent sa capacité.",
+        "cap_invalid_file": "Fichier produit illisible",
+        "cap_resources": "Charge par ressource",
+        "cap_n_steps": "Étapes",
+        "cap_chart_title": "Utilisation par étape",
+        "cap_apply": "Enregistrer ressources et postes",
+        "cap_applied": "Ressources et postes enregistrés dans le produit.",
+        # Time-phased COGS
+        "tp_title": "COGS dans le temps",
+        "tp_desc": "Programme pluriannuel par mois ou trimestre : l'UPH et le rendement progressent avec le volume cumulé (loi de Wright), le FOH suit un échéancier annuel. Toutes les périodes sont calculées en une seule passe.",
+        "tp_years": "Durée (années)",
+        "tp_granularity": "Période",
+        "tp_month": "Mois",
+        "tp_quarter": "Trimestre",
+        "tp_reference": "Volume cumulé de référence",
+        "tp_reference_help": "Volume cumulé auquel les valeurs actuelles des étapes (UPH, rendement) sont atteintes.",
+        "tp_year": "Année",
+        "tp_year_help": "Volume annuel (réparti également sur les périodes) et FOH annuel de chaque étape.",
+        "tp_learning_uph": "Apprentissage UPH (%)",
+        "tp_learning_yield": "Apprentissage rebut (%)",
+        "tp_learning_help": "Taux d'apprentissage : chaque doublement du volume cumulé multiplie le temps par unité (ou le taux de rebut) par ce pourcentage. 100 % = pas d'apprentissage.",
+        "tp_uph_max": "UPH max (0 = aucun)",
+        "tp_life_average": "COGS moyen sur la vie",
+        "tp_total_cost": "Coût total du programme",
+        "tp_first": "COGS première période",
+        "tp_last": "COGS dernière période",
+        "tp_period": "Période",
+        "tp_cost": "Coût de la période",
+        "tp_cumulative_cost": "Coût cumulé",
+        "tp_average_to_date": "COGS moyen cumulé",
+        "tp_chart_title": "COGS / unité par période",
+        "tp_save": "Enregistrer dans le produit",
+        "tp_saved": "Courbes d'apprentissage et échéancier FOH enregistrés dans le produit.",
+        # Operator allocation
+        "op_title": "Affectation des opérateurs",
+        "op_desc": "Répartit un effectif total entre les étapes en tenant compte des courbes effectif → UPH des postes manuels (programmation dynamique, solution exacte).",
+        "op_curve": "Courbe opérateurs : UPH",
+        "op_curve_help": "Points « opérateurs:UPH » séparés par des virgules, ex. 1:32, 2:60, 3:84. Vide : effectif fixe.",
+        "op_headcount": "Effectif total",
+        "op_objective": "Objectif",
+        "op_min_cogs": "COGS / unité minimal",
+        "op_max_throughput": "Débit de ligne maximal",
+        "op_invalid": "Courbe invalide",
+        "op_infeasible": "Aucune affectation possible avec cet effectif (minimum requis : {n}).",
+        "op_throughput": "Débit de ligne (bonnes unités/h)",
+        "op_used": "Opérateurs affectés",
+        "op_current_ops": "Opérateurs actuels",
+        "op_new_ops": "Opérateurs optimisés",
+        "op_current_uph": "UPH actuel",
+        "op_new_uph": "UPH optimisé",
+        "op_chart_title": "Opérateurs par étape",
+        "op_apply": "Appliquer au simulateur",
+        "op_applied": "Affectation appliquée au simulateur.",
+        # Scenario file import
+        "sc_mode_file": "Import de fichier",
+        "sf_desc": "Importez un fichier CSV ou NDJSON de scénarios : une ligne par modification, colonnes `scenario`, `param`, `step`, `new_value`. `step` est le numéro (1, 2, …) ou le nom de l'étape ; il est ignoré pour `volume`.",
+        "sf_upload": "Fichier de scénarios",
+        "sf_template": "Télécharger un modèle (CSV)",
+        "sf_errors": "{n} ligne(s) ignorée(s)",
+        "sf_line": "Ligne",
+        "sf_n_mods": "Modifications",
+        "sf_evaluated": "{n:,} scénarios évalués",
+        "sf_download": "Télécharger les résultats (CSV)",
+        # Monte Carlo
+        "mc_title": "Simulation Monte Carlo",
+        "mc_desc": "Propagation des incertitudes (distributions définies dans le JSON produit) vers le COGS/unité et le RTY.",
+        "mc_no_dist": "Aucune distribution définie. Ajoutez une clé `distributions` aux étapes ou composants du JSON produit.",
+        "mc_uncertain_params": "Paramètres incertains",
+        "mc_distribution": "Distribution",
+        "mc_samples": "Nombre de tirages",
+        "mc_seed": "Graine aléatoire",
+        "mc_target": "Coût cible / unité",
+        "mc_mean": "Moyenne",
+        "mc_prob_exceed": "P(COGS > cible)",
+        "mc_hist_cogs": "Distribution du COGS / unité",
+        "mc_hist_rty": "Distribution du RTY",
+        "mc_frequency": "Fréquence",
+        # Volume sweep
+        "vs_title": "Volume et point mort",
+        "vs_desc": "COGS/unité en fonction du volume annuel (le FOH est réparti sur le volume). Superposez un prix de vente pour lire le volume de point mort et le volume nécessaire à une marge cible. Les composants à prix par paliers (`tiers`) changent de prix avec la quantité achetée.",
+        "vs_min_volume": "Volume min",
+        "vs_max_volume": "Volume max",
+        "vs_price": "Prix de vente / unité",
+        "vs_margin": "Marge cible (%)",
+        "vs_variable": "Coût variable / unité",
+        "vs_fixed": "FOH annuel (après rendements)",
+        "vs_breakeven": "Volume de point mort",
+        "vs_target_volume": "Volume pour la marge cible",
+        "vs_unreachable": "Non atteignable",
+        "vs_chart_title": "COGS / unité en fonction du volume",
+        "vs_current": "Volume actuel",
+        "vs_price_line": "Prix de vente",
+        "vs_margin_line": "Coût max. pour la marge cible",
         # Misc
         "no_data": "Aucune donnée chargée. Chargez l'exemple depuis la barre latérale.",
         "data_loaded": "Données chargées avec succès !",
         "export_json": "Exporter (JSON)",
         "step_name": "Nom de l'étape",
+        "cache_stats": "Cache de calcul : {hits} hits / {misses} miss ({size}/{maxsize} modèles)",
     },
     "en": {
         # Sidebar / Nav
@@ -180,7 +573,8 @@ TRANSLATIONS = {
         "study_header": "Studies",
         "annex_header": "Annexes",
         "gen_pages": ["Home", "COGS Simulator"],
-        "study_pages": ["Sensitivity analysis", "What-if scenarios"],
+        "study_pages": ["Sensitivity analysis", "What-if scenarios", "Monte Carlo", "Volume & break-even", "Goal seek", "Improvement budget", "Operator allocation", "Time-phased COGS", "Capacity and bottleneck", "Multi-product portfolio",
+         "Supplier selection", "Equipment and depreciation", "Change attribution"],
         "annex_pages": ["Methodology"],
         "lang_fr": "Francais",
         "lang_en": "English",
@@ -235,6 +629,31 @@ TRANSLATIONS = {
         "col_yield": "Yield",
         "col_yielded_cost": "Yielded cost (cumul.)",
         "col_scrap_cost": "Scrap cost",
+        # Routing graph
+        "routing_title": "Routing",
+        "routing_next": "Next step",
+        "routing_exit": "Exit (finished good)",
+        "routing_rework": "Rework (fraction of failures)",
+        "routing_rework_to": "Rework to",
+        "routing_graph_title": "Non-linear routing (absorbing Markov chain)",
+        "routing_graph_note": "The routing has branches, merges or rework: COGS, RTY, units to start and scrap cost above are solved on the graph. The waterfall chart and step table show the linear view.",
+        "routing_error": "Invalid routing",
+        "routing_visits": "Visits / good unit",
+        "routing_starts": "Starts / good unit",
+        "routing_cost_visit": "Cost per visit",
+        "routing_contribution": "COGS contribution",
+        "routing_hours": "Hours / 1000 good units",
+        "routing_bottleneck": "Bottleneck",
+        "routing_throughput": "Line throughput (good units/h)",
+        # Sub-assemblies
+        "sub_title": "Sub-assemblies",
+        "sub_id": "Sub-assembly",
+        "sub_name": "Name",
+        "sub_demand": "Demand (units/yr)",
+        "sub_rty": "RTY (%)",
+        "sub_ref_help": "Price = COGS/unit of sub-assembly \"{ref}\", recomputed on every change.",
+        "tier_help": "Price below the first break. Breaks (annual quantity bought → price): {tiers}",
+        "sub_error": "Invalid multi-level BOM",
         # Price / Margin
         "price_margin_title": "Price / margin calculator",
         "calc_mode": "Calculation mode",
@@ -252,9 +671,17 @@ TRANSLATIONS = {
         "param_name": "Parameter",
         "impact": "Impact on COGS/unit",
         "variation": "Variation",
+        "elasticity": "Elasticity",
+        "sobol_enable": "Global sensitivity (Sobol indices)",
+        "sobol_samples": "Sample budget (N)",
+        "sobol_title": "Sobol indices - Top 15 parameters",
+        "sobol_desc": "Share of COGS/unit variance explained by each parameter, all varying simultaneously by ±10%. The gap between total and first-order index measures interactions (e.g. yield × upstream cost).",
+        "sobol_first": "First order (S1)",
+        "sobol_total": "Total order (ST)",
+        "sobol_index": "Sobol index",
         # Scenarios
         "scenarios_title": "What-if scenarios",
-        "scenarios_desc": "Compare up to 3 scenarios with the baseline configuration.",
+        "scenarios_desc": "Compare up to 3 scenarios with the baseline configuration, or explore thousands of combinations with a design of experiments.",
         "nb_scenarios": "Number of scenarios",
         "scenario": "Scenario",
         "base": "Baseline",
@@ -267,11 +694,313 @@ TRANSLATIONS = {
         "scenario_detail": "Scenario detail",
         "scenario_delta": "Delta vs baseline",
         "all_steps": "All steps",
+        # Design of experiments
+        "sc_mode": "Mode",
+        "sc_mode_manual": "Manual scenarios",
+        "sc_mode_doe": "Design of experiments (DOE)",
+        "doe_desc": "Pick factors (parameter, step) and their levels: every run of a full or fractional factorial design is evaluated in a single vectorized pass.",
+        "doe_factors": "Factors",
+        "doe_levels": "Levels",
+        "doe_levels_help": "Comma-separated values, e.g. 0.90, 0.95, 0.99",
+        "doe_invalid": "Invalid factor",
+        "doe_design": "Design",
+        "doe_full": "Full factorial",
+        "doe_fractional": "Fractional factorial 2^(k-p)",
+        "doe_fraction": "Fraction p",
+        "doe_two_levels": "A fractional design requires exactly 2 levels per factor.",
+        "doe_generators": "Generators",
+        "doe_runs": "Runs",
+        "doe_too_many": "Design too large ({runs:,} runs, max {max_runs:,}). Reduce the levels or use a fractional design.",
+        "doe_results": "Results",
+        "doe_cogs_range": "COGS / unit filter",
+        "doe_better_only": "Only runs better than the baseline",
+        "doe_shown": "{shown:,} runs shown out of {total:,} (sorted by COGS / unit)",
+        "doe_download": "Download results (CSV)",
+        "doe_main_effects": "Main effects",
+        "doe_interaction": "Interaction",
+        "doe_factor_a": "Factor (X axis)",
+        "doe_factor_b": "Factor (lines)",
+        "doe_mean": "Mean",
+        # Goal seek
+        "gs_title": "Goal seek",
+        "gs_desc": "Value each parameter must reach (alone, or as a proportional change of a group) to bring COGS/unit to a target.",
+        "gs_mode": "Objective",
+        "gs_mode_cogs": "Target COGS / unit",
+        "gs_mode_margin": "Target margin",
+        "gs_target": "Target COGS / unit",
+        "gs_base": "Current COGS / unit",
+        "gs_reachable_only": "Reachable targets only",
+        "gs_include_prices": "Include component prices",
+        "gs_single_title": "Required value per parameter",
+        "gs_single_desc": "A single parameter changes, all others keep their value. Sorted by increasing change (most accessible levers first).",
+        "gs_group_title": "Proportional change per group",
+        "gs_group_desc": "All parameters of the group (all steps) are multiplied by the same factor.",
+        "gs_current": "Current",
+        "gs_required": "Required",
+        "gs_change": "Change (%)",
+        "gs_unreachable": "Not reachable",
+        "gs_group": "Group",
+        "gs_scale": "Factor",
+        "gs_all_steps": "{param} (all steps)",
+        "gs_all_prices": "Component prices (all)",
+        # Improvement budget
+        "ib_title": "Improvement budget",
+        "ib_desc": "Allocates an improvement budget across levers (e.g. +1 pt of yield at step i for 10,000 €) to minimize COGS/unit, using the gradients of the cascade model.",
+        "ib_levers": "Levers",
+        "ib_unit": "Change per unit",
+        "ib_cost": "Cost per unit",
+        "ib_limit": "Limit",
+        "ib_limit_help": "Value not to go past (empty: 1 for ratios, 0 when decreasing, otherwise unbounded)",
+        "ib_budget": "Budget",
+        "ib_invalid": "Invalid lever",
+        "ib_base": "Current COGS / unit",
+        "ib_optimized": "Optimized COGS / unit",
+        "ib_savings": "Annual savings",
+        "ib_payback": "Payback",
+        "ib_years": "{years:.1f} years",
+        "ib_plan": "Optimal plan",
+        "ib_lever": "Lever",
+        "ib_units": "Units bought",
+        "ib_spent": "Spent",
+        "ib_new_value": "New value",
+        "ib_curve_title": "Optimal COGS / unit vs budget",
+        "ib_marginal_title": "Marginal return: annual savings per euro invested",
+        "ib_marginal": "Annual savings / €",
+        # Change attribution
+        "at_title": "Change attribution",
+        "at_desc": "Compare two versions of a product (JSON exports): the COGS/unit change is split between every changed parameter with Shapley values, which share the cascade interactions fairly (a yield amplifying an upstream price, fixed costs over a changed volume). The contributions add up exactly to the total change. Exact up to the chosen number of changes, estimated over randomly drawn orders of arrival beyond; every coalition is costed in batches and memoized.",
+        "at_upload_before": "Before version (JSON)",
+        "at_upload_after": "After version (JSON)",
+        "at_upload_after_help": "Empty: the current simulator model.",
+        "at_empty": "Upload the before and after versions (or load a model in the simulator).",
+        "at_incompatible": "The versions cannot be compared parameter by parameter",
+        "at_no_change": "No parameter differs between the two versions.",
+        "at_exact_max": "Exact up to (changes)",
+        "at_exact_max_help": "Beyond, Shapley values are estimated by sampling (2^n coalitions when exact).",
+        "at_orders": "Orders of arrival drawn",
+        "at_orders_help": "Number of random orders (in reversed pairs) of the sampled estimate.",
+        "at_before": "Before COGS/unit",
+        "at_after": "After COGS/unit",
+        "at_changes": "Changed parameters",
+        "at_method_exact": "Exact Shapley values: {n} coalitions costed in {ms:.0f} ms",
+        "at_method_sampled": "Shapley values estimated over {orders} orders of arrival: {n} distinct coalitions costed in {ms:.0f} ms",
+        "at_chart_title": "From the before to the after COGS/unit",
+        "at_others": "{n} others",
+        "at_param": "Parameter",
+        "at_value_before": "Before",
+        "at_value_after": "After",
+        "at_contribution": "Contribution",
+        "at_std_err": "Std. error",
+        "at_alone": "Alone",
+        "at_interaction": "Interaction share",
+        "at_share": "% of change",
+        # Equipment
+        "eq_title": "Equipment and depreciation",
+        "eq_desc": "Each step can take candidate equipment (capex, useful life, depreciation method, maintenance, delivered UPH and availability) from which its FOH and process parameters are derived. Every combination (or each option alone beyond 200,000) is costed in one batched run: COGS/unit, payback and NPV against the current configuration. To compare with keeping an existing machine, add it with zero capex.",
+        "eq_options": "Candidate equipment",
+        "eq_step": "Step",
+        "eq_name": "Equipment",
+        "eq_capex": "Capex",
+        "eq_life": "Useful life (years)",
+        "eq_method": "Depreciation",
+        "eq_straight_line": "Straight line",
+        "eq_declining_balance": "Declining balance",
+        "eq_salvage": "Salvage value",
+        "eq_maintenance": "Maintenance (% capex/year)",
+        "eq_uph": "UPH",
+        "eq_availability": "Availability",
+        "eq_blank_help": "Blank: the step's value is kept.",
+        "eq_current": "Current",
+        "eq_current_help": "Option in use today (the step's first checked row, else its first option): the reference for payback and NPV.",
+        "eq_other_foh": "Non-equipment FOH / year",
+        "eq_other_foh_help": "Fixed costs of the step that do not depend on the equipment (floor space, supervision...).",
+        "eq_rate": "Discount rate (%)",
+        "eq_horizon": "Horizon (years)",
+        "eq_no_options": "No equipment: add rows to the equipment table.",
+        "eq_invalid": "Invalid equipment",
+        "eq_alternatives": "Alternatives costed",
+        "eq_solver": "{n} alternatives costed in {ms:.0f} ms",
+        "eq_best_npv": "Best NPV",
+        "eq_configuration": "Configuration",
+        "eq_current_config": "Current configuration",
+        "eq_investment": "Investment",
+        "eq_saving": "Saving / year",
+        "eq_payback": "Payback (years)",
+        "eq_npv": "NPV",
+        "eq_never": "never",
+        "eq_chart_title": "NPV of the alternatives by investment",
+        "eq_pick": "Configuration to apply",
+        "eq_apply": "Apply to product",
+        "eq_applied": "Equipment, FOH and process parameters saved to the product.",
+        # Supplier selection
+        "src_title": "Supplier selection",
+        "src_desc": "Picks one quote per component (MOQ, price tiers, fixed charges per part and per supplier) minimizing the annual material cost at the planned volume, quantities inflated by the cascade scrap. Solved exactly by branch and bound over the suppliers engaged.",
+        "src_quotes": "Quotes",
+        "src_component": "Component",
+        "src_supplier": "Supplier",
+        "src_moq": "MOQ",
+        "src_tiers": "Tiers (qty:price, ...)",
+        "src_tiers_help": "Unit price from each annual quantity, e.g. 10000:0.95, 50000:0.88. Below the first tier, the quote price applies.",
+        "src_fixed": "Fixed charge / year",
+        "src_supplier_fixed": "Supplier fixed charge / year",
+        "src_suppliers": "Suppliers",
+        "src_max_suppliers": "Max number of suppliers (0 = no limit)",
+        "src_invalid": "Invalid quote",
+        "src_no_quotes": "No quote: add rows to the quotes table.",
+        "src_infeasible": "No choice covers every component with this number of suppliers.",
+        "src_current_spend": "Current material spend / year",
+        "src_optimized_spend": "Optimized spend / year",
+        "src_used": "Suppliers engaged",
+        "src_solver": "Nodes explored: {nodes} — {ms:.0f} ms",
+        "src_annual_qty": "Annual quantity",
+        "src_current_price": "Current price",
+        "src_unit_price": "Quote price",
+        "src_effective_price": "Effective price",
+        "src_effective_help": "Annual cost of the quote (MOQ and fixed charge included) plus its share of the supplier fixed charge, per unit bought.",
+        "src_apply": "Apply to product",
+        "src_applied": "Quotes, suppliers and effective prices saved to the product.",
+        # Portfolio
+        "pf_title": "Multi-product portfolio",
+        "pf_desc": "Costs several products sharing lines together: the FOH of every shared resource is allocated across products by the chosen driver, instead of being charged entirely to one product's volume. A volume change only re-costs the products it affects.",
+        "pf_upload": "Portfolio products (JSON)",
+        "pf_include_current": "Include the current product",
+        "pf_driver": "FOH allocation driver",
+        "pf_driver_hours": "Machine hours",
+        "pf_driver_volume": "Volume",
+        "pf_empty": "Load at least one product.",
+        "pf_current": "Current product",
+        "pf_product": "Product",
+        "pf_resources": "Shared resources",
+        "pf_no_shared": "No shared resource: give the same resource id to the steps concerned (Capacity page or `resource` field of the JSON).",
+        "pf_foh": "Annual FOH",
+        "pf_volumes": "Volumes",
+        "pf_standalone": "Standalone COGS",
+        "pf_cogs": "Portfolio COGS",
+        "pf_delta": "Delta",
+        "pf_total": "Total portfolio COGS",
+        "pf_avg_delta": "Volume-weighted delta",
+        "pf_recosted": "Products re-costed",
+        "pf_chart_title": "COGS / unit: standalone vs portfolio",
+        # Capacity
+        "cap_title": "Capacity and bottleneck",
+        "cap_desc": "Load of every step from the actual flow (units entering after yields) and effective UPH: hours, stations needed for the chosen shift pattern and utilization. Steps of several products sharing a resource add up their load.",
+        "cap_shifts": "Shifts per day",
+        "cap_hours": "Hours per shift",
+        "cap_days": "Days per week",
+        "cap_weeks": "Weeks per year",
+        "cap_available": "Available hours / station / year",
+        "cap_resource": "Resource",
+        "cap_resource_help": "Id of the shared line or machine (empty: resource of its own).",
+        "cap_stations": "Installed stations",
+        "cap_entering": "Units entering / year",
+        "cap_hours_needed": "Hours / year",
+        "cap_load": "Load (stations)",
+        "cap_stations_needed": "Stations needed",
+        "cap_utilization": "Utilization (%)",
+        "cap_bottleneck": "Bottleneck",
+        "cap_bottleneck_step": "Bottleneck step",
+        "cap_bottleneck_util": "Bottleneck utilization",
+        "cap_overloaded": "Overloaded resources",
+        "cap_others": "Other products on the same resources (JSON)",
+        "cap_others_help": "Steps carrying the same resource id as those of the current product share its capacity.",
+        "cap_invalid_file": "Unreadable product file",
+        "cap_resources": "Load per resource",
+        "cap_n_steps": "Steps",
+        "cap_chart_title": "Utilization per step",
+        "cap_apply": "Save resources and stations",
+        "cap_applied": "Resources and stations saved to the product.",
+        # Time-phased COGS
+        "tp_title": "Time-phased COGS",
+        "tp_desc": "Multi-year program by month or quarter: UPH and yield improve with cumulative volume (Wright's law), FOH follows a yearly schedule. All periods are computed in one pass.",
+        "tp_years": "Horizon (years)",
+        "tp_granularity": "Period",
+        "tp_month": "Month",
+        "tp_quarter": "Quarter",
+        "tp_reference": "Reference cumulative volume",
+        "tp_reference_help": "Cumulative volume at which the current step values (UPH, yield) are reached.",
+        "tp_year": "Year",
+        "tp_year_help": "Annual volume (spread evenly over the periods) and annual FOH of each step.",
+        "tp_learning_uph": "UPH learning (%)",
+        "tp_learning_yield": "Defect learning (%)",
+        "tp_learning_help": "Learning rate: each doubling of cumulative volume multiplies the time per unit (or the defect rate) by this percentage. 100% = no learning.",
+        "tp_uph_max": "Max UPH (0 = none)",
+        "tp_life_average": "Program-life average COGS",
+        "tp_total_cost": "Total program cost",
+        "tp_first": "First-period COGS",
+        "tp_last": "Last-period COGS",
+        "tp_period": "Period",
+        "tp_cost": "Period cost",
+        "tp_cumulative_cost": "Cumulative cost",
+        "tp_average_to_date": "Average COGS to date",
+        "tp_chart_title": "COGS / unit per period",
+        "tp_save": "Save to product",
+        "tp_saved": "Learning curves and FOH schedule saved to the product.",
+        # Operator allocation
+        "op_title": "Operator allocation",
+        "op_desc": "Allocates a total headcount across steps, using the staffing → UPH curves of manual stations (dynamic programming, exact solution).",
+        "op_curve": "Staffing curve operators: UPH",
+        "op_curve_help": "Comma-separated \"operators:UPH\" points, e.g. 1:32, 2:60, 3:84. Empty: fixed staffing.",
+        "op_headcount": "Total headcount",
+        "op_objective": "Objective",
+        "op_min_cogs": "Minimum COGS / unit",
+        "op_max_throughput": "Maximum line throughput",
+        "op_invalid": "Invalid curve",
+        "op_infeasible": "No allocation fits this headcount (minimum required: {n}).",
+        "op_throughput": "Line throughput (good units/h)",
+        "op_used": "Operators allocated",
+        "op_current_ops": "Current operators",
+        "op_new_ops": "Optimized operators",
+        "op_current_uph": "Current UPH",
+        "op_new_uph": "Optimized UPH",
+        "op_chart_title": "Operators per step",
+        "op_apply": "Apply to simulator",
+        "op_applied": "Allocation applied to the simulator.",
+        # Scenario file import
+        "sc_mode_file": "File import",
+        "sf_desc": "Upload a CSV or NDJSON scenario file: one row per modification, columns `scenario`, `param`, `step`, `new_value`. `step` is the step number (1, 2, …) or name; it is ignored for `volume`.",
+        "sf_upload": "Scenario file",
+        "sf_template": "Download a template (CSV)",
+        "sf_errors": "{n} row(s) skipped",
+        "sf_line": "Row",
+        "sf_n_mods": "Modifications",
+        "sf_evaluated": "{n:,} scenarios evaluated",
+        "sf_download": "Download results (CSV)",
+        # Monte Carlo
+        "mc_title": "Monte Carlo simulation",
+        "mc_desc": "Propagation of uncertainties (distributions defined in the product JSON) to COGS/unit and RTY.",
+        "mc_no_dist": "No distribution defined. Add a `distributions` key to steps or components in the product JSON.",
+        "mc_uncertain_params": "Uncertain parameters",
+        "mc_distribution": "Distribution",
+        "mc_samples": "Number of draws",
+        "mc_seed": "Random seed",
+        "mc_target": "Target cost / unit",
+        "mc_mean": "Mean",
+        "mc_prob_exceed": "P(COGS > target)",
+        "mc_hist_cogs": "COGS / unit distribution",
+        "mc_hist_rty": "RTY distribution",
+        "mc_frequency": "Frequency",
+        # Volume sweep
+        "vs_title": "Volume & break-even",
+        "vs_desc": "COGS/unit as a function of annual volume (FOH is spread over the volume). Overlay a selling price to read the break-even volume and the volume needed for a target margin. Components with quantity-break prices (`tiers`) change price with the quantity bought.",
+        "vs_min_volume": "Min volume",
+        "vs_max_volume": "Max volume",
+        "vs_price": "Selling price / unit",
+        "vs_margin": "Target margin (%)",
+        "vs_variable": "Variable cost / unit",
+        "vs_fixed": "Annual FOH (yielded)",
+        "vs_breakeven": "Break-even volume",
+        "vs_target_volume": "Volume for target margin",
+        "vs_unreachable": "Not reachable",
+        "vs_chart_title": "COGS / unit vs volume",
+        "vs_current": "Current volume",
+        "vs_price_line": "Selling price",
+        "vs_margin_line": "Max cost for target margin",
         # Misc
         "no_data": "No data loaded. Load the example from the sidebar.",
         "data_loaded": "Data loaded successfully!",
         "export_json": "Export (JSON)",
         "step_name": "Step name",
+        "cache_stats": "Result cache: {hits} hits / {misses} misses ({size}/{maxsize} models)",
     },
 }
 
@@ -306,250 +1035,87 @@ def load_sample_data() -> dict:
 
 def get_step_name(step_data: dict) -> str:
     """Get step name in current language."""
-    lang = st.session_state.get("lang", "fr")
-    name = step_data.get("name", {})
-    if isinstance(name, dict):
-        return name.get(lang, name.get("fr", f"Step"))
-    return str(name)
+    return step_name(step_data, st.session_state.get("lang", "fr"))
 
 
 def get_component_name(comp: dict) -> str:
     """Get component name in current language."""
-    lang = st.session_state.get("lang", "fr")
-    name = comp.get("name", {})
-    if isinstance(name, dict):
-        return name.get(lang, name.get("fr", "Component"))
-    return str(name)
+    return component_name(comp, st.session_state.get("lang", "fr"))
 
 
 def sample_to_session(sample: dict) -> None:
     """Convert sample JSON to session state format."""
-    st.session_state.volume = sample.get("volume", 100000)
-    st.session_state.currency = sample.get("currency", "EUR")
-    steps = sample.get("steps", [])
-    st.session_state.nb_steps = len(steps)
-    st.session_state.steps_data = []
-    for step in steps:
-        step_entry = {
-            "name": step.get("name", {"fr": "Étape", "en": "Step"}),
-            "uph": step.get("uph", 60),
-            "availability": step.get("availability", 0.90),
-            "performance": step.get("performance", 0.85),
-            "yield": step.get("yield", 0.95),
-            "nb_operators": step.get("nb_operators", 1),
-            "dl_rate": step.get("dl_rate", 25.0),
-            "voh_rate": step.get("voh_rate", 30.0),
-            "foh_total": step.get("foh_total", 50000),
-            "bom": step.get("bom", []),
-        }
-        st.session_state.steps_data.append(step_entry)
+    product = normalize_product(sample)
+    st.session_state.volume = product["volume"]
+    st.session_state.currency = product["currency"]
+    st.session_state.nb_steps = len(product["steps"])
+    st.session_state.steps_data = product["steps"]
+    st.session_state.distributions = product["distributions"]
+    st.session_state.subassemblies = product["subassemblies"]
+    st.session_state.suppliers = product["suppliers"]
+    refresh_subassembly_prices()
+
+
+def refresh_subassembly_prices() -> dict:
+    """Set the price of BOM lines referencing a sub-assembly to its COGS/unit.
+
+    Returns the evaluate_assemblies() result, or None without sub-assemblies.
+    """
+    subassemblies = st.session_state.get("subassemblies") or {}
+    if not subassemblies:
+        return None
+    steps_data = st.session_state.steps_data
+    tree = pack_assemblies(steps_data, subassemblies)
+    res = evaluate_assemblies(tree, st.session_state.volume)
+    comps = [comp for step in steps_data for comp in step.get("bom", [])]
+    for comp, price in zip(comps, res["prices"][-1].tolist()):
+        if comp.get("ref") is not None:
+            comp["price"] = price
+    res["ids"] = tree["ids"]
+    return res
+
+
+def set_step_ref(step: dict, key: str, target: int, default: int) -> None:
+    """Store a routing reference (next / rework_to) by step id or 1-based number."""
+    if target == default:
+        step.pop(key, None)
+    else:
+        step[key] = None if target < 0 else st.session_state.steps_data[target].get("id", target + 1)
 
 
 def session_to_json() -> str:
     """Export current session state to JSON string."""
-    lang = st.session_state.get("lang", "fr")
-    data = {
+    return product_to_json({
         "name": {"fr": "Export", "en": "Export"},
         "volume": st.session_state.get("volume", 100000),
         "currency": st.session_state.get("currency", "EUR"),
         "steps": st.session_state.get("steps_data", []),
-    }
-    return json.dumps(data, indent=2, ensure_ascii=False)
-
-
-# ─── COGS Calculation Engine ────────────────────────────────────────────────────
-def compute_cogs(steps_data: list, volume: int) -> dict:
-    """Compute COGS for all steps using cascade model.
-
-    Returns dict with per-step results and global metrics.
-    """
-    results = []
-    yielded_cost = 0.0
-    rty = 1.0
-
-    for i, step in enumerate(steps_data):
-        uph = step.get("uph", 60)
-        avail = step.get("availability", 0.90)
-        perf = step.get("performance", 0.85)
-        yld = step.get("yield", 0.95)
-
-        effective_uph = uph * avail * perf
-        oee = avail * perf * yld
-
-        # Direct Labor
-        nb_ops = step.get("nb_operators", 1)
-        dl_rate = step.get("dl_rate", 25.0)
-        dl_per_unit = (nb_ops * dl_rate / effective_uph) if effective_uph > 0 else 0
-
-        # Variable Overhead
-        voh_rate = step.get("voh_rate", 30.0)
-        voh_per_unit = (voh_rate / effective_uph) if effective_uph > 0 else 0
-
-        # Fixed Overhead
-        foh_total = step.get("foh_total", 50000)
-        foh_per_unit = (foh_total / volume) if volume > 0 else 0
-
-        # Material (BOM)
-        material_per_unit = 0.0
-        bom = step.get("bom", [])
-        for comp in bom:
-            qty = comp.get("qty", 1)
-            price = comp.get("price", 0)
-            scrap = comp.get("scrap", 0)
-            denom = 1 - scrap
-            if denom > 0:
-                material_per_unit += qty * price / denom
-            else:
-                material_per_unit += qty * price
-
-        cost_added = material_per_unit + dl_per_unit + voh_per_unit + foh_per_unit
-
-        # Yielded cost (cascade)
-        if yld > 0:
-            yielded_cost = (yielded_cost + cost_added) / yld
-        else:
-            yielded_cost = yielded_cost + cost_added
-
-        rty *= yld
-
-        # Scrap cost for this step
-        scrap_cost_step = (yielded_cost - (yielded_cost * yld + cost_added * (1 - yld))) \
-            if yld < 1 else 0
-        # Simpler: scrap cost = yielded_cost - (prev_yielded + cost_added)
-        # = (prev + cost_added)/yld - prev - cost_added
-        # = (prev + cost_added) * (1/yld - 1)
-        prev_yielded = yielded_cost * yld - cost_added  # reconstruct
-        scrap_cost_step = (prev_yielded + cost_added) * (1.0 / yld - 1.0) if yld > 0 and yld < 1 else 0
-
-        results.append({
-            "step_idx": i,
-            "name": get_step_name(step),
-            "uph": uph,
-            "effective_uph": round(effective_uph, 1),
-            "oee": round(oee * 100, 1),
-            "material": round(material_per_unit, 4),
-            "dl": round(dl_per_unit, 4),
-            "voh": round(voh_per_unit, 4),
-            "foh": round(foh_per_unit, 4),
-            "cost_added": round(cost_added, 4),
-            "yield": yld,
-            "yielded_cost": round(yielded_cost, 4),
-            "scrap_cost": round(scrap_cost_step, 4),
-        })
-
-    units_to_start = volume / rty if rty > 0 else volume
-    total_cost_added = sum(r["cost_added"] for r in results)
-    total_scrap_cost = round(yielded_cost - total_cost_added, 4) if results else 0
-
-    return {
-        "steps": results,
-        "cogs_per_unit": round(yielded_cost, 4),
-        "rty": round(rty, 4),
-        "units_to_start": round(units_to_start, 0),
-        "scrap_cost_per_unit": total_scrap_cost,
-        "total_cogs": round(yielded_cost * volume, 2),
-    }
-
-
-# ─── Sensitivity Analysis Engine ────────────────────────────────────────────────
-def run_sensitivity(steps_data: list, volume: int, delta: float = 0.10) -> list:
-    """Run sensitivity analysis on all parameters.
-
-    Returns list of {param_name, base_value, impact_high, impact_low, impact}.
-    """
-    base_result = compute_cogs(steps_data, volume)
-    base_cogs = base_result["cogs_per_unit"]
-    impacts = []
-
-    # Volume
-    for direction, mult in [("high", 1 + delta), ("low", 1 - delta)]:
-        new_vol = max(1, int(volume * mult))
-        r = compute_cogs(steps_data, new_vol)
-        if direction == "high":
-            cogs_high = r["cogs_per_unit"]
-        else:
-            cogs_low = r["cogs_per_unit"]
-    impacts.append({
-        "param": t("volume"),
-        "step": "-",
-        "impact_high": round(cogs_high - base_cogs, 4),
-        "impact_low": round(cogs_low - base_cogs, 4),
-        "impact": round(abs(cogs_high - cogs_low), 4),
+        "distributions": st.session_state.get("distributions", {}),
+        "subassemblies": st.session_state.get("subassemblies", {}),
+        "suppliers": st.session_state.get("suppliers", {}),
     })
 
-    # Per-step parameters
-    param_keys = [
-        ("uph", t("uph")),
-        ("availability", t("availability")),
-        ("performance", t("performance")),
-        ("yield", t("yield")),
-        ("nb_operators", t("nb_operators")),
-        ("dl_rate", t("dl_rate")),
-        ("voh_rate", t("voh_rate")),
-        ("foh_total", t("foh_total")),
-    ]
 
+def param_labels(steps_data: list, packed: dict) -> list:
+    """Display label of every column of the flat parameter vector."""
+    step_names = [get_step_name(step) for step in steps_data]
+    labels = [f"{step_names[i]} - {t(key)}" for key, i in param_columns(packed)
+              if key != "price"]
     for step_idx, step in enumerate(steps_data):
-        step_name = get_step_name(step)
-        for key, label in param_keys:
-            base_val = step.get(key, 0)
-            if base_val == 0:
-                continue
-
-            cogs_high = base_cogs
-            cogs_low = base_cogs
-
-            for direction, mult in [("high", 1 + delta), ("low", 1 - delta)]:
-                modified = deepcopy(steps_data)
-                new_val = base_val * mult
-                # Clamp percentages
-                if key in ("availability", "performance", "yield"):
-                    new_val = min(new_val, 1.0)
-                modified[step_idx][key] = new_val
-                r = compute_cogs(modified, volume)
-                if direction == "high":
-                    cogs_high = r["cogs_per_unit"]
-                else:
-                    cogs_low = r["cogs_per_unit"]
-
-            impacts.append({
-                "param": f"{step_name} - {label}",
-                "step": step_name,
-                "impact_high": round(cogs_high - base_cogs, 4),
-                "impact_low": round(cogs_low - base_cogs, 4),
-                "impact": round(abs(cogs_high - cogs_low), 4),
-            })
-
-    # BOM components
-    for step_idx, step in enumerate(steps_data):
-        step_name = get_step_name(step)
-        for comp_idx, comp in enumerate(step.get("bom", [])):
-            comp_name = get_component_name(comp)
-            base_price = comp.get("price", 0)
-            if base_price == 0:
-                continue
-
-            cogs_high = base_cogs
-            cogs_low = base_cogs
-
-            for direction, mult in [("high", 1 + delta), ("low", 1 - delta)]:
-                modified = deepcopy(steps_data)
-                modified[step_idx]["bom"][comp_idx]["price"] = base_price * mult
-                r = compute_cogs(modified, volume)
-                if direction == "high":
-                    cogs_high = r["cogs_per_unit"]
-                else:
-                    cogs_low = r["cogs_per_unit"]
-
-            impacts.append({
-                "param": f"{step_name} - {comp_name} ({t('price')})",
-                "step": step_name,
-                "impact_high": round(cogs_high - base_cogs, 4),
-                "impact_low": round(cogs_low - base_cogs, 4),
-                "impact": round(abs(cogs_high - cogs_low), 4),
-            })
-
-    impacts.sort(key=lambda x: x["impact"], reverse=True)
+        for comp in step.get("bom", []):
+            labels.append(f"{step_names[step_idx]} - {get_component_name(comp)} ({t('price')})")
+    return labels
+
+
+def label_impacts(impacts: list) -> list:
+    """Add the translated `param` label to run_sensitivity() entries."""
+    for entry in impacts:
+        if entry["key"] == "volume":
+            entry["param"] = t("volume")
+        elif entry["key"] == "price":
+            entry["param"] = f"{entry['step']} - {entry['component']} ({t('price')})"
+        else:
+            entry["param"] = f"{entry['step']} - {t(entry['key'])}"
     return impacts
 
 
@@ -647,6 +1213,91 @@ def build_tornado_chart(impacts: list, top_n: int = 15) -> go.Figure:
     return fig
 
 
+def build_histogram_chart(values: np.ndarray, title: str, xaxis_title: str,
+                          marker: float = None, bins: int = 60) -> go.Figure:
+    """Build histogram from binned samples, with an optional vertical marker."""
+    counts, edges = np.histogram(values, bins=bins)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts / len(values),
+        width=np.diff(edges),
+        marker_color=COLORS["material"],
+    ))
+    if marker is not None:
+        fig.add_vline(x=marker, line_dash="dash", line_color=COLORS["scrap"])
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=t("mc_frequency"),
+        bargap=0,
+        height=400,
+    )
+    return fig
+
+
+def build_volume_chart(sweep: dict, price: float, max_cost: float, markers: dict,
+                       currency: str) -> go.Figure:
+    """Build COGS/unit vs volume curve (log x) with price and volume markers."""
+    fig = go.Figure(go.Scatter(
+        x=sweep["volumes"],
+        y=sweep["cogs_per_unit"],
+        mode="lines",
+        name=t("cogs_per_unit"),
+        line=dict(color=COLORS["material"], width=3),
+    ))
+    fig.add_hline(y=price, line_color=COLORS["foh"],
+                  annotation_text=t("vs_price_line"), annotation_position="top left")
+    if max_cost != price:
+        fig.add_hline(y=max_cost, line_dash="dot", line_color=COLORS["voh"],
+                      annotation_text=t("vs_margin_line"), annotation_position="bottom left")
+    for label, (x, color) in markers.items():
+        if x is not None:
+            fig.add_vline(x=x, line_dash="dash", line_color=color,
+                          annotation_text=label, annotation_position="top right")
+    # Keep the price lines readable when low volumes make COGS/unit explode
+    y_top = max(price, np.percentile(sweep["cogs_per_unit"], 90)) * 1.5
+    fig.update_layout(
+        title=t("vs_chart_title"),
+        xaxis_title=t("volume"),
+        yaxis_title=f"{t('cogs_per_unit')} ({currency})",
+        xaxis_type="log",
+        yaxis_range=[0, y_top],
+        showlegend=False,
+        height=500,
+    )
+    return fig
+
+
+def build_sobol_chart(sobol_rows: list, top_n: int = 15) -> go.Figure:
+    """Build horizontal bar chart of first-order and total-order Sobol indices."""
+    top = list(reversed(sobol_rows[:top_n]))
+    param_names = [r["param"] for r in top]
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name=t("sobol_total"),
+        y=param_names,
+        x=[r["total_order"] for r in top],
+        orientation="h",
+        marker_color=COLORS["voh"],
+    ))
+    fig.add_trace(go.Bar(
+        name=t("sobol_first"),
+        y=param_names,
+        x=[r["first_order"] for r in top],
+        orientation="h",
+        marker_color=COLORS["foh"],
+    ))
+    fig.update_layout(
+        barmode="group",
+        title=t("sobol_title"),
+        xaxis_title=t("sobol_index"),
+        height=max(400, top_n * 30),
+        yaxis=dict(automargin=True),
+    )
+    return fig
+
+
 def build_scenario_chart(base_results: dict, scenario_results: list,
                          scenario_names: list) -> go.Figure:
     """Build grouped stacked bar chart comparing scenarios."""
@@ -687,6 +1338,203 @@ def build_scenario_chart(base_results: dict, scenario_results: list,
     return fig
 
 
+def build_main_effects_chart(effects: list, factor_labels: list, level_labels: list,
+                             grand_mean: float) -> go.Figure:
+    """Build one main-effect panel per DOE factor (mean COGS/unit per level)."""
+    fig = make_subplots(rows=1, cols=len(effects), shared_yaxes=True,
+                        subplot_titles=factor_labels)
+    for f, means in enumerate(effects):
+        fig.add_trace(go.Scatter(
+            x=level_labels[f],
+            y=means,
+            mode="lines+markers",
+            line=dict(color=COLORS["material"], width=2),
+            showlegend=False,
+        ), row=1, col=f + 1)
+        fig.add_hline(y=grand_mean, line_dash="dot", line_color="#7f8c8d", row=1, col=f + 1)
+        fig.update_xaxes(type="category", row=1, col=f + 1)
+    fig.update_layout(
+        title=t("doe_main_effects"),
+        yaxis_title=f"{t('cogs_per_unit')} ({st.session_state.get('currency', 'EUR')})",
+        height=400,
+    )
+    return fig
+
+
+def build_interaction_chart(cell_means: np.ndarray, label_a: str, levels_a: list,
+                            label_b: str, levels_b: list) -> go.Figure:
+    """Build interaction plot: mean COGS/unit vs factor A, one line per level of B."""
+    fig = go.Figure()
+    palette = list(COLORS.values())
+    for j, level in enumerate(levels_b):
+        fig.add_trace(go.Scatter(
+            x=levels_a,
+            y=cell_means[:, j],
+            mode="lines+markers",
+            name=f"{label_b} = {level}",
+            line=dict(color=palette[j % len(palette)], width=2),
+        ))
+    fig.update_layout(
+        title=f"{t('doe_interaction')} : {label_a} × {label_b}",
+        xaxis_title=label_a,
+        xaxis_type="category",
+        yaxis_title=f"{t('cogs_per_unit')} ({st.session_state.get('currency', 'EUR')})",
+        height=450,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    return fig
+
+
+def build_budget_chart(curve: dict, budget: float, currency: str) -> go.Figure:
+    """Build optimal COGS/unit vs improvement budget curve."""
+    fig = go.Figure(go.Scatter(
+        x=curve["budgets"],
+        y=curve["cogs_per_unit"],
+        mode="lines+markers",
+        line=dict(color=COLORS["material"], width=3),
+    ))
+    fig.add_vline(x=budget, line_dash="dash", line_color=COLORS["scrap"])
+    fig.update_layout(
+        title=t("ib_curve_title"),
+        xaxis_title=f"{t('ib_budget')} ({currency})",
+        yaxis_title=f"{t('cogs_per_unit')} ({currency})",
+        height=400,
+    )
+    return fig
+
+
+def build_marginal_chart(curve: dict, budget: float, currency: str) -> go.Figure:
+    """Build marginal annual savings per euro vs improvement budget."""
+    fig = go.Figure(go.Scatter(
+        x=curve["budgets"],
+        y=curve["annual_return"],
+        mode="lines+markers",
+        line=dict(color=COLORS["foh"], width=3, shape="hv"),
+    ))
+    fig.add_hline(y=1.0, line_dash="dot", line_color="#7f8c8d")
+    fig.add_vline(x=budget, line_dash="dash", line_color=COLORS["scrap"])
+    fig.update_layout(
+        title=t("ib_marginal_title"),
+        xaxis_title=f"{t('ib_budget')} ({currency})",
+        yaxis_title=t("ib_marginal"),
+        height=400,
+    )
+    return fig
+
+
+def build_staffing_chart(step_names: list, current: list, optimized: list) -> go.Figure:
+    """Build grouped bar chart of operators per step, current vs optimized."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name=t("op_current_ops"), x=step_names, y=current,
+                         marker_color=COLORS["dl"]))
+    fig.add_trace(go.Bar(name=t("op_new_ops"), x=step_names, y=optimized,
+                         marker_color=COLORS["foh"]))
+    fig.update_layout(
+        barmode="group",
+        title=t("op_chart_title"),
+        yaxis_title=t("nb_operators"),
+        height=400,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    return fig
+
+
+def build_time_phased_chart(phased: dict, currency: str) -> go.Figure:
+    """Build COGS/unit per period (lines) over the period volumes (bars)."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(x=phased["labels"], y=phased["volumes"], name=t("volume"),
+                         marker_color="#d5dbdb"), secondary_y=True)
+    fig.add_trace(go.Scatter(x=phased["labels"], y=phased["cogs_per_unit"], mode="lines",
+                             name=t("cogs_per_unit"),
+                             line=dict(color=COLORS["material"], width=3)))
+    fig.add_trace(go.Scatter(x=phased["labels"], y=phased["average_to_date"], mode="lines",
+                             name=t("tp_average_to_date"),
+                             line=dict(color=COLORS["dl"], width=2, dash="dash")))
+    fig.update_layout(
+        title=t("tp_chart_title"),
+        height=450,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    fig.update_yaxes(title_text=f"{t('cogs_per_unit')} ({currency})", secondary_y=False)
+    fig.update_yaxes(title_text=t("volume"), secondary_y=True, showgrid=False)
+    return fig
+
+
+def build_capacity_chart(step_names: list, utilization: np.ndarray, bottleneck: int) -> go.Figure:
+    """Build utilization bar chart per step with the 100 % line."""
+    colors = [COLORS["scrap"] if u > 1 else COLORS["dl"] for u in utilization]
+    if 0 <= bottleneck < len(colors):
+        colors[bottleneck] = COLORS["foh"] if utilization[bottleneck] <= 1 else COLORS["scrap"]
+    fig = go.Figure(go.Bar(x=step_names, y=utilization * 100, marker_color=colors,
+                           text=[f"{u:.0%}" for u in utilization], textposition="outside"))
+    fig.add_hline(y=100, line_dash="dash", line_color=COLORS["scrap"])
+    fig.update_layout(
+        title=t("cap_chart_title"),
+        yaxis_title=t("cap_utilization"),
+        height=420,
+        showlegend=False,
+    )
+    return fig
+
+
+def build_portfolio_chart(names: list, standalone: np.ndarray, cogs: np.ndarray) -> go.Figure:
+    """Build grouped bar chart of COGS/unit per product, standalone vs portfolio."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name=t("pf_standalone"), x=names, y=standalone,
+                         marker_color=COLORS["dl"]))
+    fig.add_trace(go.Bar(name=t("pf_cogs"), x=names, y=cogs, marker_color=COLORS["foh"]))
+    fig.update_layout(
+        barmode="group",
+        title=t("pf_chart_title"),
+        yaxis_title=t("cogs_per_unit"),
+        height=420,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    return fig
+
+
+def build_equipment_chart(investment: np.ndarray, npv: np.ndarray, best_investment: float,
+                          best_npv: float, currency: str) -> go.Figure:
+    """Build scatter of NPV vs investment of the equipment alternatives."""
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=investment, y=npv, mode="markers", name=t("eq_alternatives"),
+                               marker=dict(color=COLORS["dl"], size=6, opacity=0.6)))
+    fig.add_trace(go.Scatter(x=[best_investment], y=[best_npv], mode="markers",
+                             name=t("eq_best_npv"),
+                             marker=dict(color=COLORS["foh"], size=14, symbol="star")))
+    fig.add_hline(y=0, line_dash="dot", line_color="#7f8c8d")
+    fig.update_layout(
+        title=t("eq_chart_title"),
+        xaxis_title=f"{t('eq_investment')} ({currency})",
+        yaxis_title=f"{t('eq_npv')} ({currency})",
+        height=420,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    return fig
+
+
+def build_attribution_chart(labels: list, values: np.ndarray, before: float, after: float,
+                            currency: str) -> go.Figure:
+    """Build waterfall from the COGS/unit before to after, one bar per contribution."""
+    fig = go.Figure(go.Waterfall(
+        x=[t("at_before")] + labels + [t("at_after")],
+        y=[before] + list(values) + [after],
+        measure=["absolute"] + ["relative"] * len(labels) + ["total"],
+        increasing=dict(marker=dict(color=COLORS["scrap"])),
+        decreasing=dict(marker=dict(color=COLORS["dl"])),
+        totals=dict(marker=dict(color=COLORS["foh"])),
+        connector=dict(line=dict(color="#7f8c8d", dash="dot")),
+    ))
+    fig.update_layout(
+        title=t("at_chart_title"),
+        yaxis_title=f"{t('cogs_per_unit')} ({currency})",
+        height=480,
+        showlegend=False,
+        xaxis=dict(automargin=True),
+    )
+    return fig
+
+
 # ─── Load CSS ────────────────────────────────────────────────────────────────────
 if os.path.exists(CSS_PATH):
     css = load_custom_css(CSS_PATH)
@@ -718,6 +1566,12 @@ if "currency" not in st.session_state:
     st.session_state.currency = "EUR"
 if "nb_steps" not in st.session_state:
     st.session_state.nb_steps = 3
+if "distributions" not in st.session_state:
+    st.session_state.distributions = {}
+if "subassemblies" not in st.session_state:
+    st.session_state.subassemblies = {}
+if "suppliers" not in st.session_state:
+    st.session_state.suppliers = {}
 
 
 # ═════════════════════════════════════════════════════════════════════════════════
@@ -772,19 +1626,33 @@ def page_simulator():
         )
         # Adjust steps_data length if needed
         while len(st.session_state.steps_data) < nb_steps:
-            st.session_state.steps_data.append({
-                "name": {"fr": f"Étape {len(st.session_state.steps_data) + 1}",
-                         "en": f"Step {len(st.session_state.steps_data) + 1}"},
-                "uph": 60, "availability": 0.90, "performance": 0.85, "yield": 0.95,
-                "nb_operators": 1, "dl_rate": 25.0, "voh_rate": 30.0, "foh_total": 50000,
-                "bom": [],
-            })
+            st.session_state.steps_data.append(new_step(len(st.session_state.steps_data) + 1))
         while len(st.session_state.steps_data) > nb_steps:
             st.session_state.steps_data.pop()
         st.session_state.nb_steps = nb_steps
 
+    # Sub-assembly lines are priced at the sub-assembly COGS/unit
+    try:
+        refresh_subassembly_prices()
+    except ValueError as exc:
+        st.error(f"{t('sub_error')}: {exc}")
+        return
+
     st.divider()
 
+    # Current routing graph (plain chain if it cannot be resolved yet)
+    try:
+        graph = routing_graph(st.session_state.steps_data)
+    except ValueError:
+        graph = {"next": np.append(np.arange(1, nb_steps), -1), "rework_to": np.arange(nb_steps)}
+    targets = [-1] + list(range(nb_steps))
+    target_labels = [t("routing_exit")] + [
+        f"{j + 1}. {get_step_name(s)}" for j, s in enumerate(st.session_state.steps_data)
+    ]
+
+    def target_label(j):
+        return target_labels[j + 1]
+
     # Per-step expanders
     for step_idx in range(nb_steps):
         step = st.session_state.steps_data[step_idx]
@@ -872,6 +1740,34 @@ def page_simulator():
                     key=f"foh_{step_idx}",
                 )
 
+            # ── Routing section ──
+            st.markdown(f"**{t('routing_title')}**")
+            rc1, rc2, rc3 = st.columns(3)
+            with rc1:
+                nxt = st.selectbox(
+                    t("routing_next"), targets, index=targets.index(int(graph["next"][step_idx])),
+                    format_func=target_label, key=f"next_{step_idx}",
+                )
+                set_step_ref(step, "next", nxt, step_idx + 1 if step_idx + 1 < nb_steps else -1)
+            with rc2:
+                rework = st.number_input(
+                    t("routing_rework"), min_value=0.0, max_value=1.0,
+                    value=float(step.get("rework", 0)),
+                    step=0.05, format="%.2f",
+                    key=f"rework_{step_idx}",
+                )
+                if rework > 0:
+                    step["rework"] = rework
+                else:
+                    step.pop("rework", None)
+            with rc3:
+                rework_to = st.selectbox(
+                    t("routing_rework_to"), targets[1:],
+                    index=int(graph["rework_to"][step_idx]),
+                    format_func=target_label, key=f"rework_to_{step_idx}",
+                )
+                set_step_ref(step, "rework_to", rework_to, step_idx)
+
             # ── BOM section ──
             st.markdown(f"**{t('bom_title')}**")
             bom = step.get("bom", [])
@@ -897,12 +1793,22 @@ def page_simulator():
                         key=f"comp_qty_{step_idx}_{comp_idx}",
                     )
                 with bc3:
-                    comp["price"] = st.number_input(
-                        t("price"), min_value=0.0,
-                        value=float(comp.get("price", 0)),
-                        step=0.01, format="%.4f",
-                        key=f"comp_price_{step_idx}_{comp_idx}",
-                    )
+                    if comp.get("ref") is not None:
+                        st.text_input(
+                            t("price"), value=f"{float(comp.get('price', 0)):.4f}", disabled=True,
+                            help=t("sub_ref_help").format(ref=comp["ref"]),
+                            key=f"comp_ref_{step_idx}_{comp_idx}_{float(comp.get('price', 0)):.6f}",
+                        )
+                    else:
+                        comp["price"] = st.number_input(
+                            t("price"), min_value=0.0,
+                            value=float(comp.get("price", 0)),
+                            step=0.01, format="%.4f",
+                            help=t("tier_help").format(tiers=", ".join(
+                                f"{q:,.0f} → {p:.4f}" for q, p in sorted(comp["tiers"])
+                            )) if comp.get("tiers") else None,
+                            key=f"comp_price_{step_idx}_{comp_idx}",
+                        )
                 with bc4:
                     comp["scrap"] = st.number_input(
                         t("scrap_rate"), min_value=0.0, max_value=0.99,
@@ -928,7 +1834,27 @@ def page_simulator():
 
     # ── RESULTS (live, no button) ──
     st.subheader(t("results_title"))
-    results = compute_cogs(st.session_state.steps_data, st.session_state.volume)
+    sub_results = refresh_subassembly_prices()
+    # Incremental cascade: an edit only re-runs the cascade from the edited step
+    cascade = st.session_state.get("cascade")
+    if cascade is None:
+        cascade = IncrementalCascade(st.session_state.steps_data, st.session_state.volume)
+        st.session_state.cascade = cascade
+    else:
+        cascade.sync(st.session_state.steps_data, st.session_state.volume)
+    results = cascade.result(st.session_state.steps_data, lang=st.session_state.get("lang", "fr"))
+
+    # Branches, merges or rework: solve the routing graph instead of the chain
+    try:
+        graph = routing_graph(st.session_state.steps_data)
+    except ValueError as exc:
+        st.error(f"{t('routing_error')}: {exc}")
+        return
+    network = None
+    if not is_linear(graph):
+        network = evaluate_network(pack_routing(st.session_state.steps_data), graph, volume)
+        results = {**results, **network_summary(network)}
+        st.info(t("routing_graph_note"))
 
     # Key metrics
     m1, m2, m3, m4 = st.columns(4)
@@ -970,6 +1896,32 @@ def page_simulator():
     # Total COGS
     st.metric(t("total_cogs"), f"{results['total_cogs']:,.2f} {currency}")
 
+    if network is not None:
+        st.subheader(t("routing_graph_title"))
+        step_names = [get_step_name(s) for s in st.session_state.steps_data]
+        st.metric(t("routing_throughput"), f"{network['throughput']:.1f}")
+        st.dataframe(pd.DataFrame({
+            t("step"): step_names,
+            t("routing_next"): [target_label(int(j)) for j in graph["next"]],
+            t("routing_visits"): network["visits"].round(4),
+            t("routing_starts"): network["starts"].round(4),
+            t("routing_cost_visit"): network["cost_added"].round(4),
+            t("routing_contribution"): network["contribution"].round(4),
+            t("routing_hours"): (network["hours"] * 1000).round(2),
+            t("routing_bottleneck"): [i == network["bottleneck"] for i in range(nb_steps)],
+        }), use_container_width=True, hide_index=True)
+
+    if sub_results is not None:
+        st.subheader(t("sub_title"))
+        subassemblies = st.session_state.subassemblies
+        st.dataframe(pd.DataFrame({
+            t("sub_id"): sub_results["ids"],
+            t("sub_name"): [get_step_name(subassemblies[sub_id]) for sub_id in sub_results["ids"]],
+            t("sub_demand"): sub_results["demand"].round(0),
+            t("cogs_per_unit"): sub_results["cogs_per_unit"].round(4),
+            t("sub_rty"): (sub_results["rty"] * 100).round(1),
+        }), use_container_width=True, hide_index=True)
+
     st.divider()
 
     # ── Price / Margin calculator ──
@@ -1027,26 +1979,69 @@ def page_sensitivity():
         st.info(t("no_data"))
         return
 
-    impacts = run_sensitivity(st.session_state.steps_data, st.session_state.volume)
+    impacts = label_impacts(run_sensitivity(
+        st.session_state.steps_data, st.session_state.volume,
+        lang=st.session_state.get("lang", "fr"),
+    ))
 
     if not impacts:
         st.warning(t("no_data"))
         return
 
+    # Global sensitivity (Sobol) controls
+    gs1, gs2 = st.columns(2)
+    with gs1:
+        show_sobol = st.toggle(t("sobol_enable"), key="sobol_toggle")
+    with gs2:
+        n_sobol = st.select_slider(
+            t("sobol_samples"), options=[256, 1024, 4096, 16384],
+            value=1024, key="sobol_samples_input", disabled=not show_sobol,
+        )
+
     fig = build_tornado_chart(impacts, top_n=15)
-    st.plotly_chart(fig, use_container_width=True)
+    if show_sobol:
+        steps_data = st.session_state.steps_data
+        packed = pack_routing(steps_data)
+        sobol = run_sobol(packed, st.session_state.volume, n_samples=int(n_sobol), seed=0)
+        labels = param_labels(steps_data, packed)
+        sobol_rows = sorted([{
+            "param": t("volume") if col < 0 else labels[col],
+            "first_order": round(float(s1), 4),
+            "total_order": round(float(total), 4),
+        } for col, s1, total in zip(
+            sobol["factors"], sobol["first_order"], sobol["total_order"],
+        )], key=lambda x: x["total_order"], reverse=True)
+
+        chart1, chart2 = st.columns(2)
+        with chart1:
+            st.plotly_chart(fig, use_container_width=True)
+        with chart2:
+            st.plotly_chart(build_sobol_chart(sobol_rows, top_n=15), use_container_width=True)
+    else:
+        st.plotly_chart(fig, use_container_width=True)
 
     # Detail table
     st.subheader(t("detail_table"))
     df = pd.DataFrame(impacts[:15])
-    df_display = df[["param", "impact_high", "impact_low", "impact"]].rename(columns={
+    df_display = df[["param", "impact_high", "impact_low", "impact", "elasticity"]].rename(columns={
         "param": t("param_name"),
         "impact_high": "+10%",
         "impact_low": "-10%",
         "impact": t("impact"),
+        "elasticity": t("elasticity"),
     })
     st.dataframe(df_display, use_container_width=True, hide_index=True)
 
+    if show_sobol:
+        st.subheader(t("sobol_title"))
+        st.markdown(t("sobol_desc"))
+        df_sobol = pd.DataFrame(sobol_rows[:15]).rename(columns={
+            "param": t("param_name"),
+            "first_order": t("sobol_first"),
+            "total_order": t("sobol_total"),
+        })
+        st.dataframe(df_sobol, use_container_width=True, hide_index=True)
+
 
 # ─── PAGE: What-if Scenarios ────────────────────────────────────────────────────
 def page_scenarios():
@@ -1057,18 +2052,29 @@ def page_scenarios():
         st.info(t("no_data"))
         return
 
-    base_results = compute_cogs(st.session_state.steps_data, st.session_state.volume)
+    base_results = cached_cogs(
+        st.session_state.steps_data, st.session_state.volume,
+        lang=st.session_state.get("lang", "fr"),
+    )
     currency = st.session_state.get("currency", "EUR")
 
+    mode = st.radio(
+        t("sc_mode"), [t("sc_mode_manual"), t("sc_mode_doe"), t("sc_mode_file")],
+        horizontal=True, key="sc_mode_input",
+    )
+    if mode == t("sc_mode_doe"):
+        doe_explorer(base_results, currency)
+        return
+    if mode == t("sc_mode_file"):
+        scenario_file_import(base_results)
+        return
+
     nb_scenarios = st.number_input(
         t("nb_scenarios"), min_value=1, max_value=3, value=1, key="nb_scenarios_input",
     )
 
     # Parameter options for modification
-    param_options_keys = [
-        "volume", "uph", "availability", "performance", "yield",
-        "nb_operators", "dl_rate", "voh_rate", "foh_total",
-    ]
+    param_options_keys = list(SCENARIO_PARAMS)
     param_options_labels = [t(k) for k in param_options_keys]
 
     step_names = [get_step_name(s) for s in st.session_state.steps_data]
@@ -1139,20 +2145,10 @@ def page_scenarios():
             st.rerun()
 
         # Compute scenario
-        sc_steps = deepcopy(st.session_state.steps_data)
-        sc_volume = st.session_state.volume
-
-        for mod in mods:
-            pkey = mod["param_key"]
-            sidx = mod["step_idx"]
-            nval = mod["new_value"]
-
-            if pkey == "volume":
-                sc_volume = max(1, int(nval))
-            elif sidx >= 0 and sidx < len(sc_steps):
-                sc_steps[sidx][pkey] = nval
-
-        sc_result = compute_cogs(sc_steps, sc_volume)
+        sc_steps, sc_volume = apply_modifications(
+            st.session_state.steps_data, st.session_state.volume, mods,
+        )
+        sc_result = cached_cogs(sc_steps, sc_volume, lang=st.session_state.get("lang", "fr"))
         scenario_results.append(sc_result)
 
         # Scenario metrics
@@ -1203,6 +2199,1541 @@ def page_scenarios():
         st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
 
 
+# ─── Design of experiments (What-if page, DOE mode) ────────────────────────────
+DOE_MAX_RUNS = 1_000_000
+DOE_MAX_ROWS_SHOWN = 5_000
+
+
+def default_doe_factors(steps_data: list, volume: int) -> pd.DataFrame:
+    """Three most influential step parameters at -10% / base / +10%."""
+    rows = []
+    for entry in run_sensitivity(steps_data, volume):
+        if entry["key"] in ("price", "volume"):
+            continue
+        base = steps_data[entry["step_idx"]][entry["key"]]
+        levels = [base * 0.9, base, base * 1.1]
+        if entry["key"] in RATIO_PARAMS:
+            levels = sorted({min(v, 1.0) for v in levels})
+        rows.append({
+            t("scenario_param"): t(entry["key"]),
+            t("scenario_step_select"): get_step_name(steps_data[entry["step_idx"]]),
+            t("doe_levels"): ", ".join(f"{v:g}" for v in levels),
+        })
+        if len(rows) == 3:
+            break
+    return pd.DataFrame(rows, columns=[t("scenario_param"), t("scenario_step_select"), t("doe_levels")])
+
+
+def doe_explorer(base_results: dict, currency: str):
+    """Factorial DOE over step parameters, evaluated in one batched pass."""
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    st.markdown(t("doe_desc"))
+
+    param_keys = list(SCENARIO_PARAMS)
+    param_labels_ = [t(k) for k in param_keys]
+    step_names = [get_step_name(s) for s in steps_data]
+
+    # Factor table (reset when the language or the routing changes)
+    editor_key = f"doe_factors_{st.session_state.get('lang', 'fr')}_{len(steps_data)}"
+    if editor_key not in st.session_state:
+        st.session_state[editor_key] = default_doe_factors(steps_data, volume)
+    st.subheader(t("doe_factors"))
+    table = st.data_editor(
+        st.session_state[editor_key],
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            t("scenario_param"): st.column_config.SelectboxColumn(options=param_labels_, required=True),
+            t("scenario_step_select"): st.column_config.SelectboxColumn(options=step_names),
+            t("doe_levels"): st.column_config.TextColumn(help=t("doe_levels_help"), required=True),
+        },
+        key=f"{editor_key}_editor",
+    )
+
+    factors, factor_labels = [], []
+    for row_idx, row in table.iterrows():
+        try:
+            key = param_keys[param_labels_.index(row[t("scenario_param")])]
+            levels = [float(v) for v in str(row[t("doe_levels")]).split(",") if v.strip()]
+            if not levels:
+                raise ValueError(t("doe_levels_help"))
+            if key == "volume":
+                idx, label = -1, t("volume")
+            else:
+                idx = step_names.index(row[t("scenario_step_select")])
+                label = f"{step_names[idx]} - {t(key)}"
+        except (ValueError, TypeError) as exc:
+            st.error(f"{t('doe_invalid')} #{row_idx + 1}: {exc}")
+            return
+        factors.append({"key": key, "idx": idx, "levels": levels})
+        factor_labels.append(label)
+    if not factors:
+        return
+
+    n_levels = [len(f["levels"]) for f in factors]
+    d1, d2 = st.columns([2, 1])
+    with d1:
+        design_type = st.radio(
+            t("doe_design"), [t("doe_full"), t("doe_fractional")], horizontal=True,
+            key="doe_design_input",
+        )
+    generators = []
+    if design_type == t("doe_fractional"):
+        if any(n != 2 for n in n_levels) or len(factors) < 3:
+            st.warning(t("doe_two_levels"))
+            return
+        with d2:
+            fraction = st.number_input(
+                t("doe_fraction"), min_value=1, max_value=len(factors) - 2, value=1,
+                key="doe_fraction_input",
+            )
+        design, generators = fractional_factorial(len(factors), int(fraction))
+    else:
+        n_runs = int(np.prod(n_levels, dtype=np.int64))
+        if n_runs > DOE_MAX_RUNS:
+            st.warning(t("doe_too_many").format(runs=n_runs, max_runs=DOE_MAX_RUNS))
+            return
+        design = full_factorial(n_levels)
+
+    try:
+        results = run_doe(pack_routing(steps_data), volume, factors, design)
+    except ValueError as exc:
+        st.error(f"{t('doe_invalid')}: {exc}")
+        return
+
+    cogs = results["cogs_per_unit"]
+    base_cogs = base_results["cogs_per_unit"]
+    st.divider()
+    st.subheader(t("doe_results"))
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("doe_runs"), f"{len(design):,}")
+    with m2:
+        best = int(np.argmin(cogs))
+        st.metric("Min", f"{cogs[best]:.2f} {currency}", delta=f"{cogs[best] - base_cogs:.2f}",
+                  delta_color="inverse")
+    with m3:
+        st.metric(t("doe_mean"), f"{cogs.mean():.2f} {currency}")
+    with m4:
+        st.metric("Max", f"{cogs.max():.2f} {currency}")
+    if generators:
+        letters = ", ".join(f"{FACTOR_LETTERS[i]} = {label}" for i, label in enumerate(factor_labels))
+        st.caption(f"{t('doe_generators')} : " + " ; ".join(generators) + f" ({letters})")
+
+    # Results table: one column per factor, values looked up from the level indices
+    df = pd.DataFrame({
+        label: np.asarray(f["levels"])[design[:, i]]
+        for i, (label, f) in enumerate(zip(factor_labels, factors))
+    })
+    df[t("cogs_per_unit")] = cogs.round(4)
+    df[t("rty")] = (results["rty"] * 100).round(2)
+    df[t("total_cogs")] = results["total_cogs"].round(2)
+    df[t("scenario_delta")] = (cogs - base_cogs).round(4)
+
+    f1, f2 = st.columns([3, 1])
+    with f1:
+        lo, hi = float(cogs.min()), float(cogs.max())
+        cogs_range = st.slider(t("doe_cogs_range"), lo, max(hi, lo + 0.01), (lo, max(hi, lo + 0.01)),
+                               key="doe_cogs_range_input")
+    with f2:
+        better_only = st.checkbox(t("doe_better_only"), key="doe_better_input")
+    mask = (cogs >= cogs_range[0]) & (cogs <= cogs_range[1])
+    if better_only:
+        mask &= cogs < base_cogs
+    filtered = df[mask].sort_values(t("cogs_per_unit"))
+    st.caption(t("doe_shown").format(shown=min(len(filtered), DOE_MAX_ROWS_SHOWN), total=len(filtered)))
+    st.dataframe(filtered.head(DOE_MAX_ROWS_SHOWN), use_container_width=True, hide_index=True)
+    st.download_button(
+        t("doe_download"), filtered.to_csv(index=False), file_name="cogs_doe.csv", mime="text/csv",
+    )
+
+    # Main effects and interaction
+    st.divider()
+    effects = main_effects(design, cogs, n_levels)
+    level_labels = [[f"{v:g}" for v in f["levels"]] for f in factors]
+    fig = build_main_effects_chart(effects, factor_labels, level_labels, float(cogs.mean()))
+    st.plotly_chart(fig, use_container_width=True)
+
+    if len(factors) >= 2:
+        top_a, top_b, _ = interaction_strengths(design, cogs, n_levels)[0]
+        i1, i2 = st.columns(2)
+        with i1:
+            a = st.selectbox(t("doe_factor_a"), range(len(factors)), index=top_a,
+                             format_func=lambda i: factor_labels[i], key="doe_factor_a_input")
+        with i2:
+            b = st.selectbox(t("doe_factor_b"), range(len(factors)), index=top_b,
+                             format_func=lambda i: factor_labels[i], key="doe_factor_b_input")
+        if a != b:
+            cell = interaction_means(design, cogs, a, b, n_levels)
+            fig = build_interaction_chart(cell, factor_labels[a], level_labels[a],
+                                          factor_labels[b], level_labels[b])
+            st.plotly_chart(fig, use_container_width=True)
+
+
+# ─── Scenario file import (What-if page, file mode) ─────────────────────────────
+def scenario_file_import(base_results: dict):
+    """Evaluate every scenario of an uploaded CSV/NDJSON file as sparse deltas."""
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    st.markdown(t("sf_desc"))
+
+    template = "scenario,param,step,new_value\n" + "\n".join([
+        f"{t('scenario')} A,uph,1,{steps_data[0]['uph']}",
+        f"{t('scenario')} A,yield,1,{steps_data[0]['yield']}",
+        f"{t('scenario')} B,volume,,{volume * 2}",
+    ]) + "\n"
+    st.download_button(t("sf_template"), template, file_name="scenarios_template.csv", mime="text/csv")
+
+    uploaded = st.file_uploader(t("sf_upload"), type=["csv", "ndjson", "jsonl", "json"],
+                                key="sf_upload_input")
+    if uploaded is None:
+        return
+
+    packed = pack_routing(steps_data)
+    try:
+        rows = read_scenario_rows(uploaded.getvalue().decode("utf-8-sig"))
+    except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+        st.error(f"{t('sf_upload')}: {exc}")
+        return
+    compiled = compile_scenarios(steps_data, packed, volume, rows)
+    if compiled["errors"]:
+        with st.expander(t("sf_errors").format(n=len(compiled["errors"]))):
+            st.dataframe(pd.DataFrame(compiled["errors"], columns=[t("sf_line"), "Message"]),
+                         use_container_width=True, hide_index=True)
+
+    # Stream chunk results into the comparison table
+    base_cogs = base_results["cogs_per_unit"]
+    n_scenarios = len(compiled["names"])
+    progress = st.progress(0.0)
+    table = st.empty()
+    frames = []
+    for start, res in iter_scenario_results(packed, compiled):
+        stop = start + len(res["cogs_per_unit"])
+        delta = res["cogs_per_unit"] - base_cogs
+        frames.append(pd.DataFrame({
+            t("scenario"): compiled["names"][start:stop],
+            t("sf_n_mods"): compiled["n_mods"][start:stop],
+            t("cogs_per_unit"): res["cogs_per_unit"].round(4),
+            t("rty"): (res["rty"] * 100).round(2),
+            t("total_cogs"): res["total_cogs"].round(2),
+            t("scenario_delta"): delta.round(4),
+            f"{t('scenario_delta')} (%)": (delta / base_cogs * 100).round(2) if base_cogs > 0 else 0.0,
+        }))
+        progress.progress(stop / n_scenarios, text=t("sf_evaluated").format(n=stop))
+        table.dataframe(pd.concat(frames, ignore_index=True), use_container_width=True, hide_index=True)
+    if not frames:
+        progress.empty()
+        return
+
+    df = pd.concat(frames, ignore_index=True)
+    st.download_button(t("sf_download"), df.to_csv(index=False),
+                       file_name="cogs_scenarios.csv", mime="text/csv")
+
+
+# ─── PAGE: Monte Carlo ──────────────────────────────────────────────────────────
+def page_monte_carlo():
+    st.title(t("mc_title"))
+    st.markdown(t("mc_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    packed = pack_routing(steps_data)
+    specs = collect_distributions(
+        steps_data, packed, st.session_state.get("distributions", {}).get("volume"),
+    )
+    if not specs:
+        st.info(t("mc_no_dist"))
+        return
+
+    # Uncertain parameters
+    st.subheader(t("mc_uncertain_params"))
+    labels = param_labels(steps_data, packed)
+    rows = []
+    for col, key, step_idx, spec in specs:
+        param = t("volume") if col < 0 else labels[col]
+        details = ", ".join(f"{k}={v}" for k, v in spec.items() if k != "type")
+        rows.append({
+            t("param_name"): param,
+            t("mc_distribution"): f"{spec.get('type', '')} ({details})",
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    base_cogs = cached_cogs(steps_data, volume)["cogs_per_unit"]
+    mc1, mc2, mc3 = st.columns(3)
+    with mc1:
+        n_samples = st.select_slider(
+            t("mc_samples"), options=[10_000, 100_000, 500_000, 1_000_000],
+            value=100_000, key="mc_samples_input",
+        )
+    with mc2:
+        seed = st.number_input(t("mc_seed"), min_value=0, value=42, step=1, key="mc_seed_input")
+    with mc3:
+        target = st.number_input(
+            t("mc_target"), min_value=0.0, value=round(base_cogs * 1.05, 2),
+            step=0.1, format="%.2f", key="mc_target_input",
+        )
+
+    try:
+        results = run_monte_carlo(packed, volume, specs, int(n_samples), seed=int(seed))
+    except (KeyError, ValueError) as exc:
+        st.error(f"{t('mc_distribution')}: {exc}")
+        return
+    cogs_stats = summarize_samples(results["cogs_per_unit"], target)
+    rty_stats = summarize_samples(results["rty"])
+
+    st.divider()
+    st.subheader(t("results_title"))
+    m1, m2, m3, m4, m5 = st.columns(5)
+    with m1:
+        st.metric(t("mc_mean"), f"{cogs_stats['mean']:.2f} {currency}")
+    with m2:
+        st.metric("P5", f"{cogs_stats['p5']:.2f} {currency}")
+    with m3:
+        st.metric("P50", f"{cogs_stats['p50']:.2f} {currency}")
+    with m4:
+        st.metric("P95", f"{cogs_stats['p95']:.2f} {currency}")
+    with m5:
+        st.metric(t("mc_prob_exceed"), f"{cogs_stats['prob_exceed'] * 100:.1f}%")
+
+    chart1, chart2 = st.columns(2)
+    with chart1:
+        fig = build_histogram_chart(
+            results["cogs_per_unit"], t("mc_hist_cogs"),
+            f"{t('cogs_per_unit')} ({currency})", marker=target,
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    with chart2:
+        fig = build_histogram_chart(results["rty"], t("mc_hist_rty"), t("rty"))
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Summary table
+    st.dataframe(pd.DataFrame([
+        {"": t("cogs_per_unit"), **{k: round(v, 4) for k, v in cogs_stats.items()}},
+        {"": t("rty"), **{k: round(v, 4) for k, v in rty_stats.items()}},
+    ]), use_container_width=True, hide_index=True)
+
+
+# ─── PAGE: Volume sweep ─────────────────────────────────────────────────────────
+def page_volume_sweep():
+    st.title(t("vs_title"))
+    st.markdown(t("vs_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    base_cogs = cached_cogs(steps_data, volume)["cogs_per_unit"]
+
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        v_min = st.number_input(t("vs_min_volume"), min_value=1, value=max(1, volume // 100),
+                                step=100, key="vs_min_input")
+    with c2:
+        v_max = st.number_input(t("vs_max_volume"), min_value=1, value=max(1, volume * 100),
+                                step=1000, key="vs_max_input")
+    with c3:
+        price = st.number_input(t("vs_price"), min_value=0.0, value=round(base_cogs * 1.3, 2),
+                                step=0.1, format="%.2f", key="vs_price_input")
+    with c4:
+        margin = st.number_input(t("vs_margin"), min_value=0.0, max_value=99.0, value=20.0,
+                                 step=1.0, key="vs_margin_input")
+
+    sweep = volume_sweep(pack_routing(steps_data), v_min, v_max, n_points=10_000)
+    breakeven = breakeven_volume(sweep, price)
+    target_volume = breakeven_volume(sweep, price, margin / 100)
+
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("vs_variable"), f"{float(variable_cost(sweep, volume)):.2f} {currency}")
+    with m2:
+        st.metric(t("vs_fixed"), f"{sweep['fixed']:,.0f} {currency}")
+    with m3:
+        st.metric(t("vs_breakeven"),
+                  f"{breakeven:,.0f}" if breakeven is not None else t("vs_unreachable"))
+    with m4:
+        st.metric(t("vs_target_volume"),
+                  f"{target_volume:,.0f}" if target_volume is not None else t("vs_unreachable"))
+
+    markers = {
+        t("vs_current"): (volume, "#7f8c8d"),
+        t("vs_breakeven"): (breakeven, COLORS["foh"]),
+        t("vs_target_volume"): (target_volume, COLORS["voh"]),
+    }
+    fig = build_volume_chart(sweep, price, price * (1 - margin / 100), markers, currency)
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Decade table (the full grid stays in the chart)
+    decades = np.unique(np.clip(
+        10.0 ** np.arange(np.floor(np.log10(v_min)), np.ceil(np.log10(v_max)) + 1), v_min, v_max,
+    ))
+    cogs = cogs_at_volumes(sweep, decades)
+    rty = sweep["rty"]
+    st.dataframe(pd.DataFrame({
+        t("volume"): [f"{v:,.0f}" for v in decades],
+        t("cogs_per_unit"): [f"{c:.2f}" for c in cogs],
+        t("total_cogs"): [f"{c * v:,.0f}" for c, v in zip(cogs, decades)],
+        t("units_to_start"): [f"{(v / rty if rty > 0 else v):,.0f}" for v in decades],
+    }), use_container_width=True, hide_index=True)
+
+
+# ─── PAGE: Goal seek ────────────────────────────────────────────────────────────
+def page_goal_seek():
+    st.title(t("gs_title"))
+    st.markdown(t("gs_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    packed = pack_routing(steps_data)
+    base_cogs = cached_cogs(steps_data, volume)["cogs_per_unit"]
+
+    mode = st.radio(t("gs_mode"), [t("gs_mode_cogs"), t("gs_mode_margin")], horizontal=True,
+                    key="gs_mode_input")
+    c1, c2 = st.columns(2)
+    if mode == t("gs_mode_cogs"):
+        with c1:
+            target = st.number_input(t("gs_target"), min_value=0.0, value=round(base_cogs * 0.9, 2),
+                                     step=0.1, format="%.2f", key="gs_target_input")
+    else:
+        with c1:
+            price = st.number_input(t("vs_price"), min_value=0.0, value=round(base_cogs * 1.3, 2),
+                                    step=0.1, format="%.2f", key="gs_price_input")
+        with c2:
+            margin = st.number_input(t("vs_margin"), min_value=0.0, max_value=99.0, value=30.0,
+                                     step=1.0, key="gs_margin_input")
+        target = target_from_margin(price, margin / 100)
+
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric(t("gs_base"), f"{base_cogs:.2f} {currency}")
+    with m2:
+        st.metric(t("gs_target"), f"{target:.2f} {currency}",
+                  delta=f"{(target / base_cogs - 1) * 100:+.1f}%" if base_cogs > 0 else None,
+                  delta_color="off")
+    f1, f2 = st.columns(2)
+    with f1:
+        reachable_only = st.checkbox(t("gs_reachable_only"), value=True, key="gs_reachable_input")
+    with f2:
+        include_prices = st.checkbox(t("gs_include_prices"), value=False, key="gs_prices_input")
+
+    # Single parameter: closed form for every column in one pass
+    st.divider()
+    st.subheader(t("gs_single_title"))
+    st.caption(t("gs_single_desc"))
+    required = required_values(packed, volume, target)
+    current = param_vector(packed)
+    needed = np.concatenate([required[key] for key in STEP_PARAMS] + [required["price"]])
+    keys = [key for key, _ in param_columns(packed)]
+    labels = param_labels(steps_data, packed)
+    scale = np.array([100.0 if key in RATIO_PARAMS else 1.0 for key in keys])
+
+    keep = np.array([include_prices or key != "price" for key in keys], dtype=bool)
+    if reachable_only:
+        keep &= ~np.isnan(needed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (needed / current - 1) * 100
+    rows = [(t("volume"), float(volume), required["volume"], (required["volume"] / volume - 1) * 100)]
+    if reachable_only and np.isnan(required["volume"]):
+        rows = []
+    idx = np.flatnonzero(keep)
+    rows += list(zip(
+        [labels[i] for i in idx], (current * scale)[idx], (needed * scale)[idx], change[idx],
+    ))
+    df = pd.DataFrame(rows, columns=[t("param_name"), t("gs_current"), t("gs_required"), t("gs_change")])
+    df = df.iloc[np.argsort(np.nan_to_num(np.abs(df[t("gs_change")].to_numpy()), nan=np.inf),
+                            kind="stable")]
+    st.dataframe(
+        df.style.format({
+            t("gs_current"): "{:,.4g}", t("gs_required"): "{:,.4g}", t("gs_change"): "{:+.1f}",
+        }, na_rep=t("gs_unreachable")),
+        use_container_width=True, hide_index=True,
+    )
+
+    # Proportional change per group: vectorized bisection over all groups
+    st.subheader(t("gs_group_title"))
+    st.caption(t("gs_group_desc"))
+    groups = parameter_groups(packed)
+    factors = solve_groups(packed, volume, target, list(groups.values()))
+    rows = [{
+        t("gs_group"): t("gs_all_prices") if key == "price" else t("gs_all_steps").format(param=t(key)),
+        t("gs_scale"): factor,
+        t("gs_change"): (factor - 1) * 100,
+    } for key, factor in zip(groups, factors) if not (reachable_only and np.isnan(factor))]
+    st.dataframe(
+        pd.DataFrame(rows, columns=[t("gs_group"), t("gs_scale"), t("gs_change")]).style.format({
+            t("gs_scale"): "{:.4f}", t("gs_change"): "{:+.1f}",
+        }, na_rep=t("gs_unreachable")),
+        use_container_width=True, hide_index=True,
+    )
+
+
+# ─── PAGE: Improvement budget ───────────────────────────────────────────────────
+def default_levers(steps_data: list) -> pd.DataFrame:
+    """Default levers: +1 pt of yield and +10% UPH on every step."""
+    rows = []
+    for step in steps_data:
+        name = get_step_name(step)
+        rows.append({t("scenario_param"): t("yield"), t("scenario_step_select"): name,
+                     t("ib_unit"): 0.01, t("ib_cost"): 10000.0, t("ib_limit"): None})
+        rows.append({t("scenario_param"): t("uph"), t("scenario_step_select"): name,
+                     t("ib_unit"): round(step.get("uph", 60) * 0.1, 1), t("ib_cost"): 20000.0,
+                     t("ib_limit"): None})
+    return pd.DataFrame(rows, columns=[t("scenario_param"), t("scenario_step_select"),
+                                       t("ib_unit"), t("ib_cost"), t("ib_limit")])
+
+
+def page_budget():
+    st.title(t("ib_title"))
+    st.markdown(t("ib_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    step_names = [get_step_name(s) for s in steps_data]
+    param_labels_ = [t(k) for k in STEP_PARAMS]
+
+    editor_key = f"ib_levers_{st.session_state.get('lang', 'fr')}_{len(steps_data)}"
+    if editor_key not in st.session_state:
+        st.session_state[editor_key] = default_levers(steps_data)
+    st.subheader(t("ib_levers"))
+    table = st.data_editor(
+        st.session_state[editor_key],
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            t("scenario_param"): st.column_config.SelectboxColumn(options=param_labels_, required=True),
+            t("scenario_step_select"): st.column_config.SelectboxColumn(options=step_names, required=True),
+            t("ib_unit"): st.column_config.NumberColumn(format="%.4g", required=True),
+            t("ib_cost"): st.column_config.NumberColumn(min_value=0.0, format="%.0f", required=True),
+            t("ib_limit"): st.column_config.NumberColumn(format="%.4g", help=t("ib_limit_help")),
+        },
+        key=f"{editor_key}_editor",
+    )
+
+    levers, lever_labels = [], []
+    for row_idx, row in table.iterrows():
+        try:
+            key = STEP_PARAMS[param_labels_.index(row[t("scenario_param")])]
+            idx = step_names.index(row[t("scenario_step_select")])
+            limit = row[t("ib_limit")]
+            levers.append({
+                "key": key, "idx": idx,
+                "unit": float(row[t("ib_unit")]), "cost": float(row[t("ib_cost")]),
+                "limit": None if pd.isna(limit) else float(limit),
+            })
+        except (ValueError, TypeError) as exc:
+            st.error(f"{t('ib_invalid')} #{row_idx + 1}: {exc}")
+            return
+        lever_labels.append(f"{step_names[idx]} - {t(key)}")
+    if not levers:
+        return
+
+    budget = st.number_input(t("ib_budget"), min_value=0.0, value=100000.0, step=10000.0,
+                             format="%.0f", key="ib_budget_input")
+    packed = pack_routing(steps_data)
+    try:
+        plan = optimize_budget(packed, volume, levers, budget)
+        curve = budget_curve(packed, volume, levers, max(budget * 2, 1.0))
+    except ValueError as exc:
+        st.error(f"{t('ib_invalid')}: {exc}")
+        return
+
+    base_cogs = plan["base_cogs"]
+    savings = (base_cogs - plan["cogs_per_unit"]) * volume
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("ib_base"), f"{base_cogs:.2f} {currency}")
+    with m2:
+        st.metric(t("ib_optimized"), f"{plan['cogs_per_unit']:.2f} {currency}",
+                  delta=f"{plan['cogs_per_unit'] - base_cogs:.2f}", delta_color="inverse")
+    with m3:
+        st.metric(t("ib_savings"), f"{savings:,.0f} {currency}")
+    with m4:
+        st.metric(t("ib_payback"), t("ib_years").format(years=budget / savings) if savings > 0 else "-")
+
+    st.subheader(t("ib_plan"))
+    current = np.array([steps_data[lv["idx"]][lv["key"]] for lv in levers], dtype=float)
+    bought = plan["units"] > 1e-9
+    st.dataframe(pd.DataFrame({
+        t("ib_lever"): [label for label, b in zip(lever_labels, bought) if b],
+        t("gs_current"): current[bought],
+        t("ib_new_value"): plan["values"][bought],
+        t("ib_units"): plan["units"][bought].round(2),
+        t("ib_spent"): plan["spent"][bought].round(0),
+    }).sort_values(t("ib_spent"), ascending=False).style.format({
+        t("gs_current"): "{:,.4g}", t("ib_new_value"): "{:,.4g}", t("ib_spent"): "{:,.0f}",
+    }), use_container_width=True, hide_index=True)
+
+    chart1, chart2 = st.columns(2)
+    with chart1:
+        st.plotly_chart(build_budget_chart(curve, budget, currency), use_container_width=True)
+    with chart2:
+        st.plotly_chart(build_marginal_chart(curve, budget, currency), use_container_width=True)
+
+
+# ─── PAGE: Operator allocation ──────────────────────────────────────────────────
+def page_staffing():
+    st.title(t("op_title"))
+    st.markdown(t("op_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    step_names = [get_step_name(s) for s in steps_data]
+
+    editor_key = f"op_curves_{st.session_state.get('lang', 'fr')}_{len(steps_data)}"
+    if editor_key not in st.session_state:
+        st.session_state[editor_key] = pd.DataFrame({
+            t("step"): step_names,
+            t("op_curve"): [
+                ", ".join(f"{n:g}:{u:g}" for n, u in s.get("staffing", [])) for s in steps_data
+            ],
+        })
+    table = st.data_editor(
+        st.session_state[editor_key],
+        use_container_width=True,
+        hide_index=True,
+        disabled=[t("step")],
+        column_config={t("op_curve"): st.column_config.TextColumn(help=t("op_curve_help"))},
+        key=f"{editor_key}_editor",
+    )
+
+    # Staffing curves from the table, on shallow copies of the steps
+    staffed = []
+    for step, name, text in zip(steps_data, step_names, table[t("op_curve")]):
+        step = {k: v for k, v in step.items() if k != "staffing"}
+        try:
+            points = [[float(v) for v in p.split(":")] for p in str(text or "").split(",") if p.strip()]
+            if any(len(p) != 2 or p[0] < 0 or p[1] <= 0 for p in points):
+                raise ValueError(text)
+        except ValueError:
+            st.error(f"{t('op_invalid')} ({name}): {text}")
+            return
+        if points:
+            step["staffing"] = points
+        staffed.append(step)
+
+    packed = pack_routing(steps_data)
+    options = staffing_options(staffed, packed)
+    min_heads = int(sum(n.min() for n, _ in options))
+    c1, c2 = st.columns(2)
+    with c1:
+        headcount = st.number_input(
+            t("op_headcount"), min_value=0, value=int(packed["nb_operators"].sum()) + 2, step=1,
+            key="op_headcount_input",
+        )
+    with c2:
+        objective = st.radio(t("op_objective"), [t("op_min_cogs"), t("op_max_throughput")],
+                             horizontal=True, key="op_objective_input")
+
+    result = allocate_operators(
+        packed, volume, options, headcount,
+        objective="cogs" if objective == t("op_min_cogs") else "throughput",
+    )
+    if result is None:
+        st.warning(t("op_infeasible").format(n=min_heads))
+        return
+
+    base_cogs = cached_cogs(steps_data, volume)["cogs_per_unit"]
+    base_throughput = line_throughput(packed)
+    st.divider()
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric(t("cogs_per_unit"), f"{result['cogs_per_unit']:.2f} {currency}",
+                  delta=f"{result['cogs_per_unit'] - base_cogs:.2f}", delta_color="inverse")
+    with m2:
+        st.metric(t("op_throughput"), f"{result['throughput']:.1f}",
+                  delta=f"{result['throughput'] - base_throughput:.1f}")
+    with m3:
+        st.metric(t("op_used"), f"{result['operators']} / {headcount}")
+
+    current_ops = packed["nb_operators"].astype(int).tolist()
+    st.dataframe(pd.DataFrame({
+        t("step"): step_names,
+        t("op_current_ops"): current_ops,
+        t("op_new_ops"): result["nb_operators"],
+        t("op_current_uph"): packed["uph"].round(1),
+        t("op_new_uph"): result["uph"].round(1),
+    }), use_container_width=True, hide_index=True)
+    st.plotly_chart(build_staffing_chart(step_names, current_ops, result["nb_operators"].tolist()),
+                    use_container_width=True)
+
+    if st.button(t("op_apply"), key="op_apply_btn"):
+        for step, new_step_, n, uph in zip(steps_data, staffed, result["nb_operators"], result["uph"]):
+            step["nb_operators"] = int(n)
+            step["uph"] = round(float(uph), 1)
+            if "staffing" in new_step_:
+                step["staffing"] = new_step_["staffing"]
+            else:
+                step.pop("staffing", None)
+        st.toast(t("op_applied"))
+        st.rerun()
+
+
+# ─── PAGE: Time-phased COGS ─────────────────────────────────────────────────────
+def page_time_phased():
+    st.title(t("tp_title"))
+    st.markdown(t("tp_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    step_names = [get_step_name(s) for s in steps_data]
+    lang = st.session_state.get("lang", "fr")
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        n_years = st.number_input(t("tp_years"), min_value=1, max_value=10, value=5, step=1,
+                                  key="tp_years_input")
+    with c2:
+        granularity_labels = {g: t(f"tp_{g}") for g in PERIODS_PER_YEAR}
+        granularity = st.radio(t("tp_granularity"), list(granularity_labels),
+                               format_func=granularity_labels.get, horizontal=True,
+                               key="tp_granularity_input")
+    with c3:
+        reference = st.number_input(t("tp_reference"), min_value=1, value=int(volume), step=1000,
+                                    help=t("tp_reference_help"), key="tp_reference_input")
+
+    # Volumes and FOH per year (one FOH column per step)
+    years_key = f"tp_years_{lang}_{len(steps_data)}_{n_years}"
+    if years_key not in st.session_state:
+        foh = {}
+        for step, name in zip(steps_data, step_names):
+            schedule = step.get("foh_schedule") or [step["foh_total"]]
+            foh[name] = [float(schedule[min(y, len(schedule) - 1)]) for y in range(n_years)]
+        st.session_state[years_key] = pd.DataFrame({
+            t("tp_year"): list(range(1, n_years + 1)),
+            t("volume"): [float(volume)] * n_years,
+            **foh,
+        })
+    years = st.data_editor(
+        st.session_state[years_key], use_container_width=True, hide_index=True,
+        disabled=[t("tp_year")], key=f"{years_key}_editor",
+    )
+    st.caption(t("tp_year_help"))
+
+    # Learning rates per step
+    learning_key = f"tp_learning_{lang}_{len(steps_data)}"
+    if learning_key not in st.session_state:
+        learning = [step.get("learning") or {} for step in steps_data]
+        st.session_state[learning_key] = pd.DataFrame({
+            t("step"): step_names,
+            t("tp_learning_uph"): [float(lr.get("uph", 1.0)) * 100 for lr in learning],
+            t("tp_learning_yield"): [float(lr.get("yield", 1.0)) * 100 for lr in learning],
+            t("tp_uph_max"): [float(lr.get("uph_max") or 0.0) for lr in learning],
+        })
+    rates = st.data_editor(
+        st.session_state[learning_key], use_container_width=True, hide_index=True,
+        disabled=[t("step")],
+        column_config={
+            t("tp_learning_uph"): st.column_config.NumberColumn(
+                min_value=51.0, max_value=100.0, format="%.1f", help=t("tp_learning_help")),
+            t("tp_learning_yield"): st.column_config.NumberColumn(
+                min_value=51.0, max_value=100.0, format="%.1f", help=t("tp_learning_help")),
+            t("tp_uph_max"): st.column_config.NumberColumn(min_value=0.0),
+        },
+        key=f"{learning_key}_editor",
+    )
+
+    # Steps carrying the edited learning curves and FOH schedules
+    staged = []
+    for i, step in enumerate(steps_data):
+        learning = {
+            "uph": float(rates[t("tp_learning_uph")].iloc[i]) / 100,
+            "yield": float(rates[t("tp_learning_yield")].iloc[i]) / 100,
+        }
+        if float(rates[t("tp_uph_max")].iloc[i]) > 0:
+            learning["uph_max"] = float(rates[t("tp_uph_max")].iloc[i])
+        staged.append({**step, "learning": learning,
+                       "foh_schedule": years[step_names[i]].astype(float).tolist()})
+
+    try:
+        phased = time_phased_cogs(
+            staged, pack_routing(steps_data), years[t("volume")].astype(float).tolist(),
+            PERIODS_PER_YEAR[granularity], reference,
+        )
+    except ValueError as exc:
+        st.error(str(exc))
+        return
+
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("tp_life_average"), f"{phased['life_average']:.2f} {currency}")
+    with m2:
+        st.metric(t("tp_total_cost"), f"{phased['total_cost']:,.0f} {currency}")
+    with m3:
+        st.metric(t("tp_first"), f"{phased['cogs_per_unit'][0]:.2f} {currency}")
+    with m4:
+        st.metric(t("tp_last"), f"{phased['cogs_per_unit'][-1]:.2f} {currency}")
+
+    st.plotly_chart(build_time_phased_chart(phased, currency), use_container_width=True)
+    st.dataframe(pd.DataFrame({
+        t("tp_period"): phased["labels"],
+        t("volume"): phased["volumes"].round(0),
+        t("cogs_per_unit"): phased["cogs_per_unit"].round(4),
+        t("tp_cost"): phased["cost"].round(2),
+        t("tp_cumulative_cost"): phased["cumulative_cost"].round(2),
+        t("tp_average_to_date"): phased["average_to_date"].round(4),
+        t("rty"): phased["rty"].round(4),
+    }), use_container_width=True, hide_index=True)
+
+    if st.button(t("tp_save"), key="tp_save_btn"):
+        for step, new in zip(steps_data, staged):
+            learning = {k: v for k, v in new["learning"].items() if k == "uph_max" or v < 1}
+            if learning:
+                step["learning"] = learning
+            else:
+                step.pop("learning", None)
+            schedule = new["foh_schedule"]
+            if any(value != step["foh_total"] for value in schedule):
+                step["foh_schedule"] = schedule
+            else:
+                step.pop("foh_schedule", None)
+        st.toast(t("tp_saved"))
+
+
+# ─── PAGE: Capacity ─────────────────────────────────────────────────────────────
+def page_capacity():
+    st.title(t("cap_title"))
+    st.markdown(t("cap_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    step_names = [get_step_name(s) for s in steps_data]
+    lang = st.session_state.get("lang", "fr")
+
+    c1, c2, c3, c4 = st.columns(4)
+    shift = {}
+    for col, key, label, max_value in (
+        (c1, "shifts_per_day", "cap_shifts", 3),
+        (c2, "hours_per_shift", "cap_hours", 24),
+        (c3, "days_per_week", "cap_days", 7),
+        (c4, "weeks_per_year", "cap_weeks", 52),
+    ):
+        with col:
+            shift[key] = st.number_input(t(label), min_value=1, max_value=max_value,
+                                         value=int(DEFAULT_SHIFT[key]), step=1, key=f"cap_{key}")
+
+    editor_key = f"cap_resources_{lang}_{len(steps_data)}"
+    if editor_key not in st.session_state:
+        st.session_state[editor_key] = pd.DataFrame({
+            t("step"): step_names,
+            t("cap_resource"): [str(s.get("resource") or "") for s in steps_data],
+            t("cap_stations"): [int(s.get("stations", 1) or 1) for s in steps_data],
+        })
+    table = st.data_editor(
+        st.session_state[editor_key], use_container_width=True, hide_index=True,
+        disabled=[t("step")],
+        column_config={
+            t("cap_resource"): st.column_config.TextColumn(help=t("cap_resource_help")),
+            t("cap_stations"): st.column_config.NumberColumn(min_value=1, step=1),
+        },
+        key=f"{editor_key}_editor",
+    )
+
+    # Steps with the edited resources, then the other products sharing them
+    staged = []
+    for i, step in enumerate(steps_data):
+        step = {k: v for k, v in step.items() if k not in ("resource", "stations")}
+        resource = str(table[t("cap_resource")].iloc[i] or "").strip()
+        if resource:
+            step["resource"] = resource
+        stations = int(table[t("cap_stations")].iloc[i] or 1)
+        if stations != 1:
+            step["stations"] = stations
+        staged.append(step)
+    products = [normalize_product({
+        "volume": st.session_state.volume,
+        "steps": staged,
+        "subassemblies": st.session_state.get("subassemblies", {}),
+    })]
+    uploaded = st.file_uploader(t("cap_others"), type=["json"], accept_multiple_files=True,
+                                help=t("cap_others_help"), key="cap_others_upload")
+    for file in uploaded or []:
+        try:
+            products.append(normalize_product(json.loads(file.getvalue().decode("utf-8-sig"))))
+        except (ValueError, AttributeError) as exc:
+            st.error(f"{t('cap_invalid_file')} ({file.name}): {exc}")
+            return
+
+    try:
+        portfolio = pack_portfolio(products)
+    except ValueError as exc:
+        st.error(str(exc))
+        return
+    res = capacity(portfolio, shift)
+    n_steps = len(steps_data)
+    bottleneck = int(res["segment_bottleneck"][0])
+    utilization = res["resource_utilization"][portfolio["resource"][:n_steps]]
+
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("cap_available"), f"{res['available']:,.0f} h")
+    with m2:
+        st.metric(t("cap_bottleneck_step"), step_names[bottleneck] if bottleneck >= 0 else "—")
+    with m3:
+        st.metric(t("cap_bottleneck_util"),
+                  f"{utilization[bottleneck]:.0%}" if bottleneck >= 0 else "—")
+    with m4:
+        st.metric(t("cap_overloaded"), int((res["resource_utilization"] > 1).sum()))
+
+    resource_names = [
+        str(key) if not isinstance(key, tuple) else "—"
+        for key in portfolio["resources"]
+    ]
+    st.dataframe(pd.DataFrame({
+        t("step"): step_names,
+        t("cap_resource"): [resource_names[r] for r in portfolio["resource"][:n_steps]],
+        t("cap_entering"): res["entering"][:n_steps].round(0),
+        t("cap_hours_needed"): res["hours"][:n_steps].round(1),
+        t("cap_load"): res["load"][:n_steps].round(3),
+        t("cap_stations_needed"): res["stations_needed"][:n_steps].astype(int),
+        t("cap_stations"): portfolio["stations"][:n_steps].astype(int),
+        t("cap_utilization"): (utilization * 100).round(1),
+        t("cap_bottleneck"): ["⚠" if i == bottleneck else "" for i in range(n_steps)],
+    }), use_container_width=True, hide_index=True)
+    st.plotly_chart(build_capacity_chart(step_names, utilization, bottleneck),
+                    use_container_width=True)
+
+    # Shared resources: load of every product on them
+    shared = [r for r, key in enumerate(portfolio["resources"]) if not isinstance(key, tuple)]
+    if shared:
+        st.subheader(t("cap_resources"))
+        counts = np.bincount(portfolio["resource"], minlength=len(portfolio["resources"]))
+        st.dataframe(pd.DataFrame({
+            t("cap_resource"): [resource_names[r] for r in shared],
+            t("cap_n_steps"): counts[shared],
+            t("cap_hours_needed"): res["resource_hours"][shared].round(1),
+            t("cap_load"): res["resource_load"][shared].round(3),
+            t("cap_stations_needed"): res["resource_stations_needed"][shared].astype(int),
+            t("cap_stations"): res["resource_stations"][shared].astype(int),
+            t("cap_utilization"): (res["resource_utilization"][shared] * 100).round(1),
+            t("cap_bottleneck"): ["⚠" if r == res["bottleneck"] else "" for r in shared],
+        }), use_container_width=True, hide_index=True)
+
+    if st.button(t("cap_apply"), key="cap_apply_btn"):
+        for step, new in zip(steps_data, staged):
+            for key in ("resource", "stations"):
+                if key in new:
+                    step[key] = new[key]
+                else:
+                    step.pop(key, None)
+        st.toast(t("cap_applied"))
+
+
+# ─── PAGE: Portfolio ────────────────────────────────────────────────────────────
+def page_portfolio():
+    st.title(t("pf_title"))
+    st.markdown(t("pf_desc"))
+
+    lang = st.session_state.get("lang", "fr")
+    currency = st.session_state.get("currency", "EUR")
+    products, names = [], []
+    if st.session_state.steps_data is not None and st.checkbox(
+            t("pf_include_current"), value=True, key="pf_include_current_input"):
+        products.append(normalize_product({
+            "volume": st.session_state.volume,
+            "steps": st.session_state.steps_data,
+            "subassemblies": st.session_state.get("subassemblies", {}),
+        }))
+        names.append(t("pf_current"))
+    uploaded = st.file_uploader(t("pf_upload"), type=["json"], accept_multiple_files=True,
+                                key="pf_upload_input")
+    for file in uploaded or []:
+        try:
+            product = normalize_product(json.loads(file.getvalue().decode("utf-8-sig")))
+        except (ValueError, AttributeError) as exc:
+            st.error(f"{t('cap_invalid_file')} ({file.name}): {exc}")
+            return
+        products.append(product)
+        name = product["name"]
+        names.append(name.get(lang, file.name) if isinstance(name, dict) else str(name))
+    if not products:
+        st.info(t("pf_empty"))
+        return
+
+    driver_labels = {d: t(f"pf_driver_{d}") for d in ("hours", "volume")}
+    driver = st.radio(t("pf_driver"), list(driver_labels), horizontal=True,
+                      format_func=driver_labels.get, key="pf_driver_input")
+    try:
+        portfolio = pack_portfolio(products)
+    except ValueError as exc:
+        st.error(str(exc))
+        return
+
+    # Shared resources: annual FOH to allocate
+    shared = [r for r, key in enumerate(portfolio["resources"]) if not isinstance(key, tuple)]
+    if shared:
+        st.subheader(t("pf_resources"))
+        res_key = f"pf_resources_{lang}_" + "|".join(str(portfolio["resources"][r]) for r in shared)
+        if res_key not in st.session_state:
+            st.session_state[res_key] = pd.DataFrame({
+                t("cap_resource"): [str(portfolio["resources"][r]) for r in shared],
+                t("pf_foh"): portfolio["resource_foh"][shared],
+            })
+        table = st.data_editor(
+            st.session_state[res_key], use_container_width=True, hide_index=True,
+            disabled=[t("cap_resource")],
+            column_config={t("pf_foh"): st.column_config.NumberColumn(min_value=0.0, format="%.0f")},
+            key=f"{res_key}_editor",
+        )
+        portfolio["resource_foh"][shared] = table[t("pf_foh")].astype(float).to_numpy()
+    else:
+        st.info(t("pf_no_shared"))
+
+    vol_key = f"pf_volumes_{lang}_{len(products)}_" + "|".join(names)
+    if vol_key not in st.session_state:
+        st.session_state[vol_key] = pd.DataFrame({
+            t("pf_product"): names, t("volume"): portfolio["volume"],
+        })
+    st.subheader(t("pf_volumes"))
+    volumes = st.data_editor(
+        st.session_state[vol_key], use_container_width=True, hide_index=True,
+        disabled=[t("pf_product")],
+        column_config={t("volume"): st.column_config.NumberColumn(min_value=0, step=1000)},
+        key=f"{vol_key}_editor",
+    )
+
+    # Keep the costing across reruns: volume edits are applied incrementally
+    key = model_key(portfolio, 0.0, driver, portfolio["resources"], portfolio["resource_foh"].tobytes())
+    costing = st.session_state.get("pf_costing")
+    if costing is None or st.session_state.get("pf_costing_key") != key:
+        costing = PortfolioCosting(portfolio, driver)
+        st.session_state.pf_costing = costing
+        st.session_state.pf_costing_key = key
+        st.session_state.pf_standalone = PortfolioCosting(portfolio, "standalone")
+    standalone_costing = st.session_state.pf_standalone
+    recosted = set()
+    for p, volume in enumerate(volumes[t("volume")].astype(float).tolist()):
+        if volume != costing.volume[p]:
+            recosted.update(costing.set_volume(p, volume).tolist())
+            standalone_costing.set_volume(p, volume)
+    res = costing.result()
+    standalone = standalone_costing.result()["cogs_per_unit"]
+    delta = res["cogs_per_unit"] - standalone
+
+    st.divider()
+    total_volume = costing.volume.sum()
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric(t("pf_total"), f"{res['total_cogs'].sum():,.0f} {currency}")
+    with m2:
+        st.metric(t("pf_avg_delta"),
+                  f"{(delta * costing.volume).sum() / total_volume:+.2f} {currency}"
+                  if total_volume > 0 else "—")
+    with m3:
+        st.metric(t("pf_recosted"), f"{len(recosted)} / {len(products)}")
+
+    st.dataframe(pd.DataFrame({
+        t("pf_product"): names,
+        t("volume"): costing.volume.round(0),
+        t("pf_standalone"): standalone.round(4),
+        t("pf_cogs"): res["cogs_per_unit"].round(4),
+        t("pf_delta"): delta.round(4),
+        t("total_cogs"): res["total_cogs"].round(2),
+    }), use_container_width=True, hide_index=True)
+    st.plotly_chart(build_portfolio_chart(names[:30], standalone[:30], res["cogs_per_unit"][:30]),
+                    use_container_width=True)
+
+
+# ─── PAGE: Supplier selection ───────────────────────────────────────────────────
+def page_sourcing():
+    st.title(t("src_title"))
+    st.markdown(t("src_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    lang = st.session_state.get("lang", "fr")
+    comps = [comp for step in steps_data for comp in step.get("bom", [])]
+    labels = [f"{get_step_name(step)} - {get_component_name(comp)}"
+              for step in steps_data for comp in step.get("bom", [])]
+    if not comps:
+        st.info(t("no_data"))
+        return
+
+    # Quotes: one row per (component, supplier) offer
+    st.subheader(t("src_quotes"))
+    quotes_key = f"src_quotes_{lang}_{len(comps)}"
+    if quotes_key not in st.session_state:
+        rows = [(labels[j], quote) for j, comp in enumerate(comps) for quote in comp.get("quotes") or []]
+        st.session_state[quotes_key] = pd.DataFrame({
+            t("src_component"): [label for label, _ in rows],
+            t("src_supplier"): [str(quote.get("supplier") or "") for _, quote in rows],
+            t("price"): [float(quote.get("price", 0) or 0) for _, quote in rows],
+            t("src_moq"): [float(quote.get("moq", 0) or 0) for _, quote in rows],
+            t("src_tiers"): [", ".join(f"{q:g}:{p:g}" for q, p in quote.get("tiers") or [])
+                             for _, quote in rows],
+            t("src_fixed"): [float(quote.get("fixed", 0) or 0) for _, quote in rows],
+        }).astype({t("src_component"): "string", t("src_supplier"): "string",
+                   t("src_tiers"): "string"})
+    table = st.data_editor(
+        st.session_state[quotes_key], use_container_width=True, hide_index=True,
+        num_rows="dynamic",
+        column_config={
+            t("src_component"): st.column_config.SelectboxColumn(options=labels, required=True),
+            t("src_supplier"): st.column_config.TextColumn(required=True),
+            t("price"): st.column_config.NumberColumn(min_value=0.0, format="%.4f"),
+            t("src_moq"): st.column_config.NumberColumn(min_value=0.0),
+            t("src_tiers"): st.column_config.TextColumn(help=t("src_tiers_help")),
+            t("src_fixed"): st.column_config.NumberColumn(min_value=0.0),
+        },
+        key=f"{quotes_key}_editor",
+    )
+
+    # Quotes from the table, on shallow copies of the steps
+    line_of = {label: j for j, label in enumerate(labels)}
+    offers = [[] for _ in comps]
+    for _, row in table.iterrows():
+        label, supplier = row[t("src_component")], row[t("src_supplier")]
+        supplier = str(supplier).strip() if pd.notna(supplier) else ""
+        if label not in line_of or not supplier:
+            continue
+        text = str(row[t("src_tiers")]) if pd.notna(row[t("src_tiers")]) else ""
+        try:
+            tiers = [[float(v) for v in p.split(":")] for p in text.split(",") if p.strip()]
+            if any(len(p) != 2 or p[0] < 0 or p[1] < 0 for p in tiers):
+                raise ValueError(text)
+        except ValueError:
+            st.error(f"{t('src_invalid')} ({label}, {supplier}): {text}")
+            return
+        quote = {"supplier": supplier, "price": float(row[t("price")] or 0)}
+        if float(row[t("src_moq")] or 0) > 0:
+            quote["moq"] = float(row[t("src_moq")])
+        if tiers:
+            quote["tiers"] = tiers
+        if float(row[t("src_fixed")] or 0) > 0:
+            quote["fixed"] = float(row[t("src_fixed")])
+        offers[line_of[label]].append(quote)
+    k = 0
+    staged = []
+    for step in steps_data:
+        bom = []
+        for comp in step.get("bom", []):
+            comp = {key: v for key, v in comp.items() if key != "quotes"}
+            if offers[k]:
+                comp["quotes"] = offers[k]
+            bom.append(comp)
+            k += 1
+        staged.append({**step, "bom": bom})
+
+    names = sorted({quote["supplier"] for quotes in offers for quote in quotes})
+    if not names:
+        st.info(t("src_no_quotes"))
+        return
+
+    st.subheader(t("src_suppliers"))
+    known = st.session_state.get("suppliers") or {}
+    suppliers_key = f"src_suppliers_{lang}_" + "|".join(names)
+    if suppliers_key not in st.session_state:
+        st.session_state[suppliers_key] = pd.DataFrame({
+            t("src_supplier"): names,
+            t("src_supplier_fixed"): [float((known.get(n) or {}).get("fixed", 0) or 0) for n in names],
+        })
+    fixed_table = st.data_editor(
+        st.session_state[suppliers_key], use_container_width=True, hide_index=True,
+        disabled=[t("src_supplier")],
+        column_config={t("src_supplier_fixed"): st.column_config.NumberColumn(min_value=0.0)},
+        key=f"{suppliers_key}_editor",
+    )
+    suppliers = {
+        name: {**(known.get(name) or {}), "fixed": float(fixed)}
+        for name, fixed in zip(fixed_table[t("src_supplier")], fixed_table[t("src_supplier_fixed")])
+    }
+    max_suppliers = st.number_input(t("src_max_suppliers"), min_value=0, max_value=len(names),
+                                    value=0, step=1, key="src_max_suppliers_input")
+
+    # Units bought per year: expected visits of a non-linear routing, else the cascade
+    packed = pack_routing(steps_data)
+    weights = None
+    try:
+        graph = routing_graph(steps_data)
+        if not is_linear(graph):
+            weights = expected_visits(graph, packed["yield"])[0]
+    except ValueError as exc:
+        st.error(str(exc))
+        return
+    quantity = annual_quantities(packed, volume, weights)
+    quotes = pack_quotes(staged, suppliers)
+    start = time.perf_counter()
+    result = select_suppliers(quotes, quantity, max_suppliers or None)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if result is None:
+        st.warning(t("src_infeasible"))
+        return
+
+    lines = result["lines"]
+    current_prices = component_prices(packed, volume, weights)
+    current_spend = float((quantity[lines] * current_prices[lines]).sum())
+    repriced = [{**step, "bom": [dict(comp) for comp in step["bom"]]} for step in staged]
+    new_comps = [comp for step in repriced for comp in step["bom"]]
+    for j, price in zip(lines.tolist(), result["unit_price"].tolist()):
+        new_comps[j]["price"] = price
+        new_comps[j].pop("tiers", None)
+    base_cogs = cached_cogs(steps_data, volume)["cogs_per_unit"]
+    new_cogs = cached_cogs(repriced, volume)["cogs_per_unit"]
+
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("src_current_spend"), f"{current_spend:,.0f} {currency}")
+    with m2:
+        st.metric(t("src_optimized_spend"), f"{result['total']:,.0f} {currency}",
+                  delta=f"{result['total'] - current_spend:,.0f}", delta_color="inverse")
+    with m3:
+        st.metric(t("cogs_per_unit"), f"{new_cogs:.2f} {currency}",
+                  delta=f"{new_cogs - base_cogs:.2f}", delta_color="inverse")
+    with m4:
+        st.metric(t("src_used"), f"{len(result['suppliers'])} / {len(names)}")
+    st.caption(t("src_solver").format(nodes=result["nodes"], ms=elapsed_ms))
+
+    chosen = result["quote"]
+    st.dataframe(pd.DataFrame({
+        t("src_component"): [labels[j] for j in lines],
+        t("src_annual_qty"): quantity[lines].round(0),
+        t("src_current_price"): current_prices[lines].round(4),
+        t("src_supplier"): [quotes["suppliers"][s] for s in quotes["supplier"][chosen]],
+        t("src_unit_price"): (result["cost"] / np.maximum(quantity[lines], 1e-12)).round(4),
+        t("src_effective_price"): result["unit_price"].round(4),
+    }), use_container_width=True, hide_index=True,
+        column_config={t("src_effective_price"): st.column_config.NumberColumn(
+            help=t("src_effective_help"))})
+
+    if st.button(t("src_apply"), key="src_apply_btn"):
+        for step, new in zip(steps_data, staged):
+            for comp, new_comp in zip(step.get("bom", []), new["bom"]):
+                if "quotes" in new_comp:
+                    comp["quotes"] = new_comp["quotes"]
+                else:
+                    comp.pop("quotes", None)
+        for j, q, price in zip(lines.tolist(), chosen.tolist(), result["unit_price"].tolist()):
+            comps[j]["price"] = round(price, 6)
+            comps[j]["supplier"] = quotes["suppliers"][quotes["supplier"][q]]
+            # The effective price already holds the quote's breaks at this volume
+            comps[j].pop("tiers", None)
+        st.session_state.suppliers = suppliers
+        st.toast(t("src_applied"))
+
+
+# ─── PAGE: Equipment ────────────────────────────────────────────────────────────
+def page_equipment():
+    st.title(t("eq_title"))
+    st.markdown(t("eq_desc"))
+
+    if st.session_state.steps_data is None:
+        st.info(t("no_data"))
+        return
+
+    steps_data = st.session_state.steps_data
+    volume = st.session_state.volume
+    currency = st.session_state.get("currency", "EUR")
+    lang = st.session_state.get("lang", "fr")
+    labels = [f"{i + 1}. {get_step_name(step)}" for i, step in enumerate(steps_data)]
+    method_labels = {method: t(f"eq_{method}") for method in DEPRECIATION_METHODS}
+    method_of = {label: method for method, label in method_labels.items()}
+
+    # Options: one row per (step, equipment) candidate
+    st.subheader(t("eq_options"))
+    options_key = f"eq_options_{lang}_{len(steps_data)}"
+    if options_key not in st.session_state:
+        rows = []
+        for i, step in enumerate(steps_data):
+            equipment = step.get("equipment") or {}
+            selected = int(equipment.get("selected", 0) or 0)
+            rows += [(i, k == selected, option) for k, option in enumerate(equipment.get("options") or [])]
+        st.session_state[options_key] = pd.DataFrame({
+            t("eq_step"): [labels[i] for i, _, _ in rows],
+            t("eq_name"): [str(option.get("name") or "") for _, _, option in rows],
+            t("eq_capex"): [float(option.get("capex", 0) or 0) for _, _, option in rows],
+            t("eq_life"): [int(option.get("life", 5) or 5) for _, _, option in rows],
+            t("eq_method"): [method_labels.get(option.get("method") or "straight_line")
+                             for _, _, option in rows],
+            t("eq_salvage"): [float(option.get("salvage", 0) or 0) for _, _, option in rows],
+            t("eq_maintenance"): [float(option.get("maintenance", 0) or 0) * 100 for _, _, option in rows],
+            t("eq_uph"): [option.get("uph") for _, _, option in rows],
+            t("eq_availability"): [option.get("availability") for _, _, option in rows],
+            t("eq_current"): [current for _, current, _ in rows],
+        }).astype({t("eq_step"): "string", t("eq_name"): "string", t("eq_method"): "string",
+                   t("eq_uph"): float, t("eq_availability"): float, t("eq_current"): bool})
+    table = st.data_editor(
+        st.session_state[options_key], use_container_width=True, hide_index=True,
+        num_rows="dynamic",
+        column_config={
+            t("eq_step"): st.column_config.SelectboxColumn(options=labels, required=True),
+            t("eq_name"): st.column_config.TextColumn(required=True),
+            t("eq_capex"): st.column_config.NumberColumn(min_value=0.0, format="%.0f"),
+            t("eq_life"): st.column_config.NumberColumn(min_value=1, step=1),
+            t("eq_method"): st.column_config.SelectboxColumn(options=list(method_labels.values())),
+            t("eq_salvage"): st.column_config.NumberColumn(min_value=0.0, format="%.0f"),
+            t("eq_maintenance"): st.column_config.NumberColumn(min_value=0.0, format="%.1f"),
+            t("eq_uph"): st.column_config.NumberColumn(min_value=0.0, help=t("eq_blank_help")),
+            t("eq_availability"): st.column_config.NumberColumn(min_value=0.0, max_value=1.0,
+                                                                help=t("eq_blank_help")),
+            t("eq_current"): st.column_config.CheckboxColumn(help=t("eq_current_help")),
+        },
+        key=f"{options_key}_editor",
+    )
+
+    other_key = f"eq_other_{lang}_{len(steps_data)}"
+    if other_key not in st.session_state:
+        st.session_state[other_key] = pd.DataFrame({
+            t("eq_step"): labels,
+            t("eq_other_foh"): [float((step.get("equipment") or {}).get("other_foh", 0) or 0)
+                                for step in steps_data],
+        })
+    other_table = st.data_editor(
+        st.session_state[other_key], use_container_width=True, hide_index=True,
+        disabled=[t("eq_step")],
+        column_config={t("eq_other_foh"): st.column_config.NumberColumn(
+            min_value=0.0, format="%.0f", help=t("eq_other_foh_help"))},
+        key=f"{other_key}_editor",
+    )
+
+    c1, c2 = st.columns(2)
+    with c1:
+        rate = st.number_input(t("eq_rate"), min_value=0.0, max_value=50.0, value=8.0, step=0.5,
+                               key="eq_rate_input")
+    with c2:
+        horizon = st.number_input(t("eq_horizon"), min_value=1, max_value=30, value=5, step=1,
+                                  key="eq_horizon_input")
+
+    # Equipment from the tables, on shallow copies of the steps
+    step_of = {label: i for i, label in enumerate(labels)}
+    options = [[] for _ in steps_data]
+    selected = [0] * len(steps_data)
+    checked = [False] * len(steps_data)
+    for _, row in table.iterrows():
+        label = row[t("eq_step")]
+        name = str(row[t("eq_name")]).strip() if pd.notna(row[t("eq_name")]) else ""
+        if label not in step_of or not name:
+            continue
+        i = step_of[label]
+        option = {
+            "name": name,
+            "capex": float(row[t("eq_capex")] or 0) if pd.notna(row[t("eq_capex")]) else 0.0,
+            "life": int(row[t("eq_life")]) if pd.notna(row[t("eq_life")]) else 5,
+            "method": method_of.get(row[t("eq_method")], "straight_line"),
+        }
+        for key, column, scale in (("salvage", "eq_salvage", 1), ("maintenance", "eq_maintenance", 100)):
+            if pd.notna(row[t(column)]) and float(row[t(column)]) > 0:
+                option[key] = float(row[t(column)]) / scale
+        for key in ("uph", "availability"):
+            if pd.notna(row[t(f"eq_{key}")]):
+                option[key] = float(row[t(f"eq_{key}")])
+        if option.get("salvage", 0) > option["capex"]:
+            st.error(f"{t('eq_invalid')} ({label}, {name})")
+            return
+        current = row[t("eq_current")]
+        if pd.notna(current) and bool(current) and not checked[i]:
+            selected[i] = len(options[i])
+            checked[i] = True
+        options[i].append(option)
+    staged = []
+    for i, step in enumerate(steps_data):
+        step = {k: v for k, v in step.items() if k != "equipment"}
+        if options[i]:
+            step["equipment"] = {"selected": selected[i], "options": options[i],
+                                 "other_foh": float(other_table[t("eq_other_foh")].iloc[i] or 0)}
+            step = apply_equipment(step)
+        staged.append(step)
+
+    table_eq = pack_equipment(staged, int(horizon))
+    if not len(table_eq["steps"]):
+        st.info(t("eq_no_options"))
+        return
+    packed = pack_routing(staged)
+    choice = equipment_configurations(table_eq)
+    start = time.perf_counter()
+    res = evaluate_equipment(packed, table_eq, volume, choice, rate / 100, int(horizon))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    best = res["best"]
+
+    def describe(row):
+        changed = np.flatnonzero(choice[row] != choice[0])
+        if not len(changed):
+            return t("eq_current_config")
+        return "; ".join(f"{labels[table_eq['steps'][s]]}: {table_eq['names'][choice[row][s]]}"
+                         for s in changed)
+
+    st.divider()
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric(t("eq_current_config"), f"{res['cogs_per_unit'][0]:.2f} {currency}")
+    with m2:
+        st.metric(t("cogs_per_unit"), f"{res['cogs_per_unit'][best]:.2f} {currency}",
+                  delta=f"{res['cogs_per_unit'][best] - res['cogs_per_unit'][0]:.2f}",
+                  delta_color="inverse")
+    with m3:
+        st.metric(t("eq_best_npv"), f"{res['npv'][best]:,.0f} {currency}")
+    with m4:
+        payback = res["payback"][best]
+        st.metric(t("eq_payback"), f"{payback:.1f}" if np.isfinite(payback) else t("eq_never"))
+    st.caption(t("eq_solver").format(n=len(choice), ms=elapsed_ms))
+
+    order = np.argsort(-res["npv"], kind="stable")
+    top = order[:25]
+    fig = build_equipment_chart(res["investment"][order[:2000]], res["npv"][order[:2000]],
+                                res["investment"][best], res["npv"][best], currency)
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(pd.DataFrame({
+        t("eq_configuration"): [describe(row) for row in top],
+        t("cogs_per_unit"): res["cogs_per_unit"][top].round(4),
+        t("eq_investment"): res["investment"][top].round(0),
+        t("eq_saving"): res["annual_saving"][top].round(0),
+        t("eq_payback"): [f"{p:.1f}" if np.isfinite(p) else t("eq_never") for p in res["payback"][top]],
+        t("eq_npv"): res["npv"][top].round(0),
+    }), use_container_width=True, hide_index=True)
+
+    pick_labels = {int(row): describe(row) for row in top}
+    pick = st.selectbox(t("eq_pick"), list(pick_labels), format_func=pick_labels.get,
+                        key=f"eq_pick_{len(choice)}")
+    if st.button(t("eq_apply"), key="eq_apply_btn"):
+        for s, i in enumerate(table_eq["steps"].tolist()):
+            equipment = {**staged[i]["equipment"],
+                         "selected": int(choice[pick][s] - table_eq["bounds"][s])}
+            steps_data[i].update(apply_equipment({**staged[i], "equipment": equipment}))
+        for i, step in enumerate(steps_data):
+            if not options[i]:
+                step.pop("equipment", None)
+        # Rebuild the tables from the product (explicit fields, new selection)
+        for key in (options_key, other_key):
+            st.session_state.pop(key, None)
+        st.toast(t("eq_applied"))
+        st.rerun()
+
+
+# ─── PAGE: Change attribution ───────────────────────────────────────────────────
+def _load_upload(file):
+    """Product of an uploaded JSON file, sub-assemblies priced at their COGS/unit."""
+    return resolve_subassemblies(normalize_product(json.loads(file.getvalue().decode("utf-8-sig"))))
+
+
+def page_attribution():
+    st.title(t("at_title"))
+    st.markdown(t("at_desc"))
+
+    currency = st.session_state.get("currency", "EUR")
+    c1, c2 = st.columns(2)
+    with c1:
+        file_before = st.file_uploader(t("at_upload_before"), type=["json"], key="at_before_input")
+    with c2:
+        file_after = st.file_uploader(t("at_upload_after"), type=["json"], key="at_after_input",
+                                      help=t("at_upload_after_help"))
+    if file_before is None or (file_after is None and st.session_state.steps_data is None):
+        st.info(t("at_empty"))
+        return
+    try:
+        before = _load_upload(file_before)
+        after = _load_upload(file_after) if file_after is not None else resolve_subassemblies(
+            normalize_product({
+                "volume": st.session_state.volume,
+                "steps": st.session_state.steps_data,
+                "subassemblies": st.session_state.get("subassemblies", {}),
+            }))
+    except (ValueError, AttributeError) as exc:
+        st.error(f"{t('cap_invalid_file')}: {exc}")
+        return
+
+    c1, c2 = st.columns(2)
+    with c1:
+        exact_max = st.slider(t("at_exact_max"), 1, 16, 12, key="at_exact_max_input",
+                              help=t("at_exact_max_help"))
+    with c2:
+        n_orders = st.number_input(t("at_orders"), min_value=100, max_value=50000, value=2000,
+                                   step=100, key="at_orders_input", help=t("at_orders_help"))
+    start = time.perf_counter()
+    try:
+        res = attribute_change(before["steps"], before["volume"], after["steps"], after["volume"],
+                               exact_max=exact_max, n_orders=int(n_orders), seed=0)
+    except ValueError as exc:
+        st.error(f"{t('at_incompatible')}: {exc}")
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not res["players"]:
+        st.info(t("at_no_change"))
+        return
+
+    packed = pack_routing(before["steps"])
+    labels = param_labels(before["steps"], packed)
+    names = [t("volume") if key == "volume" else labels[param_index(packed, key, idx)]
+             for key, idx in res["players"]]
+    st.divider()
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric(t("at_before"), f"{res['cogs_before']:.4f} {currency}")
+    with m2:
+        st.metric(t("at_after"), f"{res['cogs_after']:.4f} {currency}",
+                  delta=f"{res['delta']:+.4f}", delta_color="inverse")
+    with m3:
+        st.metric(t("at_changes"), len(names))
+    st.caption(t(f"at_method_{res['method']}").format(
+        n=res["evaluations"], ms=elapsed_ms, orders=int(n_orders)))
+
+    order = np.argsort(-np.abs(res["shapley"]), kind="stable")
+    top = order[:15]
+    values = res["shapley"][top]
+    chart_labels = [names[k] for k in top]
+    if len(order) > len(top):
+        values = np.append(values, res["shapley"][order[len(top):]].sum())
+        chart_labels.append(t("at_others").format(n=len(order) - len(top)))
+    st.plotly_chart(build_attribution_chart(chart_labels, values, res["cogs_before"],
+                                            res["cogs_after"], currency),
+                    use_container_width=True)
+
+    share = res["shapley"] / res["delta"] * 100 if res["delta"] != 0 else np.zeros(len(names))
+    table = pd.DataFrame({
+        t("at_param"): [names[k] for k in order],
+        t("at_value_before"): res["before"][order],
+        t("at_value_after"): res["after"][order],
+        t("at_contribution"): res["shapley"][order].round(6),
+        t("at_std_err"): res["std_err"][order].round(6),
+        t("at_alone"): res["alone"][order].round(6),
+        t("at_interaction"): (res["shapley"] - res["alone"])[order].round(6),
+        t("at_share"): share[order].round(1),
+    })
+    if res["method"] == "exact":
+        table = table.drop(columns=[t("at_std_err")])
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+
 # ─── PAGE: Methodology ──────────────────────────────────────────────────────────
 def page_methodology():
     lang = st.session_state.get("lang", "fr")
@@ -1235,9 +3766,11 @@ _GEN_PAGES = [
 _STUDY_PAGES = [
     st.Page(func, title=title, url_path=url)
     for func, title, url in zip(
-        [page_sensitivity, page_scenarios],
+        [page_sensitivity, page_scenarios, page_monte_carlo, page_volume_sweep, page_goal_seek,
+         page_budget, page_staffing, page_time_phased, page_capacity, page_portfolio,
+         page_sourcing, page_equipment, page_attribution],
         study_pages,
-        ["sensitivity", "what-if"],
+        ["sensitivity", "what-if", "monte-carlo", "volume", "goal-seek", "budget", "staffing", "time-phased", "capacity", "portfolio", "suppliers", "equipment", "attribution"],
     )
 ]
 _ANNEX_PAGES = [
@@ -1322,6 +3855,12 @@ with st.sidebar:
             use_container_width=True,
         )
 
+    cache_stats = RESULT_CACHE.stats()
+    st.caption(t("cache_stats").format(
+        hits=cache_stats["hits"], misses=cache_stats["misses"],
+        size=cache_stats["size"], maxsize=cache_stats["maxsize"],
+    ))
+
     st.divider()
     lang = st.session_state.get("lang", "fr")
     notes = VERSION_NOTES.get(lang, VERSION_NOTES["fr"])
@@ -0,0 +1,154 @@
+"""Headless COGS engine: cascade cost model, batch evaluation, sensitivity,
+Monte Carlo and scenarios, with no Streamlit dependency.
+
+Submodules are imported on first attribute access, so ``import cogs`` stays
+cheap and NumPy is only loaded once an engine function is used::
+
+    from cogs import compute_cogs, load_product
+
+    product = load_product("data/sample_medical_device.json")
+    result = compute_cogs(product["steps"], product["volume"], lang="en")
+"""
+
+import importlib
+
+_EXPORTS = {
+    # model
+    "STEP_PARAMS": "model",
+    "STEP_DEFAULTS": "model",
+    "RATIO_PARAMS": "model",
+    "SCENARIO_PARAMS": "model",
+    "step_name": "model",
+    "component_name": "model",
+    "new_step": "model",
+    "normalize_product": "model",
+    "normalize_steps": "model",
+    "load_product": "model",
+    "product_to_json": "model",
+    # bom
+    "bom_columns": "bom",
+    "pack_bom": "bom",
+    "unpack_bom": "bom",
+    "bom_json": "bom",
+    "pack_tiers": "bom",
+    "bom_tiers": "bom",
+    "tier_prices": "bom",
+    # engine
+    "pack_routing": "engine",
+    "evaluate_routing": "engine",
+    "compute_cogs": "engine",
+    "cogs_payload": "engine",
+    "label_result": "engine",
+    "compute_cogs_batch": "engine",
+    "component_prices": "engine",
+    "param_columns": "engine",
+    "param_index": "engine",
+    "param_vector": "engine",
+    # incremental
+    "IncrementalCascade": "incremental",
+    # cache
+    "RESULT_CACHE": "cache",
+    "ResultCache": "cache",
+    "cached_cogs": "cache",
+    "model_key": "cache",
+    # sensitivity
+    "cogs_adjoint": "sensitivity",
+    "run_sensitivity": "sensitivity",
+    "run_sobol": "sensitivity",
+    # montecarlo
+    "collect_distributions": "montecarlo",
+    "run_monte_carlo": "montecarlo",
+    "summarize_samples": "montecarlo",
+    # scenarios
+    "apply_modifications": "scenarios",
+    "evaluate_scenario": "scenarios",
+    "read_scenario_rows": "scenarios",
+    "compile_scenarios": "scenarios",
+    "iter_scenario_results": "scenarios",
+    # doe
+    "full_factorial": "doe",
+    "fractional_factorial": "doe",
+    "run_doe": "doe",
+    "main_effects": "doe",
+    "interaction_means": "doe",
+    # goalseek
+    "target_from_margin": "goalseek",
+    "required_values": "goalseek",
+    "solve_groups": "goalseek",
+    "parameter_groups": "goalseek",
+    # assemblies
+    "assembly_order": "assemblies",
+    "pack_assemblies": "assemblies",
+    "evaluate_assemblies": "assemblies",
+    "resolve_subassemblies": "assemblies",
+    # network
+    "routing_graph": "network",
+    "is_linear": "network",
+    "expected_visits": "network",
+    "evaluate_network": "network",
+    "network_summary": "network",
+    "network_sensitivity": "network",
+    # portfolio
+    "pack_portfolio": "portfolio",
+    "segment_volumes": "portfolio",
+    "flow_weights": "portfolio",
+    "ALLOCATION_DRIVERS": "portfolio",
+    "allocation_basis": "portfolio",
+    "PortfolioCosting": "portfolio",
+    "evaluate_portfolio": "portfolio",
+    # sourcing
+    "annual_quantities": "sourcing",
+    "pack_quotes": "sourcing",
+    "quote_costs": "sourcing",
+    "select_suppliers": "sourcing",
+    # attribution
+    "change_players": "attribution",
+    "CoalitionValues": "attribution",
+    "shapley_exact": "attribution",
+    "shapley_sampled": "attribution",
+    "attribute_change": "attribution",
+    # equipment
+    "DEPRECIATION_METHODS": "equipment",
+    "depreciation_schedule": "equipment",
+    "apply_equipment": "equipment",
+    "pack_equipment": "equipment",
+    "equipment_configurations": "equipment",
+    "evaluate_equipment": "equipment",
+    # capacity
+    "DEFAULT_SHIFT": "capacity",
+    "available_hours": "capacity",
+    "capacity": "capacity",
+    # timephased
+    "period_grid": "timephased",
+    "wright_average": "timephased",
+    "foh_schedule": "timephased",
+    "time_phased_cogs": "timephased",
+    # budget
+    "optimize_budget": "budget",
+    "budget_curve": "budget",
+    # staffing
+    "staffing_options": "staffing",
+    "allocate_operators": "staffing",
+    "line_throughput": "staffing",
+    # volume
+    "volume_cost_terms": "volume",
+    "volume_sweep": "volume",
+    "breakeven_volume": "volume",
+    "price_breaks": "volume",
+    "cogs_at_volumes": "volume",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,176 @@
+"""Multi-level BOM: sub-assemblies routed and yielded on their own lines.
+
+A product may declare `subassemblies`, a mapping id -> {name, steps}, each
+with its own routing. A BOM line with `"ref": id` consumes that sub-assembly
+instead of a purchased part: its price is the sub-assembly's COGS/unit.
+References form a DAG, evaluated in two passes over its topological order:
+
+1. demand, users first: a line consumes qty / (1 - scrap) per unit entering
+   its step, and V good units need V * w_i units entering step i, with
+   w_i = Π_{j>=i} 1 / y_j. Demands add up over every user of a sub-assembly.
+2. cost, sub-assemblies first: each one is costed once at its total demand
+   (FOH is spread over it), and its COGS/unit becomes the price of every
+   line that references it.
+"""
+
+import numpy as np
+
+from .engine import evaluate_routing, material_factors, pack_routing
+from .model import component_name, step_name
+
+
+def _references(steps: list) -> list:
+    """(step_idx, comp_idx, ref) of every BOM line that references a sub-assembly."""
+    return [
+        (i, j, comp["ref"])
+        for i, step in enumerate(steps)
+        for j, comp in enumerate(step.get("bom", []))
+        if comp.get("ref") is not None
+    ]
+
+
+def assembly_order(steps: list, subassemblies: dict) -> list:
+    """Sub-assembly ids in dependency order: every id comes after those it uses.
+
+    Only sub-assemblies reachable from the top-level steps are listed. Raises
+    ValueError on a reference to an unknown id or on a cycle (with its path).
+    """
+    def children(owner, owner_steps):
+        out = []
+        for i, j, ref in _references(owner_steps):
+            if ref not in subassemblies:
+                comp = owner_steps[i]["bom"][j]
+                where = "product" if owner is None else f"sub-assembly '{owner}'"
+                raise ValueError(
+                    f"Unknown sub-assembly '{ref}' referenced by component "
+                    f"'{component_name(comp, 'en')}' of step '{step_name(owner_steps[i], 'en')}' "
+                    f"({where})"
+                )
+            out.append(ref)
+        return out
+
+    order, state = [], {}  # state: 1 = on the current path, 2 = done
+    stack = [(None, iter(children(None, steps)))]
+    path = []
+    while stack:
+        node, todo = stack[-1]
+        ref = next(todo, None)
+        if ref is None:
+            stack.pop()
+            if node is not None:
+                state[node] = 2
+                order.append(node)
+                path.pop()
+            continue
+        if state.get(ref) == 2:
+            continue
+        if state.get(ref) == 1:
+            cycle = path[path.index(ref):] + [ref]
+            raise ValueError("Sub-assembly cycle: " + " -> ".join(cycle))
+        sub_steps = subassemblies[ref].get("steps", [])
+        if not sub_steps:
+            raise ValueError(f"Sub-assembly '{ref}' has no steps")
+        state[ref] = 1
+        path.append(ref)
+        stack.append((ref, iter(children(ref, sub_steps))))
+    return order
+
+
+def pack_assemblies(steps: list, subassemblies: dict) -> dict:
+    """Pack the product tree once: one packed routing per node.
+
+    Nodes are the reachable sub-assemblies in dependency order, then the
+    product itself (last). Returns dict with ids (sub-assembly ids), packed
+    (one pack_routing() per node) and refs (per node, (M,) int array giving
+    the referenced node of each BOM line, -1 for purchased parts).
+    """
+    ids = assembly_order(steps, subassemblies)
+    position = {sub_id: k for k, sub_id in enumerate(ids)}
+    routings = [subassemblies[sub_id]["steps"] for sub_id in ids] + [steps]
+    packed, refs = [], []
+    for node_steps in routings:
+        packed.append(pack_routing(node_steps))
+        refs.append(np.array([
+            position[comp["ref"]] if comp.get("ref") is not None else -1
+            for step in node_steps for comp in step.get("bom", [])
+        ], dtype=int))
+    return {"ids": ids, "packed": packed, "refs": refs}
+
+
+def evaluate_assemblies(tree: dict, volume: float) -> dict:
+    """Cost a packed product tree for an annual volume of the product.
+
+    Returns dict with (S,) arrays over the sub-assemblies (ids order):
+    demand (units per year), cogs_per_unit, rty; prices (per node, resolved
+    (M,) component prices) and product (evaluate_routing() of the product).
+    """
+    n_nodes = len(tree["packed"])
+    demand = np.zeros(n_nodes)
+    demand[-1] = volume
+    for node in range(n_nodes - 1, -1, -1):
+        packed, refs = tree["packed"][node], tree["refs"][node]
+        used = refs >= 0
+        if not used.any() or demand[node] <= 0:
+            continue
+        yld = packed["yield"]
+        weight = np.cumprod((1.0 / np.where(yld > 0, yld, 1.0))[::-1])[::-1]
+        per_unit = weight[packed["comp_step"][used]] * material_factors(packed)[used]
+        demand += np.bincount(refs[used], weights=demand[node] * per_unit, minlength=n_nodes)
+
+    cogs = np.zeros(n_nodes)
+    rty = np.ones(n_nodes)
+    prices = []
+    ev = None
+    for node in range(n_nodes):
+        packed, refs = tree["packed"][node], tree["refs"][node]
+        used = refs >= 0
+        if used.any():
+            packed = dict(packed)
+            packed["comp_price"] = np.where(used, cogs[np.maximum(refs, 0)], packed["comp_price"])
+        ev = evaluate_routing(packed, demand[node])
+        cogs[node] = ev["cogs_per_unit"]
+        rty[node] = ev["rty"]
+        prices.append(packed["comp_price"])
+    return {
+        "demand": demand[:-1],
+        "cogs_per_unit": cogs[:-1],
+        "rty": rty[:-1],
+        "prices": prices,
+        "product": ev,
+    }
+
+
+def resolve_subassemblies(product: dict) -> dict:
+    """Product with the price of every referencing BOM line set to the sub-assembly COGS/unit.
+
+    Returns a copy (steps and BOM lines copied, sub-assemblies included);
+    the product is returned as-is when it has no sub-assemblies.
+    """
+    subassemblies = product.get("subassemblies") or {}
+    steps = product["steps"]
+    if not subassemblies and not _references(steps):
+        return product
+    tree = pack_assemblies(steps, subassemblies)
+    res = evaluate_assemblies(tree, product["volume"])
+
+    def priced(node_steps, prices):
+        out, k = [], 0
+        for step in node_steps:
+            bom = []
+            for comp in step.get("bom", []):
+                comp = dict(comp)
+                if comp.get("ref") is not None:
+                    comp["price"] = float(prices[k])
+                bom.append(comp)
+                k += 1
+            out.append({**step, "bom": bom})
+        return out
+
+    resolved = dict(product)
+    resolved["steps"] = priced(steps, res["prices"][-1])
+    resolved["subassemblies"] = dict(subassemblies)
+    for sub_id, prices in zip(tree["ids"], res["prices"]):
+        resolved["subassemblies"][sub_id] = {
+            **subassemblies[sub_id], "steps": priced(subassemblies[sub_id]["steps"], prices),
+        }
+    return resolved
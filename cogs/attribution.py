@@ -0,0 +1,190 @@
+"""Change attribution: Shapley values of the COGS/unit delta between two versions.
+
+The players are the entries of the flat parameter vector (see param_columns)
+that differ between the two versions, plus the volume. A coalition S is the
+first version with the entries of S set to their new values, and v(S) its
+COGS/unit; the Shapley value of player i is its marginal contribution
+v(S + i) - v(S) averaged over every order of arrival. The values add up to the
+total delta exactly and share interaction effects (a yield change scaling a
+price change upstream, FOH over a changed volume) between their players.
+
+- n <= exact_max (at most EXACT_LIMIT): all 2^n coalitions in one batch, then every player's
+  weighted sum of marginal contributions over bitmasks.
+- beyond: random orders (each with its reverse, antithetic), each order's
+  n + 1 prefixes being coalitions. Every per-order estimate already adds up to
+  the delta; the standard error shrinks as 1 / sqrt(orders).
+
+Coalitions are evaluated with compute_cogs_batch() through CoalitionValues,
+which keeps every coalition already costed, so prefixes shared by several
+orders (the empty and full sets, small prefixes) are evaluated once.
+"""
+
+from math import factorial
+
+import numpy as np
+
+from .engine import compute_cogs_batch, pack_routing, param_columns, param_vector
+
+EXACT_LIMIT = 16  # 65,536 coalitions; beyond, sampling is both faster and accurate
+
+
+def _same_tiers(a, b) -> bool:
+    """Whether two packed quantity-break tables (or None) have the same breaks.
+
+    Column 0 of prices is the base price, a parameter of its own.
+    """
+    if a is None or b is None:
+        return a is b
+    return np.array_equal(a["line"], b["line"]) and np.array_equal(a["breaks"], b["breaks"]) \
+        and np.array_equal(a["prices"][:, 1:], b["prices"][:, 1:])
+
+
+def change_players(packed_a: dict, packed_b: dict, volume_a: float, volume_b: float) -> dict:
+    """Parameters that differ between two versions of the same routing.
+
+    Raises ValueError when the structures differ (steps, BOM lines, price
+    tiers), since changes are then not parameter-by-parameter. Returns dict
+    with columns ((n_params,) flat parameter indexes), before, after and
+    volume (whether the volume is the last player).
+    """
+    if len(packed_a["uph"]) != len(packed_b["uph"]) or \
+            not np.array_equal(packed_a["comp_step"], packed_b["comp_step"]):
+        raise ValueError("The two versions do not have the same steps and BOM lines")
+    if not np.array_equal(packed_a["comp_qty"], packed_b["comp_qty"]) or \
+            not np.array_equal(packed_a["comp_scrap"], packed_b["comp_scrap"]) or \
+            not _same_tiers(packed_a.get("comp_tiers"), packed_b.get("comp_tiers")):
+        raise ValueError("BOM quantities, scrap or price tiers differ between the two versions")
+    before = param_vector(packed_a)
+    after = param_vector(packed_b)
+    columns = np.flatnonzero(before != after)
+    return {
+        "columns": columns,
+        "before": before[columns],
+        "after": after[columns],
+        "volume": float(volume_a) != float(volume_b),
+        "volume_before": float(volume_a),
+        "volume_after": float(volume_b),
+    }
+
+
+class CoalitionValues:
+    """COGS/unit of coalitions of changes, memoized by coalition."""
+
+    def __init__(self, packed: dict, players: dict, chunk_size: int = 65536):
+        self.packed = packed
+        self.players = players
+        self.chunk_size = chunk_size
+        self.n_params = len(players["columns"])
+        self.n = self.n_params + int(players["volume"])
+        self.cache = {}
+
+    def _evaluate(self, masks: np.ndarray) -> np.ndarray:
+        """Batch evaluation of (K, n) boolean coalitions."""
+        players = self.players
+        out = np.empty(len(masks))
+        for start in range(0, len(masks), self.chunk_size):
+            rows = masks[start:start + self.chunk_size]
+            params = np.where(rows[:, :self.n_params], players["after"], players["before"])
+            volumes = players["volume_before"]
+            if players["volume"]:
+                volumes = np.where(rows[:, -1], players["volume_after"], players["volume_before"])
+            out[start:start + len(rows)] = compute_cogs_batch(
+                self.packed, params, volumes, players["columns"],
+            )["cogs_per_unit"]
+        return out
+
+    def __call__(self, masks: np.ndarray) -> np.ndarray:
+        """Values of (K, n) boolean coalitions; only unseen ones are evaluated."""
+        keys = [row.tobytes() for row in np.packbits(masks, axis=1)]
+        missing = {}
+        for k, key in enumerate(keys):
+            if key not in self.cache and key not in missing:
+                missing[key] = k
+        if missing:
+            values = self._evaluate(masks[list(missing.values())])
+            self.cache.update(zip(missing, values.tolist()))
+        return np.array([self.cache[key] for key in keys])
+
+
+def shapley_exact(values: CoalitionValues) -> np.ndarray:
+    """Exact Shapley values from all 2^n coalitions."""
+    n = values.n
+    codes = np.arange(1 << n)
+    masks = ((codes[:, None] >> np.arange(n)) & 1).astype(bool)
+    v = values(masks)
+    size = masks.sum(axis=1)
+    weight = np.array([factorial(s) * factorial(n - s - 1) / factorial(n) for s in range(n)])
+    out = np.empty(n)
+    for i in range(n):
+        without = codes[~masks[:, i]]
+        out[i] = weight[size[without]] @ (v[without | (1 << i)] - v[without])
+    return out
+
+
+def shapley_sampled(values: CoalitionValues, n_orders: int, rng) -> tuple:
+    """Shapley values estimated over random orders of arrival (antithetic pairs).
+
+    Returns (estimates, standard errors), both (n,).
+    """
+    n = values.n
+    half = max(n_orders // 2, 1)
+    orders = np.argsort(rng.random((half, n)), axis=1)
+    orders = np.vstack([orders, orders[:, ::-1]])
+    n_orders = len(orders)
+    # Prefix coalitions: row (o, k) holds the first k players of order o
+    rank = np.empty_like(orders)
+    rank[np.arange(n_orders)[:, None], orders] = np.arange(n)
+    prefixes = rank[:, None, :] < np.arange(n + 1)[None, :, None]
+    v = values(prefixes.reshape(-1, n)).reshape(n_orders, n + 1)
+    marginal = np.empty((n_orders, n))
+    marginal[np.arange(n_orders)[:, None], orders] = np.diff(v, axis=1)
+    # Antithetic pairs are averaged before the standard error
+    paired = (marginal[:half] + marginal[half:]) / 2
+    std_err = paired.std(axis=0, ddof=1) / np.sqrt(half) if half > 1 else np.zeros(n)
+    return marginal.mean(axis=0), std_err
+
+
+def attribute_change(steps_a: list, volume_a: float, steps_b: list, volume_b: float,
+                     exact_max: int = 12, n_orders: int = 2000, seed: int = None) -> dict:
+    """Shapley attribution of the COGS/unit change from version a to version b.
+
+    Returns dict with players (list of (key, idx): step parameter and step
+    index, ("price", comp_idx) or ("volume", -1)), before and after ((n,)
+    values), shapley ((n,), summing to delta), std_err ((n,), 0 when exact),
+    alone ((n,) effect of each change applied alone), cogs_before,
+    cogs_after, delta, method ("exact" or "sampled") and evaluations
+    (distinct coalitions costed).
+    """
+    packed = pack_routing(steps_a)
+    players = change_players(packed, pack_routing(steps_b), volume_a, volume_b)
+    layout = param_columns(packed)
+    labels = [layout[col] for col in players["columns"].tolist()]
+    before = players["before"].tolist()
+    after = players["after"].tolist()
+    if players["volume"]:
+        labels.append(("volume", -1))
+        before.append(players["volume_before"])
+        after.append(players["volume_after"])
+
+    values = CoalitionValues(packed, players)
+    n = values.n
+    ends = values(np.vstack([np.zeros((1, n), dtype=bool), np.ones((1, n), dtype=bool)]))
+    if n <= min(exact_max, EXACT_LIMIT):
+        shapley, std_err, method = shapley_exact(values), np.zeros(n), "exact"
+    else:
+        shapley, std_err = shapley_sampled(values, n_orders, np.random.default_rng(seed))
+        method = "sampled"
+    alone = values(np.vstack([np.zeros((1, n), dtype=bool), np.eye(n, dtype=bool)]))
+    return {
+        "players": labels,
+        "before": np.array(before),
+        "after": np.array(after),
+        "shapley": shapley,
+        "std_err": std_err,
+        "alone": alone[1:] - alone[0],
+        "cogs_before": float(ends[0]),
+        "cogs_after": float(ends[1]),
+        "delta": float(ends[1] - ends[0]),
+        "method": method,
+        "evaluations": len(values.cache),
+    }
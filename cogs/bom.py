@@ -0,0 +1,225 @@
+"""Columnar BOM: the component lines of a routing as contiguous arrays.
+
+A table holds one entry per component line, in routing order:
+
+- step (int32): step index, sorted, so a step's lines are one segment
+- qty, price, scrap (float64)
+- name (int32): index into `names`, the interned name table (-1: no name)
+- flags (uint8): which of qty/price/scrap the line spelled out, and whether
+  as a JSON integer, so the JSON written back is the JSON read
+- extras: {line index: {key: value}} for any other key (distributions,
+  ref, ...), kept sparse since most lines have none
+
+That is 33 bytes per line plus one copy of each distinct name, instead of a
+dict per line with its own name dict. Material per step is a segmented
+reduction over the columns (see engine.step_material).
+"""
+
+import json
+
+import numpy as np
+
+BOM_FIELDS = ("qty", "price", "scrap")
+BOM_DEFAULTS = {"qty": 1, "price": 0, "scrap": 0}
+_PRESENT = {key: 1 << k for k, key in enumerate(BOM_FIELDS)}
+_INTEGER = {key: 1 << (k + len(BOM_FIELDS)) for k, key in enumerate(BOM_FIELDS)}
+_CORE_KEYS = frozenset(("name",) + BOM_FIELDS)
+
+
+def bom_columns(steps_data: list) -> dict:
+    """Numeric columns only (step, qty, price, scrap): what the engine needs."""
+    boms = [step.get("bom", []) for step in steps_data]
+    comps = [comp for bom in boms for comp in bom]
+    n_comps = len(comps)
+    table = {
+        "step": np.repeat(
+            np.arange(len(boms), dtype=np.int32), np.array([len(bom) for bom in boms], dtype=int),
+        ),
+    }
+    for key in BOM_FIELDS:
+        default = BOM_DEFAULTS[key]
+        table[key] = np.fromiter((c.get(key, default) for c in comps), dtype=float, count=n_comps)
+    return table
+
+
+def pack_bom(steps_data: list) -> dict:
+    """Full columnar table of a routing's BOM (see module docstring)."""
+    table = bom_columns(steps_data)
+    comps = [comp for step in steps_data for comp in step.get("bom", [])]
+
+    # Interned names: equal names share one table entry. The key is the JSON
+    # text, so any JSON name works (lists, nested dicts) and 1, 1.0 and true
+    # stay distinct; key order is kept, so the JSON written back is the JSON read
+    raw = [comp.get("name") for comp in comps]
+    keys = [json.dumps(name, ensure_ascii=False) for name in raw]
+    names, index = [], {}
+    for key, name in zip(keys, raw):
+        if key not in index:
+            index[key] = len(names)
+            names.append(name)
+    name_ids = np.array([index[key] for key in keys], dtype=np.int32)
+    missing = [j for j, comp in enumerate(comps) if "name" not in comp]
+    name_ids[missing] = -1
+
+    flags = np.zeros(len(comps), dtype=np.uint8)
+    for field in BOM_FIELDS:
+        present = np.array([field in comp for comp in comps], dtype=bool)
+        integer = np.array([type(comp.get(field)) is int for comp in comps], dtype=bool)
+        flags |= np.where(present, _PRESENT[field], 0).astype(np.uint8)
+        flags |= np.where(integer, _INTEGER[field], 0).astype(np.uint8)
+
+    extras = {
+        j: {k: v for k, v in comp.items() if k not in _CORE_KEYS}
+        for j, comp in enumerate(comps) if not comp.keys() <= _CORE_KEYS
+    }
+    table.update({"name": name_ids, "names": names, "flags": flags, "extras": extras})
+    return table
+
+
+def bom_nbytes(table: dict) -> int:
+    """Bytes held by the per-line arrays (names and extras excluded)."""
+    return sum(table[key].nbytes for key in ("step", "name", "flags") + BOM_FIELDS)
+
+
+def _line_values(table: dict) -> list:
+    """Per-field lists of the JSON values of every line (None when absent)."""
+    out = []
+    for field in BOM_FIELDS:
+        values = table[field].tolist()
+        for j in np.flatnonzero(table["flags"] & _INTEGER[field]).tolist():
+            values[j] = int(values[j])
+        for j in np.flatnonzero((table["flags"] & _PRESENT[field]) == 0).tolist():
+            values[j] = None
+        out.append(values)
+    return out
+
+
+def _line_texts(table: dict) -> list:
+    """Per-field lists of the JSON text of every line's value (None when absent)."""
+    out = []
+    for field in BOM_FIELDS:
+        values = table[field]
+        # repr() is the JSON spelling of finite floats
+        texts = list(map(repr, values.tolist()))
+        integer = np.flatnonzero(table["flags"] & _INTEGER[field])
+        for j, value in zip(integer.tolist(), values[integer].astype(np.int64).tolist()):
+            texts[j] = str(value)
+        for j in np.flatnonzero(~np.isfinite(values)).tolist():
+            texts[j] = json.dumps(float(values[j]))
+        for j in np.flatnonzero((table["flags"] & _PRESENT[field]) == 0).tolist():
+            texts[j] = None
+        out.append(texts)
+    return out
+
+
+def unpack_bom(table: dict, n_steps: int) -> list:
+    """Per-step lists of component dicts, equal to the ones packed."""
+    names = table["names"]
+    qty, price, scrap = _line_values(table)
+    comps = []
+    for name_id, q, p, s in zip(table["name"].tolist(), qty, price, scrap):
+        comp = {} if name_id < 0 else {"name": names[name_id]}
+        if q is not None:
+            comp["qty"] = q
+        if p is not None:
+            comp["price"] = p
+        if s is not None:
+            comp["scrap"] = s
+        comps.append(comp)
+    for j, extra in table["extras"].items():
+        comps[j].update(extra)
+    return _split(comps, table["step"], n_steps)
+
+
+def _split(items: list, step: np.ndarray, n_steps: int) -> list:
+    """Cut a list in routing order into per-step lists."""
+    bounds = np.searchsorted(step, np.arange(n_steps + 1)).tolist()
+    return [items[bounds[i]:bounds[i + 1]] for i in range(n_steps)]
+
+
+def bom_json(table: dict, n_steps: int, indent: str = "") -> list:
+    """JSON text of every step's BOM, one compact line per component.
+
+    Each distinct name is encoded once. `indent` prefixes the lines (the
+    closing bracket gets two spaces less). Returns one string per step.
+    """
+    name_parts = [f'"name": {json.dumps(name, ensure_ascii=False)}' for name in table["names"]]
+    name_parts.append("")  # name id -1: no name
+    columns = [table["name"].tolist()]
+    columns[0] = [name_parts[i] for i in columns[0]]
+    for field, texts in zip(BOM_FIELDS, _line_texts(table)):
+        columns.append(["" if text is None else f'"{field}": {text}' for text in texts])
+    extra_parts = {
+        j: [f"{json.dumps(k, ensure_ascii=False)}: {json.dumps(v, ensure_ascii=False)}"
+            for k, v in extra.items()]
+        for j, extra in table["extras"].items()
+    }
+    lines = [
+        f"{indent}{{{n}, {q}, {p}, {s}}}" if n and q and p and s
+        else indent + "{" + ", ".join(part for part in (n, q, p, s) if part) + "}"
+        for n, q, p, s in zip(*columns)
+    ]
+    for j, parts in extra_parts.items():
+        head = lines[j][:-1]
+        separator = "" if head.endswith("{") else ", "
+        lines[j] = head + separator + ", ".join(parts) + "}"
+    closing = indent[:-2]
+    return ["[\n" + ",\n".join(step_lines) + "\n" + closing + "]" if step_lines else "[]"
+            for step_lines in _split(lines, table["step"], n_steps)]
+
+
+def pack_tiers(tables: list, base) -> dict:
+    """Padded quantity-break table of L lines.
+
+    tables holds one [[min_qty, price], ...] list per line (any order, may be
+    empty); base gives each line's price below its first break. Returns dict
+    with (L, T) arrays breaks (ascending, column 0 = 0, padded with +inf so
+    padding is never reached) and prices.
+    """
+    n_lines = len(tables)
+    width = 1 + max((len(table) for table in tables), default=0)
+    breaks = np.full((n_lines, width), np.inf)
+    prices = np.zeros((n_lines, width))
+    breaks[:, 0] = 0.0
+    prices[:, 0] = base
+    for j, table in enumerate(tables):
+        if table:
+            points = np.array(sorted(table), dtype=float)
+            breaks[j, 1:len(points) + 1] = points[:, 0]
+            prices[j, 1:len(points) + 1] = points[:, 1]
+    return {"breaks": breaks, "prices": prices}
+
+
+def bom_tiers(steps_data: list):
+    """Quantity-break table of the BOM lines that have `tiers` (None when none do).
+
+    Returns pack_tiers() of those lines, their base `price` below the first
+    break, plus line (flat BOM indexes, ascending).
+    """
+    comps = [comp for step in steps_data for comp in step.get("bom", [])]
+    line = [j for j, comp in enumerate(comps) if comp.get("tiers")]
+    if not line:
+        return None
+    tiers = pack_tiers([comps[j]["tiers"] for j in line],
+                       [float(comps[j].get("price", BOM_DEFAULTS["price"])) for j in line])
+    return {"line": np.array(line, dtype=int), **tiers}
+
+
+def tier_index(tiers: dict, quantity: np.ndarray) -> np.ndarray:
+    """Tier of every line at its quantity ((L,) or (K, L); 0: below the first break).
+
+    A row-wise searchsorted(side="right") - 1 over the sorted breaks, done as
+    one comparison per tier column for all rows at once (padding is +inf, so
+    it never counts), without a (K, L, T) temporary.
+    """
+    quantity = np.asarray(quantity, dtype=float)
+    idx = np.zeros(quantity.shape, dtype=int)
+    for breaks in tiers["breaks"][:, 1:].T:
+        idx += breaks <= quantity
+    return idx
+
+
+def tier_prices(tiers: dict, quantity: np.ndarray) -> np.ndarray:
+    """Unit price of every line at its quantity ((L,) or (K, L))."""
+    idx = tier_index(tiers, quantity)
+    return tiers["prices"][np.arange(tiers["prices"].shape[0]), idx]
@@ -0,0 +1,177 @@
+"""Improvement-budget optimizer: where to invest to minimize COGS/unit.
+
+A lever is {key, idx, unit, cost, limit}: moving parameter (key, idx) (see
+param_index) by `unit` costs `cost`, and the parameter may not go past
+`limit` (default 1 for ratios moved up, 0 for values moved down, unbounded
+otherwise). The plan t (number of units bought per lever) solves
+
+    min COGS(x0 + unit * t)  s.t.  sum(cost * t) <= budget, 0 <= t <= t_max
+
+COGS/unit is convex and monotone in each lever (1/x through UPH, products
+of 1/yield, linear elsewhere). The plan is solved by projected gradient in
+euro space (e = cost * t): the gradient comes from the cascade adjoint
+(cogs_adjoint), the projection onto {0 <= e <= cost * t_max, sum(e) <=
+budget} is a clipped shift found by bisection, and the step size is chosen
+by evaluating a whole geometric grid of steps in one compute_cogs_batch()
+call. Free levers (cost 0) are simply moved to their limit.
+"""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index, param_vector
+from .model import RATIO_PARAMS, STEP_PARAMS
+from .sensitivity import cogs_adjoint
+
+
+def lever_bounds(packed: dict, levers: list) -> tuple:
+    """Columns, base values and maximum units t_max of each lever."""
+    columns = np.array([param_index(packed, lv["key"], lv["idx"]) for lv in levers], dtype=int)
+    if len(set(columns.tolist())) != len(columns):
+        raise ValueError("Each parameter can only be used by one lever")
+    base = param_vector(packed)[columns]
+    t_max = np.empty(len(levers))
+    for j, lv in enumerate(levers):
+        unit = float(lv["unit"])
+        if unit == 0 or float(lv["cost"]) < 0:
+            raise ValueError(f"Lever {lv['key']} #{lv['idx']}: unit must be non-zero, cost >= 0")
+        limit = lv.get("limit")
+        if limit is None:
+            limit = 1.0 if unit > 0 and lv["key"] in RATIO_PARAMS else (0.0 if unit < 0 else np.inf)
+        t_max[j] = max((limit - base[j]) / unit, 0.0)
+    return columns, base, t_max
+
+
+def _with_values(packed: dict, columns: np.ndarray, values: np.ndarray) -> dict:
+    """Packed routing with some parameter columns replaced (arrays copied on write)."""
+    n_steps = len(packed["uph"])
+    out = dict(packed)
+    for col, value in zip(columns.tolist(), values.tolist()):
+        if col < len(STEP_PARAMS) * n_steps:
+            key, idx = STEP_PARAMS[col // n_steps], col % n_steps
+        else:
+            key, idx = "comp_price", col - len(STEP_PARAMS) * n_steps
+        if out[key] is packed[key]:
+            out[key] = packed[key].copy()
+        out[key][idx] = value
+    return out
+
+
+def _project(points: np.ndarray, cap: np.ndarray, budget: float) -> np.ndarray:
+    """Euclidean projection of each row onto {0 <= e <= cap, sum(e) <= budget}."""
+    out = np.clip(points, 0.0, cap)
+    over = out.sum(axis=1) > budget
+    if over.any():
+        rows = points[over]
+        lo = np.zeros(len(rows))
+        hi = np.maximum(rows.max(axis=1), 0.0)
+        for _ in range(100):
+            shift = 0.5 * (lo + hi)
+            spent = np.clip(rows - shift[:, None], 0.0, cap).sum(axis=1)
+            lo = np.where(spent > budget, shift, lo)
+            hi = np.where(spent > budget, hi, shift)
+        out[over] = np.clip(rows - hi[:, None], 0.0, cap)
+    return out
+
+
+def optimize_budget(packed: dict, volume: float, levers: list, budget: float,
+                    start: np.ndarray = None, max_iter: int = 500, tol: float = 1e-12) -> dict:
+    """Optimal improvement plan for one budget.
+
+    start optionally warm-starts from a plan (units per lever) of a smaller
+    budget. Returns dict with units (t per lever), values (new parameter
+    values), spent (per lever), cogs_per_unit, base_cogs, marginal (COGS/unit
+    reduction of the next euro, the budget multiplier) and iterations.
+    """
+    columns, base, t_max = lever_bounds(packed, levers)
+    unit = np.array([float(lv["unit"]) for lv in levers])
+    cost = np.array([float(lv["cost"]) for lv in levers])
+
+    def evaluate(units):
+        return compute_cogs_batch(packed, base + unit * units, volume, columns)["cogs_per_unit"]
+
+    def slope(units):
+        grad = cogs_adjoint(_with_values(packed, columns, base + unit * units), volume)["grad"]
+        return grad[columns] * unit
+
+    t = np.zeros(len(levers)) if start is None else np.minimum(start, t_max)
+    base_cogs = float(evaluate(np.zeros((1, len(levers))))[0])
+
+    # Free levers go straight to their limit when they improve COGS
+    free = cost <= 0
+    if free.any():
+        improving = free & (slope(t) < 0)
+        if np.isinf(t_max[improving]).any():
+            raise ValueError("A free lever needs a finite limit")
+        t[improving] = t_max[improving]
+
+    paid = ~free
+    cap = (t_max * cost)[paid]
+    spend = (t * cost)[paid]
+    scale = np.zeros(len(levers))
+    scale[paid] = 1.0 / cost[paid]
+    steps = 2.0 ** np.arange(-12, 13)
+
+    def units_of(spend_rows):
+        units = np.repeat(t[None, :], len(spend_rows), axis=0)
+        units[:, paid] = spend_rows * scale[paid]
+        return units
+
+    cogs = float(evaluate(t[None, :])[0])
+    grad_e = slope(t)[paid] * scale[paid]
+    alpha = budget / max(np.abs(grad_e).max(), 1e-300) if paid.any() else 0.0
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        if not paid.any() or budget <= 0:
+            break
+        # Projected-gradient arc, all step sizes evaluated in one batch
+        trial = _project(spend[None, :] - (alpha * steps)[:, None] * grad_e[None, :], cap, budget)
+        values = evaluate(units_of(trial))
+        best = int(np.argmin(values))
+        if values[best] >= cogs - tol * max(abs(cogs), 1.0):
+            break
+        spend, cogs, alpha = trial[best], float(values[best]), alpha * steps[best]
+        t = units_of(spend[None, :])[0]
+        grad_e = slope(t)[paid] * scale[paid]
+
+    # Budget multiplier: best return per euro among levers that can still move
+    marginal = 0.0
+    open_ = spend < cap * (1 - 1e-9)
+    if open_.any() and spend.sum() >= budget * (1 - 1e-9):
+        marginal = float(max(-grad_e[open_].min(), 0.0))
+    return {
+        "units": t,
+        "values": base + unit * t,
+        "spent": cost * t,
+        "cogs_per_unit": cogs,
+        "base_cogs": base_cogs,
+        "marginal": marginal,
+        "iterations": iteration,
+    }
+
+
+def budget_curve(packed: dict, volume: float, levers: list, max_budget: float,
+                 n_points: int = 21) -> dict:
+    """Optimal COGS/unit for budgets 0 .. max_budget and its marginal return.
+
+    Budgets are solved in increasing order, each warm-started from the
+    previous plan (still feasible with a larger budget). marginal is the
+    COGS/unit reduction of the next euro at each budget (budget multiplier),
+    annual_return the same times the volume (savings per year per euro).
+    Returns dict of (n_points,) arrays: budgets, cogs_per_unit, marginal,
+    annual_return.
+    """
+    budgets = np.linspace(0.0, max_budget, n_points)
+    cogs = np.empty(n_points)
+    marginal = np.empty(n_points)
+    units = None
+    for i, budget in enumerate(budgets):
+        plan = optimize_budget(packed, volume, levers, budget, start=units)
+        units = plan["units"]
+        cogs[i] = plan["cogs_per_unit"]
+        marginal[i] = plan["marginal"]
+    return {
+        "budgets": budgets,
+        "cogs_per_unit": cogs,
+        "marginal": marginal,
+        "annual_return": marginal * volume,
+    }
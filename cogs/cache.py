@@ -0,0 +1,100 @@
+"""Content-addressed memoization of COGS results.
+
+Results are keyed by a canonical hash of the numeric model (step parameters,
+BOM quantities/prices/scrap/price tiers and volume), so identical models loaded by
+different pages or user sessions are computed once. Names are excluded from
+both the key and the cached payload: a language switch or a renamed step does
+not invalidate anything.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .engine import cogs_payload, label_result, pack_routing
+from .model import STEP_PARAMS
+
+PACKED_ARRAYS = STEP_PARAMS + ("comp_step", "comp_qty", "comp_price", "comp_scrap")
+
+
+def model_key(packed: dict, volume: float, *extra) -> str:
+    """Canonical SHA-256 of a packed routing, its volume and optional extras.
+
+    Hashes the raw bytes of the struct-of-arrays (float64 / intp), so two
+    models with the same numbers get the same key whatever their names, key
+    order or int/float spelling in the JSON.
+    """
+    digest = hashlib.sha256(np.float64(volume).tobytes())
+    for key in PACKED_ARRAYS:
+        digest.update(np.ascontiguousarray(packed[key]).tobytes())
+        digest.update(b"|")
+    tiers = packed.get("comp_tiers")
+    if tiers is not None:
+        for key in ("line", "breaks", "prices"):
+            digest.update(np.ascontiguousarray(tiers[key]).tobytes())
+            digest.update(b"|")
+    for item in extra:
+        digest.update(repr(item).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: str, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        """Hits, misses, hit rate and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache, shared by every page and user session of the server.
+RESULT_CACHE = ResultCache()
+
+
+def cached_cogs(steps_data: list, volume: int, lang: str = "fr",
+                cache: ResultCache = RESULT_CACHE) -> dict:
+    """compute_cogs() memoized on the model content (see model_key)."""
+    packed = pack_routing(steps_data)
+    payload = cache.get_or_compute(
+        model_key(packed, volume, "cogs"),
+        lambda: cogs_payload(steps_data, volume, packed=packed),
+    )
+    return label_result(payload, steps_data, lang)
@@ -0,0 +1,84 @@
+"""Capacity and bottleneck analysis from effective UPH and yielded flow.
+
+A step must process every unit entering it, good or not: V * w_i units per
+year (see portfolio.flow_weights), i.e. hours_i = V * w_i / effective UPH_i
+with effective UPH = UPH x availability x performance. A shift pattern gives
+the hours a station can be scheduled per year, so
+
+    load_i = hours_i / available          (stations' worth of work)
+    stations needed = ceil(load_i)
+    utilization_i = load_i / installed stations (default 1)
+
+Resources shared by several steps or products add up their loads (one
+bincount over all steps), and the most utilized resource is the bottleneck.
+"""
+
+import numpy as np
+
+from .portfolio import flow_weights, segment_volumes
+
+DEFAULT_SHIFT = {"shifts_per_day": 2, "hours_per_shift": 8.0, "days_per_week": 5, "weeks_per_year": 47}
+
+
+def available_hours(shift: dict = None) -> float:
+    """Schedulable hours per station per year of a shift pattern."""
+    shift = {**DEFAULT_SHIFT, **(shift or {})}
+    return float(shift["shifts_per_day"] * shift["hours_per_shift"]
+                 * shift["days_per_week"] * shift["weeks_per_year"])
+
+
+def step_hours(fields: dict, entering: np.ndarray) -> np.ndarray:
+    """Hours per year of every step (0 for steps that do not run)."""
+    effective = fields["uph"] * fields["availability"] * fields["performance"]
+    return np.where(effective > 0, entering / np.where(effective > 0, effective, 1.0), 0.0)
+
+
+def capacity(portfolio: dict, shift: dict = None, volume: np.ndarray = None,
+             weights: np.ndarray = None) -> dict:
+    """Load, stations and utilization per step and per resource.
+
+    volume overrides the product volumes ((P,)) and weights the flow weights
+    ((T,), default flow_weights()). Returns dict with available (hours per
+    station); per-step (T,) arrays entering, hours, load, stations_needed and
+    utilization (of the step alone); per-resource (R,) arrays resource_hours,
+    resource_load, resource_stations (installed), resource_stations_needed
+    and resource_utilization; bottleneck (resource index); and
+    segment_bottleneck ((S,) index of the step on the most utilized resource
+    of each segment, -1 when empty).
+    """
+    available = available_hours(shift)
+    if weights is None:
+        weights = flow_weights(portfolio)
+    entering = segment_volumes(portfolio, volume)[portfolio["segment"]] * weights
+    hours = step_hours(portfolio, entering)
+    load = hours / available
+
+    resource = portfolio["resource"]
+    n_resources = len(portfolio["resources"])
+    resource_hours = np.bincount(resource, weights=hours, minlength=n_resources)
+    stations = portfolio["resource_stations"]
+    resource_load = resource_hours / available
+    utilization = resource_load / stations
+
+    # Most utilized resource on each segment: first step of each segment
+    # after sorting by (segment, -utilization)
+    step_utilization = utilization[resource]
+    order = np.lexsort((-step_utilization, portfolio["segment"]))
+    bounds = portfolio["bounds"]
+    first = np.minimum(bounds[:-1], max(len(order) - 1, 0))
+    segment_bottleneck = np.where(bounds[1:] > bounds[:-1], order[first] if len(order) else -1, -1)
+    return {
+        "available": available,
+        "entering": entering,
+        "hours": hours,
+        "load": load,
+        "stations_needed": np.ceil(load - 1e-9),
+        "utilization": load / portfolio["stations"],
+        "resource_hours": resource_hours,
+        "resource_load": resource_load,
+        "resource_stations": stations,
+        "resource_stations_needed": np.ceil(resource_load - 1e-9),
+        "resource_utilization": utilization,
+        "bottleneck": int(np.argmax(utilization)) if n_resources else -1,
+        "segment_bottleneck": segment_bottleneck,
+    }
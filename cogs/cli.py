@@ -0,0 +1,517 @@
+"""Command-line interface: cost whole directories of product JSON files.
+
+Usage::
+
+    python -m cogs batch data/ --output results.csv
+    python -m cogs batch "products/**/*.json" --format ndjson --sensitivity
+    python -m cogs scenarios data/product.json scenarios.csv --output results.csv
+    python -m cogs capacity data/ --shifts 3 --output resources.csv
+    python -m cogs portfolio data/ --resources resources.json --driver hours
+    python -m cogs attribution before.json after.json --output attribution.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
+
+from .assemblies import resolve_subassemblies
+from .attribution import attribute_change
+from .capacity import DEFAULT_SHIFT, capacity
+from .engine import compute_cogs, pack_routing
+from .model import component_name, load_product, step_name
+from .network import (
+    evaluate_network, is_linear, network_sensitivity, network_summary, routing_graph,
+)
+from .portfolio import ALLOCATION_DRIVERS, PortfolioCosting, pack_portfolio
+from .scenarios import compile_scenarios, iter_scenario_results, read_scenario_rows
+from .sensitivity import run_sensitivity
+
+SCENARIO_RESULT_FIELDS = [
+    "scenario", "n_mods", "cogs_per_unit", "rty", "total_cogs", "delta", "delta_pct",
+]
+CAPACITY_FIELDS = [
+    "resource", "n_steps", "hours", "load", "stations", "stations_needed", "utilization",
+    "bottleneck",
+]
+PORTFOLIO_FIELDS = [
+    "file", "name", "volume", "standalone_cogs", "cogs_per_unit", "delta", "delta_pct", "total_cogs",
+]
+ATTRIBUTION_FIELDS = [
+    "param", "before", "after", "contribution", "std_err", "alone", "share_pct",
+]
+RESULT_FIELDS = [
+    "file", "name", "volume", "currency", "n_steps", "n_components",
+    "cogs_per_unit", "rty", "units_to_start", "scrap_cost_per_unit", "total_cogs",
+    "top_param", "top_impact", "elapsed_ms", "error",
+]
+
+
+def find_products(patterns: list) -> list:
+    """Expand directories (their *.json files) and glob patterns to sorted paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, "*.json")))
+        else:
+            paths.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted(paths)
+
+
+def param_label(entry: dict) -> str:
+    """Untranslated label of a run_sensitivity() entry."""
+    if entry["key"] == "volume":
+        return "volume"
+    if entry["key"] == "price":
+        return f"{entry['step']} - {entry['component']} (price)"
+    return f"{entry['step']} - {entry['key']}"
+
+
+def cost_product(path: str, sensitivity: bool = False, top_n: int = 5, lang: str = "fr") -> dict:
+    """Cost one product file. Never raises: failures are reported in `error`."""
+    start = time.perf_counter()
+    record = {"file": path}
+    try:
+        product = resolve_subassemblies(load_product(path))
+        steps, volume = product["steps"], product["volume"]
+        result = compute_cogs(steps, volume, lang=lang)
+        graph = routing_graph(steps)
+        linear = is_linear(graph)
+        if not linear:
+            result = {**result, **network_summary(evaluate_network(pack_routing(steps), graph, volume))}
+        name = product["name"]
+        record.update({
+            "name": name.get(lang, name.get("fr", "")) if isinstance(name, dict) else str(name),
+            "volume": volume,
+            "currency": product["currency"],
+            "n_steps": len(steps),
+            "n_components": sum(len(step["bom"]) for step in steps),
+            **{key: result[key] for key in (
+                "cogs_per_unit", "rty", "units_to_start", "scrap_cost_per_unit", "total_cogs",
+            )},
+        })
+        if sensitivity:
+            if linear:
+                impacts = run_sensitivity(steps, volume, lang=lang)[:top_n]
+            else:
+                impacts = network_sensitivity(steps, graph, volume, lang=lang)[:top_n]
+            for entry in impacts:
+                entry["param"] = param_label(entry)
+            if impacts:
+                record["top_param"] = impacts[0]["param"]
+                record["top_impact"] = impacts[0]["impact"]
+            record["sensitivity"] = impacts
+    except Exception as exc:  # reported per file, the batch goes on
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+class _Writer:
+    """Stream records to CSV or NDJSON as they complete."""
+
+    def __init__(self, stream, fmt: str, fields: list = RESULT_FIELDS):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self.csv = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, record: dict) -> None:
+        if self.fmt == "csv":
+            self.csv.writerow(record)
+        else:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def run_batch(paths: list, stream, fmt: str = "csv", sensitivity: bool = False,
+              top_n: int = 5, lang: str = "fr", workers: int = None) -> dict:
+    """Cost every path on a process pool, streaming results to `stream`.
+
+    Returns a summary dict: total, ok, failed, elapsed_s, products_per_s,
+    failures (list of {file, error}).
+    """
+    writer = _Writer(stream, fmt)
+    start = time.perf_counter()
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(cost_product, path, sensitivity, top_n, lang) for path in paths]
+        for future in as_completed(futures):
+            record = future.result()
+            if "error" in record:
+                failures.append({"file": record["file"], "error": record["error"]})
+            writer.write(record)
+    elapsed = time.perf_counter() - start
+    return {
+        "total": len(paths),
+        "ok": len(paths) - len(failures),
+        "failed": len(failures),
+        "elapsed_s": round(elapsed, 3),
+        "products_per_s": round(len(paths) / elapsed, 1) if elapsed > 0 else 0.0,
+        "failures": failures,
+    }
+
+
+def run_scenarios(product_path: str, scenario_path: str, stream, fmt: str = "csv") -> dict:
+    """Evaluate a scenario file against one product, streaming one record per scenario.
+
+    Returns a summary dict: total, failed (skipped rows), elapsed_s,
+    scenarios_per_s, failures (list of {row, error}).
+    """
+    start = time.perf_counter()
+    product = resolve_subassemblies(load_product(product_path))
+    steps, volume = product["steps"], product["volume"]
+    packed = pack_routing(steps)
+    with open(scenario_path, encoding="utf-8-sig") as f:
+        fmt_in = "ndjson" if scenario_path.endswith((".ndjson", ".jsonl")) else None
+        rows = read_scenario_rows(f.read(), fmt_in)
+    compiled = compile_scenarios(steps, packed, volume, rows)
+    base = compute_cogs(steps, volume)["cogs_per_unit"]
+
+    writer = _Writer(stream, fmt, SCENARIO_RESULT_FIELDS)
+    for offset, res in iter_scenario_results(packed, compiled):
+        for i, cogs in enumerate(res["cogs_per_unit"].tolist()):
+            writer.write({
+                "scenario": compiled["names"][offset + i],
+                "n_mods": int(compiled["n_mods"][offset + i]),
+                "cogs_per_unit": round(cogs, 4),
+                "rty": round(float(res["rty"][i]), 4),
+                "total_cogs": round(float(res["total_cogs"][i]), 2),
+                "delta": round(cogs - base, 4),
+                "delta_pct": round((cogs - base) / base * 100, 2) if base > 0 else None,
+            })
+    elapsed = time.perf_counter() - start
+    total = len(compiled["names"])
+    return {
+        "total": total,
+        "failed": len(compiled["errors"]),
+        "elapsed_s": round(elapsed, 3),
+        "scenarios_per_s": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "failures": [{"row": row, "error": error} for row, error in compiled["errors"]],
+    }
+
+
+def resource_label(portfolio: dict, key, lang: str = "fr") -> str:
+    """Shared resource id, or "product / step" for a private resource."""
+    if not isinstance(key, tuple):
+        return str(key)
+    segment, step_idx = key
+    label = portfolio["labels"][segment]
+    if isinstance(label, dict):
+        label = label.get(lang, label.get("fr", ""))
+    step = int(portfolio["bounds"][segment]) + step_idx
+    return f"{label} / {step_name({'name': portfolio['step_names'][step]}, lang)}"
+
+
+def run_capacity(paths: list, stream, fmt: str = "csv", shift: dict = None,
+                 lang: str = "fr") -> dict:
+    """Aggregate the load of every product on its resources, one record per resource.
+
+    Returns a summary dict: products, resources, bottleneck (label),
+    utilization (of the bottleneck) and elapsed_s.
+    """
+    start = time.perf_counter()
+    portfolio = pack_portfolio([load_product(path) for path in paths])
+    res = capacity(portfolio, shift)
+    n_steps = np.bincount(portfolio["resource"], minlength=len(portfolio["resources"]))
+    writer = _Writer(stream, fmt, CAPACITY_FIELDS)
+    for r, key in enumerate(portfolio["resources"]):
+        writer.write({
+            "resource": resource_label(portfolio, key, lang),
+            "n_steps": int(n_steps[r]),
+            "hours": round(float(res["resource_hours"][r]), 1),
+            "load": round(float(res["resource_load"][r]), 3),
+            "stations": int(res["resource_stations"][r]),
+            "stations_needed": int(res["resource_stations_needed"][r]),
+            "utilization": round(float(res["resource_utilization"][r]), 4),
+            "bottleneck": r == res["bottleneck"],
+        })
+    bottleneck = res["bottleneck"]
+    return {
+        "products": len(paths),
+        "resources": len(portfolio["resources"]),
+        "bottleneck": resource_label(portfolio, portfolio["resources"][bottleneck], lang)
+        if bottleneck >= 0 else None,
+        "utilization": float(res["resource_utilization"][bottleneck]) if bottleneck >= 0 else 0.0,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def run_portfolio(paths: list, stream, fmt: str = "csv", driver: str = "hours",
+                  resources: dict = None, lang: str = "fr") -> dict:
+    """Cost products sharing resources together, one record per product.
+
+    Each record compares COGS/unit with the products costed alone
+    (standalone_cogs). Returns a summary dict: products, shared (resources
+    used by several steps), elapsed_s.
+    """
+    start = time.perf_counter()
+    products = [load_product(path) for path in paths]
+    portfolio = pack_portfolio(products, resources)
+    standalone = PortfolioCosting(portfolio, "standalone").result()["cogs_per_unit"]
+    res = PortfolioCosting(portfolio, driver).result()
+    writer = _Writer(stream, fmt, PORTFOLIO_FIELDS)
+    for p, (path, product) in enumerate(zip(paths, products)):
+        name = product["name"]
+        cogs, alone = float(res["cogs_per_unit"][p]), float(standalone[p])
+        writer.write({
+            "file": path,
+            "name": name.get(lang, name.get("fr", "")) if isinstance(name, dict) else str(name),
+            "volume": product["volume"],
+            "standalone_cogs": round(alone, 4),
+            "cogs_per_unit": round(cogs, 4),
+            "delta": round(cogs - alone, 4),
+            "delta_pct": round((cogs - alone) / alone * 100, 2) if alone > 0 else None,
+            "total_cogs": round(float(res["total_cogs"][p]), 2),
+        })
+    n_steps = np.bincount(portfolio["resource"], minlength=len(portfolio["resources"]))
+    return {
+        "products": len(paths),
+        "shared": int((n_steps > 1).sum()),
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def run_attribution(before_path: str, after_path: str, stream, fmt: str = "csv",
+                    exact_max: int = 12, n_orders: int = 2000, seed: int = None,
+                    lang: str = "fr") -> dict:
+    """Shapley attribution of the COGS/unit change between two versions of a product.
+
+    One record per changed parameter, largest contribution first. Returns a
+    summary dict: changes, cogs_before, cogs_after, delta, method,
+    evaluations (coalitions costed) and elapsed_s.
+    """
+    start = time.perf_counter()
+    before = resolve_subassemblies(load_product(before_path))
+    after = resolve_subassemblies(load_product(after_path))
+    res = attribute_change(before["steps"], before["volume"], after["steps"], after["volume"],
+                           exact_max=exact_max, n_orders=n_orders, seed=seed)
+    steps = before["steps"]
+    components = [(step, comp) for step in steps for comp in step["bom"]]
+    writer = _Writer(stream, fmt, ATTRIBUTION_FIELDS)
+    for k in np.argsort(-np.abs(res["shapley"]), kind="stable").tolist():
+        key, idx = res["players"][k]
+        if key == "price":
+            step, comp = components[idx]
+            entry = {"key": key, "step": step_name(step, lang), "component": component_name(comp, lang)}
+        else:
+            entry = {"key": key, "step": step_name(steps[idx], lang) if idx >= 0 else ""}
+        contribution = float(res["shapley"][k])
+        writer.write({
+            "param": param_label(entry),
+            "before": float(res["before"][k]),
+            "after": float(res["after"][k]),
+            "contribution": round(contribution, 6),
+            "std_err": round(float(res["std_err"][k]), 6),
+            "alone": round(float(res["alone"][k]), 6),
+            "share_pct": round(contribution / res["delta"] * 100, 2) if res["delta"] else None,
+        })
+    return {
+        "changes": len(res["players"]),
+        "cogs_before": res["cogs_before"],
+        "cogs_after": res["cogs_after"],
+        "delta": res["delta"],
+        "method": res["method"],
+        "evaluations": res["evaluations"],
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cogs", description="COGS calculator engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="Cost every product JSON of directories or glob patterns")
+    batch.add_argument("inputs", nargs="+", help="Directories (*.json) or glob patterns")
+    batch.add_argument("-o", "--output", help="Output file (default: stdout)")
+    batch.add_argument("-f", "--format", choices=["csv", "ndjson"],
+                       help="Output format (default: from --output extension, else csv)")
+    batch.add_argument("-s", "--sensitivity", action="store_true",
+                       help="Also run the ±10%% sensitivity analysis")
+    batch.add_argument("--top", type=int, default=5, help="Sensitivity entries kept per product")
+    batch.add_argument("--lang", choices=["fr", "en"], default="fr", help="Language of names")
+    batch.add_argument("-j", "--workers", type=int, help="Worker processes (default: all cores)")
+
+    scenarios = sub.add_parser("scenarios", help="Evaluate a CSV/NDJSON scenario file against a product")
+    scenarios.add_argument("product", help="Product JSON file")
+    scenarios.add_argument("scenarios", help="Scenario file (scenario, param, step, new_value)")
+    scenarios.add_argument("-o", "--output", help="Output file (default: stdout)")
+    scenarios.add_argument("-f", "--format", choices=["csv", "ndjson"],
+                           help="Output format (default: from --output extension, else csv)")
+
+    cap = sub.add_parser("capacity", help="Load per resource of products sharing the same lines")
+    cap.add_argument("inputs", nargs="+", help="Directories (*.json) or glob patterns")
+    cap.add_argument("-o", "--output", help="Output file (default: stdout)")
+    cap.add_argument("-f", "--format", choices=["csv", "ndjson"],
+                     help="Output format (default: from --output extension, else csv)")
+    cap.add_argument("--shifts", type=int, default=DEFAULT_SHIFT["shifts_per_day"],
+                     help="Shifts per day")
+    cap.add_argument("--hours", type=float, default=DEFAULT_SHIFT["hours_per_shift"],
+                     help="Hours per shift")
+    cap.add_argument("--days", type=int, default=DEFAULT_SHIFT["days_per_week"],
+                     help="Working days per week")
+    cap.add_argument("--weeks", type=int, default=DEFAULT_SHIFT["weeks_per_year"],
+                     help="Working weeks per year")
+    cap.add_argument("--lang", choices=["fr", "en"], default="fr", help="Language of names")
+
+    pf = sub.add_parser("portfolio", help="Cost products together with shared FOH allocation")
+    pf.add_argument("inputs", nargs="+", help="Directories (*.json) or glob patterns")
+    pf.add_argument("-o", "--output", help="Output file (default: stdout)")
+    pf.add_argument("-f", "--format", choices=["csv", "ndjson"],
+                    help="Output format (default: from --output extension, else csv)")
+    pf.add_argument("-d", "--driver", choices=ALLOCATION_DRIVERS, default="hours",
+                    help="FOH allocation driver of shared resources")
+    pf.add_argument("-r", "--resources",
+                    help="JSON file {resource: {foh_total, stations}} of the shared resources")
+    pf.add_argument("--lang", choices=["fr", "en"], default="fr", help="Language of names")
+
+    at = sub.add_parser("attribution",
+                        help="Split the COGS/unit change between two versions over the changed parameters")
+    at.add_argument("before", help="Product JSON file of the first version")
+    at.add_argument("after", help="Product JSON file of the second version")
+    at.add_argument("-o", "--output", help="Output file (default: stdout)")
+    at.add_argument("-f", "--format", choices=["csv", "ndjson"],
+                    help="Output format (default: from --output extension, else csv)")
+    at.add_argument("--exact-max", type=int, default=12,
+                    help="Exact Shapley values up to this many changes (at most 16), sampled beyond")
+    at.add_argument("--orders", type=int, default=2000, help="Random orders of the sampled estimate")
+    at.add_argument("--seed", type=int, help="Random seed of the sampled estimate")
+    at.add_argument("--lang", choices=["fr", "en"], default="fr", help="Language of names")
+    return parser
+
+
+@contextmanager
+def _open_output(args):
+    """(stream, format) of a subcommand's --output / --format options.
+
+    The format defaults to ndjson for a .ndjson / .jsonl output, else csv;
+    the stream is stdout without --output, else the file, closed on exit.
+    """
+    fmt = args.format or ("ndjson" if (args.output or "").endswith((".ndjson", ".jsonl")) else "csv")
+    if not args.output:
+        yield sys.stdout, fmt
+        return
+    with open(args.output, "w", newline="", encoding="utf-8") as out:
+        yield out, fmt
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "scenarios":
+        return main_scenarios(args)
+    if args.command == "capacity":
+        return main_capacity(args)
+    if args.command == "portfolio":
+        return main_portfolio(args)
+    if args.command == "attribution":
+        return main_attribution(args)
+    paths = find_products(args.inputs)
+    if not paths:
+        print("No product JSON file found.", file=sys.stderr)
+        return 2
+
+    with _open_output(args) as (out, fmt):
+        summary = run_batch(paths, out, fmt=fmt, sensitivity=args.sensitivity,
+                            top_n=args.top, lang=args.lang, workers=args.workers)
+
+    print(
+        f"{summary['ok']}/{summary['total']} products costed in {summary['elapsed_s']:.2f} s "
+        f"({summary['products_per_s']:.1f} products/s), {summary['failed']} failed",
+        file=sys.stderr,
+    )
+    for failure in summary["failures"]:
+        print(f"  {failure['file']}: {failure['error']}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+def main_scenarios(args) -> int:
+    try:
+        with _open_output(args) as (out, fmt):
+            summary = run_scenarios(args.product, args.scenarios, out, fmt=fmt)
+    except (OSError, ValueError, csv.Error) as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"{summary['total']} scenarios evaluated in {summary['elapsed_s']:.2f} s "
+        f"({summary['scenarios_per_s']:.1f} scenarios/s), {summary['failed']} rows skipped",
+        file=sys.stderr,
+    )
+    for failure in summary["failures"]:
+        print(f"  row {failure['row']}: {failure['error']}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+def main_capacity(args) -> int:
+    paths = find_products(args.inputs)
+    if not paths:
+        print("No product JSON file found.", file=sys.stderr)
+        return 2
+    shift = {"shifts_per_day": args.shifts, "hours_per_shift": args.hours,
+             "days_per_week": args.days, "weeks_per_year": args.weeks}
+    try:
+        with _open_output(args) as (out, fmt):
+            summary = run_capacity(paths, out, fmt=fmt, shift=shift, lang=args.lang)
+    except (OSError, ValueError) as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"{summary['products']} products on {summary['resources']} resources in "
+        f"{summary['elapsed_s']:.2f} s, bottleneck: {summary['bottleneck']} "
+        f"({summary['utilization']:.0%})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main_portfolio(args) -> int:
+    paths = find_products(args.inputs)
+    if not paths:
+        print("No product JSON file found.", file=sys.stderr)
+        return 2
+    try:
+        resources = None
+        if args.resources:
+            with open(args.resources, encoding="utf-8") as f:
+                resources = json.load(f)
+        with _open_output(args) as (out, fmt):
+            summary = run_portfolio(paths, out, fmt=fmt, driver=args.driver, resources=resources,
+                                    lang=args.lang)
+    except (OSError, ValueError) as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"{summary['products']} products costed together in {summary['elapsed_s']:.2f} s, "
+        f"{summary['shared']} shared resources ({args.driver} allocation)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main_attribution(args) -> int:
+    try:
+        with _open_output(args) as (out, fmt):
+            summary = run_attribution(args.before, args.after, out, fmt=fmt,
+                                      exact_max=args.exact_max, n_orders=args.orders,
+                                      seed=args.seed, lang=args.lang)
+    except (OSError, ValueError) as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+        return 2
+
+    print(
+        f"COGS/unit {summary['cogs_before']:.4f} -> {summary['cogs_after']:.4f} "
+        f"({summary['delta']:+.4f}) over {summary['changes']} changes, {summary['method']} "
+        f"Shapley values from {summary['evaluations']} coalitions in {summary['elapsed_s']:.2f} s",
+        file=sys.stderr,
+    )
+    return 0
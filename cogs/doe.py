@@ -0,0 +1,170 @@
+"""Design of experiments: factorial designs evaluated in one batched pass.
+
+A factor is {key, idx, levels}: a step parameter (idx = step index), a
+component price (key "price", idx = flat component index) or the volume
+(idx = -1). A design is an (R, F) matrix of level indices, so runs are never
+materialized as routing dicts: values are looked up per chunk and evaluated
+through compute_cogs_batch() on the factor columns only.
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index
+
+FACTOR_LETTERS = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+
+
+def full_factorial(n_levels: list) -> np.ndarray:
+    """All level combinations, last factor varying fastest: (Π L, F) int array."""
+    if not n_levels:
+        return np.zeros((1, 0), dtype=np.int32)
+    grids = np.indices(n_levels, dtype=np.int32)
+    return grids.reshape(len(n_levels), -1).T
+
+
+def _aberration(generators: list, n_base: int, n_factors: int) -> tuple:
+    """Word-length pattern of the defining relation, negated for max().
+
+    Maximizing it gives the highest resolution, then the fewest shortest
+    words (minimum aberration).
+    """
+    words = [0]
+    for j, mask in enumerate(generators):
+        word = mask | 1 << (n_base + j)
+        words += [word ^ w for w in words]
+    counts = [0] * (n_factors + 1)
+    for w in words[1:]:
+        counts[bin(w).count("1")] += 1
+    return tuple(-c for c in counts)
+
+
+def fractional_generators(n_factors: int, fraction: int, max_search: int = 20000) -> list:
+    """Generators of a two-level 2^(k-p) design.
+
+    The first k - p factors form a full factorial; each of the p others is
+    aliased with an interaction of them (a bitmask over the base factors).
+    Generator sets are searched exhaustively for minimum aberration when
+    there are at most max_search of them, greedily otherwise.
+    Returns the p base-factor masks.
+    """
+    n_base = n_factors - fraction
+    candidates = [m for m in range(1, 2 ** n_base) if bin(m).count("1") >= 2]
+    if fraction < 0 or n_base < 1 or fraction > len(candidates):
+        raise ValueError(f"No 2^({n_factors}-{fraction}) design: too many generated factors")
+
+    def score(gens):
+        return _aberration(gens, n_base, n_factors)
+
+    if math.comb(len(candidates), fraction) <= max_search:
+        return list(max(itertools.combinations(candidates, fraction), key=score))
+    generators = []
+    for _ in range(fraction):
+        generators.append(max(
+            (m for m in candidates if m not in generators),
+            key=lambda m: score(generators + [m]),
+        ))
+    return generators
+
+
+def fractional_factorial(n_factors: int, fraction: int) -> tuple:
+    """Two-level 2^(k-p) design.
+
+    Returns (design, generators): design is a (2^(k-p), k) array of level
+    indices (0 = low, 1 = high); generators are readable strings such as
+    "E = ABCD".
+    """
+    n_base = n_factors - fraction
+    masks = fractional_generators(n_factors, fraction)
+    base = full_factorial([2] * n_base)
+    signs = 2 * base - 1
+    design = np.empty((len(base), n_factors), dtype=np.int32)
+    design[:, :n_base] = base
+    labels = []
+    for j, mask in enumerate(masks):
+        members = [b for b in range(n_base) if mask >> b & 1]
+        design[:, n_base + j] = np.prod(signs[:, members], axis=1) > 0
+        labels.append(
+            f"{FACTOR_LETTERS[n_base + j]} = " + "".join(FACTOR_LETTERS[b] for b in members)
+        )
+    return design, labels
+
+
+def factor_columns(packed: dict, factors: list) -> list:
+    """Parameter column of each factor (-1 for the volume)."""
+    columns = [
+        -1 if f["key"] == "volume" else param_index(packed, f["key"], f["idx"])
+        for f in factors
+    ]
+    seen = [c for c in columns if c >= 0]
+    if len(seen) != len(set(seen)) or columns.count(-1) > 1:
+        raise ValueError("Each parameter can only be used by one factor")
+    return columns
+
+
+def run_doe(packed: dict, volume: float, factors: list, design: np.ndarray,
+            chunk_size: int = 50000) -> dict:
+    """Evaluate every run of a design.
+
+    Returns dict with (R,) arrays: cogs_per_unit, rty, total_cogs.
+    """
+    columns = factor_columns(packed, factors)
+    levels = [np.asarray(f["levels"], dtype=float) for f in factors]
+    step_pos = [f for f, col in enumerate(columns) if col >= 0]
+    volume_pos = columns.index(-1) if -1 in columns else None
+    step_columns = [columns[f] for f in step_pos]
+
+    n_runs = len(design)
+    out = {key: np.empty(n_runs) for key in ("cogs_per_unit", "rty", "total_cogs")}
+    for start in range(0, n_runs, chunk_size):
+        chunk = design[start:start + chunk_size]
+        values = np.empty((len(chunk), len(step_pos)))
+        for pos, f in enumerate(step_pos):
+            values[:, pos] = levels[f][chunk[:, f]]
+        volumes = volume if volume_pos is None else \
+            np.maximum(levels[volume_pos][chunk[:, volume_pos]], 1.0)
+        res = compute_cogs_batch(packed, values, volumes, step_columns)
+        for key in out:
+            out[key][start:start + len(chunk)] = res[key]
+    return out
+
+
+def main_effects(design: np.ndarray, response: np.ndarray, n_levels: list) -> list:
+    """Mean response at each level of each factor: one (L_f,) array per factor."""
+    return [
+        np.bincount(design[:, f], weights=response, minlength=n)
+        / np.maximum(np.bincount(design[:, f], minlength=n), 1)
+        for f, n in enumerate(n_levels)
+    ]
+
+
+def interaction_means(design: np.ndarray, response: np.ndarray, a: int, b: int,
+                      n_levels: list) -> np.ndarray:
+    """Mean response for each (level of a, level of b): (L_a, L_b) array.
+
+    Cells absent from a fractional design are NaN.
+    """
+    cells = design[:, a] * n_levels[b] + design[:, b]
+    size = n_levels[a] * n_levels[b]
+    counts = np.bincount(cells, minlength=size)
+    sums = np.bincount(cells, weights=response, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums / counts).reshape(n_levels[a], n_levels[b])
+
+
+def interaction_strengths(design: np.ndarray, response: np.ndarray, n_levels: list) -> list:
+    """Rank factor pairs by interaction size.
+
+    The size is the spread of the two-way cell means left after removing both
+    main effects. Returns (a, b, strength) tuples sorted by strength.
+    """
+    grand = response.mean()
+    effects = main_effects(design, response, n_levels)
+    pairs = []
+    for a, b in itertools.combinations(range(len(n_levels)), 2):
+        cell = interaction_means(design, response, a, b, n_levels)
+        resid = cell - effects[a][:, None] - effects[b][None, :] + grand
+        pairs.append((a, b, float(np.nanmax(np.abs(resid))) if np.isfinite(resid).any() else 0.0))
+    return sorted(pairs, key=lambda p: p[2], reverse=True)
@@ -0,0 +1,352 @@
+"""Vectorized cascade cost engine.
+
+A routing is packed once into struct-of-arrays form (pack_routing) and then
+evaluated for one configuration (evaluate_routing, compute_cogs) or for K
+parameter sets at a time (compute_cogs_batch).
+"""
+
+import numpy as np
+
+from .bom import bom_columns, bom_tiers, tier_index
+from .model import STEP_DEFAULTS, STEP_PARAMS, step_name
+
+
+def pack_routing(steps_data: list) -> dict:
+    """Pack a routing into struct-of-arrays form.
+
+    Returns dict with one float array of length N per step parameter and a flat
+    component table of length M (the columns of cogs.bom): comp_step (int32
+    step index), comp_qty, comp_price, comp_scrap; and comp_tiers (see
+    bom.bom_tiers) when some lines have quantity-break prices.
+    """
+    packed = {
+        key: np.array([step.get(key, STEP_DEFAULTS[key]) for step in steps_data], dtype=float)
+        for key in STEP_PARAMS
+    }
+    bom = bom_columns(steps_data)
+    packed["comp_step"] = bom["step"]
+    packed["comp_qty"] = bom["qty"]
+    packed["comp_price"] = bom["price"]
+    packed["comp_scrap"] = bom["scrap"]
+    tiers = bom_tiers(steps_data)
+    if tiers is not None:
+        packed["comp_tiers"] = tiers
+    return packed
+
+
+def material_factors(packed: dict) -> np.ndarray:
+    """Material cost per unit of component price: qty / (1 - scrap)."""
+    denom = 1 - packed["comp_scrap"]
+    return packed["comp_qty"] / np.where(denom > 0, denom, 1.0)
+
+
+def entering_weights(yld: np.ndarray) -> np.ndarray:
+    """Units entering each step per good unit out, along the last axis: prod_{j>=i} 1 / y_j."""
+    gain = 1.0 / np.where(yld > 0, yld, 1.0)
+    return np.flip(np.cumprod(np.flip(gain, axis=-1), axis=-1), axis=-1)
+
+
+def tier_quantities(packed: dict, volume, weights: np.ndarray = None) -> np.ndarray:
+    """Units bought per year of the tiered BOM lines: V * w_i * qty / (1 - scrap)."""
+    line = packed["comp_tiers"]["line"]
+    if weights is None:
+        weights = entering_weights(packed["yield"])
+    return (np.asarray(volume, dtype=float) * weights[..., packed["comp_step"][line]]
+            * material_factors(packed)[line])
+
+
+def tiered_prices(packed: dict, volume, weights: np.ndarray = None, base=None) -> np.ndarray:
+    """Unit price of the tiered BOM lines at an annual volume.
+
+    A line buys tier_quantities() units per year, w_i being the units
+    entering its step per good unit (default entering_weights of the
+    yields), and pays the price of the last break at or below that quantity.
+    volume is a scalar or a (K, 1) column, weights (N,) or (K, N) and base
+    (the price below the first break, default comp_price) (L,) or (K, L).
+    Returns (L,) or (K, L) prices; a single pass, as prices feed nothing but
+    material.
+    """
+    tiers = packed["comp_tiers"]
+    line = tiers["line"]
+    if base is None:
+        base = packed["comp_price"][line]
+    idx = tier_index(tiers, tier_quantities(packed, volume, weights))
+    return np.where(idx > 0, tiers["prices"][np.arange(len(line)), idx], base)
+
+
+def component_prices(packed: dict, volume: float, weights: np.ndarray = None) -> np.ndarray:
+    """Unit price of every BOM line at an annual volume (comp_price when no tiers)."""
+    if "comp_tiers" not in packed:
+        return packed["comp_price"]
+    prices = packed["comp_price"].copy()
+    prices[packed["comp_tiers"]["line"]] = tiered_prices(packed, volume, weights)
+    return prices
+
+
+def yielded_cascade(cost_added: np.ndarray, yld: np.ndarray) -> np.ndarray:
+    """Yielded cost after each step, along the last axis.
+
+    Closed form of Y_i = (Y_{i-1} + c_i) / y_i (steps with y_i <= 0 do not
+    divide): Y_i = G_i * sum_{k<=i} c_k / G_{k-1}, with G the cumulative
+    product of 1 / y.
+    """
+    gain = 1.0 / np.where(yld > 0, yld, 1.0)
+    growth = np.cumprod(gain, axis=-1)
+    return growth * np.cumsum(cost_added * gain / growth, axis=-1)
+
+
+def process_costs(fields: dict, volume) -> dict:
+    """Per-unit DL, VOH and FOH from step parameter arrays.
+
+    Works on any broadcastable shapes (N,) or (K, N); volume is a scalar or a
+    (K, 1) column.
+    """
+    effective_uph = fields["uph"] * fields["availability"] * fields["performance"]
+    running = effective_uph > 0
+    safe_uph = np.where(running, effective_uph, 1.0)
+    volume = np.asarray(volume, dtype=float)
+    safe_volume = np.where(volume > 0, volume, 1.0)
+    return {
+        "effective_uph": effective_uph,
+        "dl": np.where(running, fields["nb_operators"] * fields["dl_rate"] / safe_uph, 0.0),
+        "voh": np.where(running, fields["voh_rate"] / safe_uph, 0.0),
+        "foh": np.where(volume > 0, fields["foh_total"] / safe_volume, 0.0),
+    }
+
+
+def step_material(packed: dict, prices: np.ndarray = None) -> np.ndarray:
+    """Material cost per unit for each step (segmented sum over the BOM table).
+
+    prices overrides comp_price (e.g. component_prices() at a volume).
+    """
+    if prices is None:
+        prices = packed["comp_price"]
+    return np.bincount(
+        packed["comp_step"],
+        weights=material_factors(packed) * prices,
+        minlength=len(packed["uph"]),
+    )
+
+
+def evaluate_routing(packed: dict, volume: float) -> dict:
+    """Vectorized cost engine over a packed routing.
+
+    Returns unrounded per-step arrays (effective_uph, oee, material, dl, voh,
+    foh, cost_added, yielded_cost, scrap_cost) and global scalars. Tiered
+    component prices are resolved at the volume.
+    """
+    n_steps = len(packed["uph"])
+    costs = process_costs(packed, volume)
+    material = step_material(packed, component_prices(packed, volume))
+    cost_added = material + costs["dl"] + costs["voh"] + costs["foh"]
+
+    yld = packed["yield"]
+    yielded_cost = yielded_cascade(cost_added, yld)
+    scrap_cost = np.where((yld > 0) & (yld < 1), yielded_cost * (1 - yld), 0.0)
+    rty = float(np.prod(yld))
+    cogs = float(yielded_cost[-1]) if n_steps else 0.0
+
+    return {
+        "effective_uph": costs["effective_uph"],
+        "oee": packed["availability"] * packed["performance"] * yld,
+        "material": material,
+        "dl": costs["dl"],
+        "voh": costs["voh"],
+        "foh": costs["foh"],
+        "cost_added": cost_added,
+        "yielded_cost": yielded_cost,
+        "scrap_cost": scrap_cost,
+        "cogs_per_unit": cogs,
+        "rty": rty,
+        "units_to_start": volume / rty if rty > 0 else volume,
+    }
+
+
+# ─── Batched evaluation ─────────────────────────────────────────────────────
+def param_columns(packed: dict) -> list:
+    """Layout of the flat parameter vector: one (key, index) tuple per column.
+
+    The first 8·N columns are the step parameters, field-major in STEP_PARAMS
+    order ((key, step_idx)); the last M columns are component prices
+    (("price", comp_idx)).
+    """
+    n_steps = len(packed["uph"])
+    columns = [(key, i) for key in STEP_PARAMS for i in range(n_steps)]
+    columns += [("price", j) for j in range(len(packed["comp_price"]))]
+    return columns
+
+
+def param_index(packed: dict, key: str, idx: int) -> int:
+    """Column of a step parameter (key, step_idx) or of ("price", comp_idx)."""
+    n_steps = len(packed["uph"])
+    if key == "price":
+        return len(STEP_PARAMS) * n_steps + idx
+    return STEP_PARAMS.index(key) * n_steps + idx
+
+
+def param_vector(packed: dict) -> np.ndarray:
+    """Base parameter vector of a packed routing (see param_columns)."""
+    return np.concatenate([packed[key] for key in STEP_PARAMS] + [packed["comp_price"]])
+
+
+def batch_fields(packed: dict, params: np.ndarray, columns: np.ndarray) -> tuple:
+    """Expand K parameter rows into step fields and material.
+
+    Step fields that no column touches stay as broadcast (1, N) rows; the
+    material of touched components is applied as a price delta.
+    Returns (fields, material) with arrays of shape (K, N) or (1, N).
+    """
+    n_steps = len(packed["uph"])
+    n_rows = params.shape[0]
+    fields = {}
+    for f, key in enumerate(STEP_PARAMS):
+        sel = (columns >= f * n_steps) & (columns < (f + 1) * n_steps)
+        arr = packed[key][None, :]
+        if sel.any():
+            arr = np.repeat(arr, n_rows, axis=0)
+            arr[:, columns[sel] - f * n_steps] = params[:, sel]
+        fields[key] = arr
+
+    material = step_material(packed)[None, :]
+    sel = columns >= len(STEP_PARAMS) * n_steps
+    if sel.any():
+        comp = columns[sel] - len(STEP_PARAMS) * n_steps
+        delta = (params[:, sel] - packed["comp_price"][comp]) * material_factors(packed)[comp]
+        to_step = np.zeros((len(comp), n_steps))
+        to_step[np.arange(len(comp)), packed["comp_step"][comp]] = 1.0
+        material = material + delta @ to_step
+    return fields, material
+
+
+def tier_material(packed: dict, params: np.ndarray, columns: np.ndarray, volumes: np.ndarray,
+                  yld: np.ndarray) -> np.ndarray:
+    """Material change of every step from resolving tiered prices, (K, N).
+
+    The base price of a tiered line is its price column when one is given;
+    volumes is a (K, 1) column and yld the (K, N) or (1, N) yields. The lines
+    of a step are contiguous, so the per-step sums are one reduceat.
+    """
+    tiers = packed["comp_tiers"]
+    line = tiers["line"]
+    offset = len(STEP_PARAMS) * len(packed["uph"])
+    base = packed["comp_price"][line][None, :]
+    position = np.full(len(packed["comp_price"]), -1)
+    position[line] = np.arange(len(line))
+    sel = np.flatnonzero(columns >= offset)
+    sel = sel[position[columns[sel] - offset] >= 0]
+    if len(sel):
+        base = np.repeat(base, params.shape[0], axis=0)
+        base[:, position[columns[sel] - offset]] = params[:, sel]
+    price = tiered_prices(packed, volumes, entering_weights(yld), base)
+    delta = (price - base) * material_factors(packed)[line]
+    steps, start = np.unique(packed["comp_step"][line], return_index=True)
+    out = np.zeros((delta.shape[0], len(packed["uph"])))
+    out[:, steps] = np.add.reduceat(delta, start, axis=1)
+    return out
+
+
+def compute_cogs_batch(packed: dict, params, volumes, columns=None) -> dict:
+    """Evaluate K parameter sets against one packed routing in a single pass.
+
+    params is a (K, P) matrix of full parameter vectors (see param_columns),
+    or (K, C) values for the C unique columns listed in `columns`, all other
+    parameters keeping their base value. volumes is a scalar or K volumes;
+    tiered component prices are resolved per row (volume and yields).
+    Returns dict of (K,) arrays: cogs_per_unit, rty, scrap_cost_per_unit,
+    units_to_start, total_cogs.
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    n_rows = params.shape[0]
+    if columns is None:
+        columns = np.arange(params.shape[1])
+    columns = np.asarray(columns, dtype=int)
+    volumes = np.broadcast_to(np.asarray(volumes, dtype=float), (n_rows,))
+
+    fields, material = batch_fields(packed, params, columns)
+    if "comp_tiers" in packed:
+        material = material + tier_material(packed, params, columns, volumes[:, None],
+                                            fields["yield"])
+    costs = process_costs(fields, volumes[:, None])
+    cost_added = material + costs["dl"] + costs["voh"] + costs["foh"]
+    yld = np.broadcast_to(fields["yield"], cost_added.shape)
+
+    if cost_added.shape[1]:
+        cogs = yielded_cascade(cost_added, yld)[:, -1]
+    else:
+        cogs = np.zeros(n_rows)
+    rty = np.prod(yld, axis=1)
+    return {
+        "cogs_per_unit": cogs,
+        "rty": rty,
+        "scrap_cost_per_unit": cogs - cost_added.sum(axis=1),
+        "units_to_start": np.where(rty > 0, volumes / np.where(rty > 0, rty, 1.0), volumes),
+        "total_cogs": cogs * volumes,
+    }
+
+
+def cogs_payload(steps_data: list, volume: int, packed: dict = None) -> dict:
+    """Label-free COGS result: compute_cogs() without step names.
+
+    Depends only on the numeric model, so it can be cached across languages.
+    `packed` may be passed when the caller already packed steps_data.
+    """
+    if packed is None:
+        packed = pack_routing(steps_data)
+    return format_payload(evaluate_routing(packed, volume), steps_data, volume)
+
+
+def format_payload(ev: dict, steps_data: list, volume: int) -> dict:
+    """Round an evaluate_routing() result into the label-free compute_cogs() shape.
+
+    Rounding is applied to the output only.
+    """
+    rounded = {
+        key: np.round(ev[key], 4).tolist()
+        for key in ("material", "dl", "voh", "foh", "cost_added", "yielded_cost", "scrap_cost")
+    }
+    effective_uph = np.round(ev["effective_uph"], 1).tolist()
+    oee = np.round(ev["oee"] * 100, 1).tolist()
+
+    results = [{
+        "step_idx": i,
+        "uph": step.get("uph", STEP_DEFAULTS["uph"]),
+        "effective_uph": effective_uph[i],
+        "oee": oee[i],
+        "material": rounded["material"][i],
+        "dl": rounded["dl"][i],
+        "voh": rounded["voh"][i],
+        "foh": rounded["foh"][i],
+        "cost_added": rounded["cost_added"][i],
+        "yield": step.get("yield", STEP_DEFAULTS["yield"]),
+        "yielded_cost": rounded["yielded_cost"][i],
+        "scrap_cost": rounded["scrap_cost"][i],
+    } for i, step in enumerate(steps_data)]
+
+    yielded_cost = ev["cogs_per_unit"]
+    total_cost_added = sum(rounded["cost_added"])
+    total_scrap_cost = round(yielded_cost - total_cost_added, 4) if results else 0
+
+    return {
+        "steps": results,
+        "cogs_per_unit": round(yielded_cost, 4),
+        "rty": round(ev["rty"], 4),
+        "units_to_start": round(ev["units_to_start"], 0),
+        "scrap_cost_per_unit": total_scrap_cost,
+        "total_cogs": round(yielded_cost * volume, 2),
+    }
+
+
+def label_result(payload: dict, steps_data: list, lang: str = "fr") -> dict:
+    """Attach step names to a cogs_payload() result without mutating it."""
+    return dict(payload, steps=[
+        {"step_idx": entry["step_idx"], "name": step_name(step, lang), **entry}
+        for entry, step in zip(payload["steps"], steps_data)
+    ])
+
+
+def compute_cogs(steps_data: list, volume: int, lang: str = "fr") -> dict:
+    """Compute COGS for all steps using cascade model.
+
+    Returns dict with per-step results and global metrics.
+    """
+    return label_result(cogs_payload(steps_data, volume), steps_data, lang)
@@ -0,0 +1,212 @@
+"""Equipment: capex and depreciation that feed FOH, with batched alternatives.
+
+A step may carry `equipment`: {"options": [...], "selected": k, "other_foh": F0}
+where each option is {name, capex, life (years), method, salvage, maintenance
+(fraction of capex per year), uph, availability, performance}; the process
+fields an option leaves out keep the step's value. The selected option sets
+
+    foh_total = F0 + (capex - salvage) / life + maintenance * capex
+
+i.e. the average depreciation over the useful life, whatever the method; the
+method ("straight_line" or "declining_balance", double declining switching to
+straight line) shapes the yearly FOH schedule (see cogs.timephased).
+
+Alternatives are a (K, S) matrix choosing one option for each of the S
+equipped steps. Every row is costed twice, with and without depreciation (a
+non-cash charge), in one compute_cogs_batch() call per chunk. Against the
+current selection (row 0):
+
+    investment = capex of the options that change
+    saving     = (cash COGS/unit of row 0 - of the row) * V per year
+    payback    = investment / saving
+    NPV        = -investment + saving * (1 - (1 + r)^-H) / r
+                 + book value at H of the new equipment / (1 + r)^H
+"""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index
+
+DEPRECIATION_METHODS = ("straight_line", "declining_balance")
+EQUIPMENT_FIELDS = ("uph", "availability", "performance")
+
+
+def option_terms(option: dict) -> dict:
+    """Numeric terms of an equipment option: capex, life, salvage, maintenance, method."""
+    method = option.get("method") or "straight_line"
+    if method not in DEPRECIATION_METHODS:
+        raise ValueError(f"Unknown depreciation method: {method!r}")
+    capex = float(option.get("capex", 0) or 0)
+    return {
+        "capex": capex,
+        "life": max(int(round(float(option.get("life", 5) or 5))), 1),
+        "salvage": min(float(option.get("salvage", 0) or 0), capex),
+        "maintenance": float(option.get("maintenance", 0) or 0),
+        "method": method,
+    }
+
+
+def depreciation_schedule(option: dict, n_years: int) -> np.ndarray:
+    """Depreciation charge of every year (0 past the useful life)."""
+    terms = option_terms(option)
+    capex, life, salvage = terms["capex"], terms["life"], terms["salvage"]
+    out = np.zeros(n_years)
+    if terms["method"] == "straight_line":
+        out[:min(life, n_years)] = (capex - salvage) / life
+        return out
+    book = capex
+    for year in range(min(life, n_years)):
+        charge = max(book * 2 / life, (book - salvage) / (life - year))
+        out[year] = min(charge, book - salvage)
+        book -= out[year]
+    return out
+
+
+def book_value(option: dict, years: int) -> float:
+    """Net book value after `years` of depreciation."""
+    return option_terms(option)["capex"] - float(depreciation_schedule(option, years).sum())
+
+
+def annual_foh(option: dict, other_foh: float = 0.0) -> float:
+    """Annual FOH of a step running this option (average depreciation over life)."""
+    terms = option_terms(option)
+    depreciation = (terms["capex"] - terms["salvage"]) / terms["life"]
+    return other_foh + depreciation + terms["maintenance"] * terms["capex"]
+
+
+def apply_equipment(step: dict) -> dict:
+    """Step with foh_total, foh_schedule and process fields of its selected option.
+
+    A process field that some options set and others leave out is first
+    filled in with the step's value, so switching options later does not
+    inherit the previous option's value. Returns the step unchanged when it
+    has no equipment options.
+    """
+    equipment = step.get("equipment") or {}
+    options = equipment.get("options") or []
+    if not options:
+        return step
+    fields = [key for key in EQUIPMENT_FIELDS
+              if key in step and any(option.get(key) is not None for option in options)]
+    options = [{**option, **{key: step[key] for key in fields if option.get(key) is None}}
+               for option in options]
+    option = options[min(int(equipment.get("selected", 0) or 0), len(options) - 1)]
+    terms = option_terms(option)
+    other = float(equipment.get("other_foh", 0) or 0)
+    depreciation = depreciation_schedule(option, terms["life"] + 1)
+    schedule = other + terms["maintenance"] * terms["capex"] + depreciation
+    out = {**step, "equipment": {**equipment, "options": options},
+           "foh_total": annual_foh(option, other), "foh_schedule": schedule.tolist()}
+    for key in fields:
+        out[key] = option[key]
+    return out
+
+
+def pack_equipment(steps_data: list, horizon: int = 5) -> dict:
+    """Flat table of the equipment options of a routing.
+
+    Returns dict with (S,) arrays steps (indexes of the equipped steps) and
+    selected (flat index of each step's current option), bounds ((S + 1,)
+    option ranges) and per option (O,) arrays owner (index into steps),
+    capex, foh (annual, with depreciation), cash_foh (without), residual
+    (book value after `horizon` years), uph / availability / performance (NaN:
+    keep the step's value) and names.
+    """
+    steps, selected, bounds, rows = [], [], [0], []
+    for i, step in enumerate(steps_data):
+        equipment = step.get("equipment") or {}
+        options = equipment.get("options") or []
+        if not options:
+            continue
+        other = float(equipment.get("other_foh", 0) or 0)
+        selected.append(bounds[-1] + min(int(equipment.get("selected", 0) or 0), len(options) - 1))
+        for option in options:
+            terms = option_terms(option)
+            rows.append((len(steps), option, terms, other))
+        steps.append(i)
+        bounds.append(len(rows))
+    table = {
+        "steps": np.array(steps, dtype=int),
+        "selected": np.array(selected, dtype=int),
+        "bounds": np.array(bounds, dtype=int),
+        "owner": np.array([owner for owner, _, _, _ in rows], dtype=int),
+        "capex": np.array([terms["capex"] for _, _, terms, _ in rows]),
+        "foh": np.array([annual_foh(option, other) for _, option, _, other in rows]),
+        "cash_foh": np.array([other + terms["maintenance"] * terms["capex"]
+                              for _, _, terms, other in rows]),
+        "residual": np.array([book_value(option, horizon) for _, option, _, _ in rows]),
+        "names": [str(option.get("name") or f"#{k + 1}")
+                  for k, (_, option, _, _) in enumerate(rows)],
+    }
+    for key in EQUIPMENT_FIELDS:
+        table[key] = np.array([
+            np.nan if option.get(key) is None else float(option[key]) for _, option, _, _ in rows
+        ])
+    return table
+
+
+def equipment_configurations(table: dict, max_rows: int = 200_000) -> np.ndarray:
+    """Alternatives to cost: (K, S) flat option indexes, row 0 the current selection.
+
+    Every combination when there are at most max_rows of them, otherwise
+    every option of every step alone (the other steps keeping theirs).
+    """
+    current = table["selected"]
+    sizes = np.diff(table["bounds"])
+    if np.prod(sizes.astype(float)) <= max_rows:
+        grid = np.indices(sizes).reshape(len(sizes), -1).T + table["bounds"][:-1]
+        grid = grid[(grid != current).any(axis=1)]
+    else:
+        options = np.arange(len(table["owner"]))
+        options = options[options != current[table["owner"]]]
+        grid = np.repeat(current[None, :], len(options), axis=0)
+        grid[np.arange(len(options)), table["owner"][options]] = options
+    return np.vstack([current[None, :], grid])
+
+
+def evaluate_equipment(packed: dict, table: dict, volume: float, choice: np.ndarray,
+                       rate: float = 0.08, horizon: int = 5, chunk_size: int = 50_000) -> dict:
+    """COGS/unit, payback and NPV of every alternative (row of choice).
+
+    table comes from pack_equipment(steps_data, horizon). Returns dict with
+    (K,) arrays cogs_per_unit, cash_cogs_per_unit (without depreciation),
+    investment, annual_saving, payback (years, inf when it never pays back)
+    and npv; and best (row of the highest NPV).
+    """
+    choice = np.atleast_2d(choice)
+    n_rows, n_equipped = choice.shape
+    steps = table["steps"]
+    keys = ("foh_total",) + EQUIPMENT_FIELDS
+    columns = np.concatenate([[param_index(packed, key, int(i)) for i in steps] for key in keys])
+    cogs = np.empty(n_rows)
+    cash = np.empty(n_rows)
+    for start in range(0, n_rows, chunk_size):
+        rows = choice[start:start + chunk_size]
+        process = [np.where(np.isnan(table[key][rows]), packed[key][steps], table[key][rows])
+                   for key in EQUIPMENT_FIELDS]
+        params = np.vstack([
+            np.hstack([table["foh"][rows]] + process),
+            np.hstack([table["cash_foh"][rows]] + process),
+        ])
+        res = compute_cogs_batch(packed, params, volume, columns)["cogs_per_unit"]
+        cogs[start:start + len(rows)] = res[:len(rows)]
+        cash[start:start + len(rows)] = res[len(rows):]
+
+    changed = choice != choice[0]
+    investment = (table["capex"][choice] * changed).sum(axis=1)
+    saving = (cash[0] - cash) * volume
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(saving > 0, investment / np.where(saving > 0, saving, 1.0), np.inf)
+    discount = (1 + rate) ** -horizon
+    annuity = (1 - discount) / rate if rate > 0 else float(horizon)
+    residual = (table["residual"][choice] * changed).sum(axis=1)
+    npv = -investment + saving * annuity + residual * discount
+    return {
+        "cogs_per_unit": cogs,
+        "cash_cogs_per_unit": cash,
+        "investment": investment,
+        "annual_saving": saving,
+        "payback": payback,
+        "npv": npv,
+        "best": int(np.argmax(npv)) if n_rows else -1,
+    }
@@ -0,0 +1,194 @@
+"""Goal seek: parameter values that bring COGS/unit to a target.
+
+For a single parameter the cascade gives closed forms. Downstream of step k
+COGS/unit is affine in the cost added c_k (slope w_k, see cogs_adjoint), and
+each parameter enters c_k or the yield in one of three ways:
+
+- linear in c_k (nb_operators, dl_rate, voh_rate, foh_total, prices):
+  x = x0 + dCOGS / grad
+- through 1 / effective UPH (uph, availability, performance):
+  x = x0 / (1 + dCOGS / (w_k (DL_k + VOH_k)))
+- yield: COGS = D_k + T_k / y_k with T_k = lambda_k (Y_{k-1} + c_k):
+  y = T_k / (target - D_k)
+
+so the required value of every parameter comes out of one adjoint pass.
+Proportional changes across a group of parameters have no closed form; they
+are solved by a bisection vectorized over all groups, one compute_cogs_batch()
+call per iteration.
+
+The closed forms hold component prices fixed. With quantity-break prices a
+step parameter can move the annual quantity bought (a yield changes the units
+entering the steps upstream) across a break, so on a tiered routing every
+closed-form answer is re-costed in batch and the ones that miss the target go
+through the bisection.
+"""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index, param_vector
+from .model import RATIO_PARAMS, STEP_PARAMS
+from .sensitivity import cogs_adjoint
+from .volume import breakeven_volume, volume_cost_terms
+
+INVERSE_PARAMS = ("uph", "availability", "performance")
+
+
+def target_from_margin(price: float, margin: float) -> float:
+    """Target COGS/unit for a selling price and a margin (fraction of price)."""
+    return price * (1 - margin)
+
+
+def _check(required: np.ndarray, key: str) -> np.ndarray:
+    """NaN out required values outside the parameter's valid range."""
+    required = np.asarray(required, dtype=float)
+    if key in RATIO_PARAMS:
+        valid = (required > 0) & (required <= 1)
+    elif key == "uph":
+        valid = required > 0
+    else:
+        valid = required >= 0
+    return np.where(valid & np.isfinite(required), required, np.nan)
+
+
+def required_values(packed: dict, volume: float, target: float) -> dict:
+    """Value each single parameter must take for COGS/unit to equal target.
+
+    All other parameters keep their base value. Returns dict with
+    cogs_per_unit (base), one (N,) array per STEP_PARAMS key, price (M,) and
+    volume (scalar). Entries are NaN where the target is out of reach
+    (no influence, or a value outside its valid range).
+    """
+    adj = cogs_adjoint(packed, volume)
+    ev = adj["evaluation"]
+    cogs = ev["cogs_per_unit"]
+    delta = target - cogs
+    n_steps = len(packed["uph"])
+    grad = adj["grad"]
+    weight = adj["weight"]
+
+    out = {"cogs_per_unit": cogs}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for key in STEP_PARAMS:
+            x0 = packed[key]
+            if key == "yield":
+                gain = 1.0 / np.where(x0 > 0, x0, 1.0)
+                through = adj["adjoint"] * ev["yielded_cost"] / gain  # T_k
+                required = through / (delta + through * gain)
+            elif key in INVERSE_PARAMS:
+                labor = weight * (ev["dl"] + ev["voh"])
+                required = x0 / (1.0 + delta / labor)
+                required = np.where(labor > 0, required, np.nan)
+            else:
+                g = grad[param_index(packed, key, 0):param_index(packed, key, 0) + n_steps]
+                required = np.where(g != 0, x0 + delta / g, np.nan)
+            out[key] = _check(required, key)
+        g = grad[len(STEP_PARAMS) * n_steps:]
+        out["price"] = _check(np.where(g != 0, packed["comp_price"] + delta / g, np.nan), "price")
+
+    if "comp_tiers" in packed:
+        _resolve_tiered(packed, volume, target, out)
+
+    terms = volume_cost_terms(packed)
+    required = breakeven_volume(terms, target) if terms["fixed"] > 0 else None
+    out["volume"] = required if required is not None else np.nan
+    return out
+
+
+def _step_costs(packed: dict, volume: float, values: np.ndarray, chunk_size: int = 2048) -> np.ndarray:
+    """COGS/unit with each step-parameter column alone set to its entry of values.
+
+    values is (8·N,) in param_columns order; NaN entries give NaN.
+    """
+    n_cols = len(values)
+    columns = np.arange(n_cols)
+    base = param_vector(packed)[:n_cols]
+    rows = np.flatnonzero(np.isfinite(values))
+    out = np.full(n_cols, np.nan)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = np.repeat(base[None, :], len(chunk), axis=0)
+        params[np.arange(len(chunk)), chunk] = values[chunk]
+        out[chunk] = compute_cogs_batch(packed, params, volume, columns)["cogs_per_unit"]
+    return out
+
+
+def _resolve_tiered(packed: dict, volume: float, target: float, out: dict,
+                    rtol: float = 1e-6) -> None:
+    """Check the step-parameter closed forms of a tiered routing, re-solve the misses.
+
+    Updates out in place. A yield left NaN by its closed form is retried too,
+    since a quantity break can bring the target within reach; an answer that
+    still misses (the target falls in a price jump) becomes NaN.
+    """
+    n_steps = len(packed["uph"])
+    values = np.concatenate([out[key] for key in STEP_PARAMS])
+    tol = rtol * max(abs(target), 1.0)
+    miss = np.abs(_step_costs(packed, volume, values) - target) > tol
+    yields = slice(param_index(packed, "yield", 0), param_index(packed, "yield", 0) + n_steps)
+    retry = np.zeros(len(values), dtype=bool)
+    retry[yields] = np.isnan(values[yields])
+    miss = np.flatnonzero((np.isfinite(values) & miss) | retry)
+    if len(miss):
+        base = param_vector(packed)[miss]
+        factors = solve_groups(packed, volume, target, [[col] for col in miss.tolist()])
+        values[miss] = base * factors
+        check = np.full(len(values), np.nan)
+        check[miss] = values[miss]
+        cogs = _step_costs(packed, volume, check)
+        values[miss] = np.where(np.abs(cogs[miss] - target) <= tol, values[miss], np.nan)
+    for f, key in enumerate(STEP_PARAMS):
+        out[key] = _check(values[f * n_steps:(f + 1) * n_steps], key)
+
+
+def solve_groups(packed: dict, volume: float, target: float, groups: list,
+                 tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """Scale factor s per group such that multiplying its columns by s hits target.
+
+    groups is a list of column lists (see param_columns). All groups are
+    solved together by bisection on log(s), each iteration evaluating every
+    group in one compute_cogs_batch() call. Ratio parameters cap s at
+    1 / max(base value). Returns (G,) scale factors, NaN when the target is
+    not reachable within [1e-3, 1e3].
+    """
+    base = param_vector(packed)
+    n_groups = len(groups)
+    n_steps = len(packed["uph"])
+    mask = np.zeros((n_groups, len(base)), dtype=bool)
+    hi = np.full(n_groups, 1e3)
+    for g, cols in enumerate(groups):
+        cols = np.asarray(cols, dtype=int)
+        mask[g, cols] = True
+        ratio = [c for c in cols if c < len(STEP_PARAMS) * n_steps
+                 and STEP_PARAMS[c // n_steps] in RATIO_PARAMS]
+        if ratio and base[ratio].max() > 0:
+            hi[g] = min(hi[g], 1.0 / base[ratio].max())
+
+    def excess(scale):
+        params = np.where(mask, base[None, :] * scale[:, None], base[None, :])
+        return compute_cogs_batch(packed, params, volume)["cogs_per_unit"] - target
+
+    lo = np.full(n_groups, 1e-3)
+    f_lo, f_hi = excess(lo), excess(hi)
+    bracketed = np.sign(f_lo) * np.sign(f_hi) <= 0
+    log_lo, log_hi = np.log(lo), np.log(hi)
+    for _ in range(max_iter):
+        mid = 0.5 * (log_lo + log_hi)
+        f_mid = excess(np.exp(mid))
+        same = np.sign(f_mid) == np.sign(f_lo)
+        log_lo = np.where(same, mid, log_lo)
+        f_lo = np.where(same, f_mid, f_lo)
+        log_hi = np.where(same, log_hi, mid)
+        if np.all(log_hi - log_lo < tol):
+            break
+    return np.where(bracketed, np.exp(0.5 * (log_lo + log_hi)), np.nan)
+
+
+def parameter_groups(packed: dict) -> dict:
+    """Default proportional groups: each step parameter across all steps, all prices."""
+    n_steps = len(packed["uph"])
+    groups = {
+        key: [param_index(packed, key, i) for i in range(n_steps)]
+        for key in STEP_PARAMS
+    }
+    groups["price"] = [param_index(packed, "price", j) for j in range(len(packed["comp_price"]))]
+    return {key: cols for key, cols in groups.items() if cols}
@@ -0,0 +1,258 @@
+"""Incremental cascade: recompute only what a change touches.
+
+The cascade is prefix-dependent: the yielded cost after step i only depends on
+steps 0..i. IncrementalCascade keeps the per-step cost arrays and the prefix
+yielded-cost / RTY arrays. A change to step k recomputes step k's cost added
+and re-runs the cascade suffix from k. A BOM change updates one step's
+material sum. Only a volume change (FOH of every step) touches every step.
+Quantity-break prices are re-resolved after volume and yield changes, and
+only the steps whose lines changed tier get their material re-summed.
+
+sync() diffs a routing edited in place (the app's session state) step by
+step: the step parameters, then each step's BOM against a snapshot of what
+the engine reads of it (qty, price, scrap, tiers), and only a step whose
+BOM differs is repacked into its segment. The diff itself still reads every
+line, O(total BOM) in plain tuple comparisons (about 5 ms per 10,000
+lines, against 11 ms to repack them); callers that know which steps were
+edited pass them and skip it.
+"""
+
+import numpy as np
+
+from .bom import BOM_DEFAULTS, BOM_FIELDS, bom_columns
+from .engine import (
+    component_prices,
+    evaluate_routing,
+    format_payload,
+    label_result,
+    material_factors,
+    pack_routing,
+    process_costs,
+)
+from .model import STEP_DEFAULTS, STEP_PARAMS
+
+COMP_ARRAYS = ("comp_qty", "comp_price", "comp_scrap")
+
+
+def _bom_key(bom: list) -> list:
+    """What the engine reads of one step's BOM: (qty, price, scrap, tiers) per line.
+
+    Tiers are copied, as the app edits the step dicts in place.
+    """
+    qty, price, scrap = (BOM_DEFAULTS[key] for key in BOM_FIELDS)
+    return [
+        (comp.get("qty", qty), comp.get("price", price), comp.get("scrap", scrap),
+         tuple(map(tuple, comp["tiers"])) if comp.get("tiers") else ())
+        for comp in bom
+    ]
+
+
+class IncrementalCascade:
+    """Live cascade state of one routing, updated in O(changed)."""
+
+    def __init__(self, steps_data: list, volume: float):
+        self.rebuild(steps_data, volume)
+
+    def rebuild(self, steps_data: list, volume: float) -> None:
+        """Full evaluation (new routing structure)."""
+        self.packed = pack_routing(steps_data)
+        self.volume = volume
+        self.factors = material_factors(self.packed)
+        self.prices = component_prices(self.packed, volume)
+        ev = evaluate_routing(self.packed, volume)
+        self.state = {key: np.array(ev[key], dtype=float) for key in (
+            "effective_uph", "oee", "material", "dl", "voh", "foh",
+            "cost_added", "yielded_cost", "scrap_cost",
+        )}
+        self.rty_prefix = np.cumprod(self.packed["yield"])
+        # Start of the comp_step segment of every step (comp_step is sorted)
+        n_steps = len(self.packed["uph"])
+        self.bom_start = np.searchsorted(self.packed["comp_step"], np.arange(n_steps + 1))
+        self.bom_keys = [_bom_key(step.get("bom", [])) for step in steps_data]
+        self.last_start = 0
+
+    # ── Primitive updates ──
+    def _update_steps(self, idx: np.ndarray) -> None:
+        """Recompute the cost added of the given steps."""
+        fields = {key: self.packed[key][idx] for key in STEP_PARAMS}
+        costs = process_costs(fields, self.volume)
+        for key in ("effective_uph", "dl", "voh", "foh"):
+            self.state[key][idx] = costs[key]
+        self.state["oee"][idx] = fields["availability"] * fields["performance"] * fields["yield"]
+        self.state["cost_added"][idx] = (
+            self.state["material"][idx] + costs["dl"] + costs["voh"] + costs["foh"]
+        )
+
+    def _update_material(self, step_idx: int) -> None:
+        """Re-sum the BOM of one step."""
+        lo, hi = self.bom_start[step_idx], self.bom_start[step_idx + 1]
+        self.state["material"][step_idx] = float(
+            self.factors[lo:hi] @ self.prices[lo:hi]
+        )
+
+    def _reprice(self) -> np.ndarray:
+        """Re-resolve tiered prices; re-sum the steps whose prices moved (returned)."""
+        if "comp_tiers" not in self.packed:
+            self.prices = self.packed["comp_price"]
+            return np.array([], dtype=int)
+        prices = component_prices(self.packed, self.volume)
+        moved = np.flatnonzero(prices != self.prices)
+        self.prices = prices
+        steps = np.unique(self.packed["comp_step"][moved])
+        for step_idx in steps.tolist():
+            self._update_material(step_idx)
+        return steps
+
+    def _resume(self, start: int) -> None:
+        """Re-run the cascade from step `start`, keeping the prefix before it."""
+        n_steps = len(self.packed["uph"])
+        self.last_start = start
+        if start >= n_steps:
+            return
+        prev = self.state["yielded_cost"][start - 1] if start > 0 else 0.0
+        prev_rty = self.rty_prefix[start - 1] if start > 0 else 1.0
+        cost_added = self.state["cost_added"][start:]
+        yld = self.packed["yield"][start:]
+
+        gain = 1.0 / np.where(yld > 0, yld, 1.0)
+        growth = np.cumprod(gain)
+        yielded = growth * (prev + np.cumsum(cost_added * gain / growth))
+        self.state["yielded_cost"][start:] = yielded
+        self.state["scrap_cost"][start:] = np.where(
+            (yld > 0) & (yld < 1), yielded * (1 - yld), 0.0,
+        )
+        self.rty_prefix[start:] = prev_rty * np.cumprod(yld)
+
+    # ── Public updates ──
+    def set_step(self, step_idx: int, **values) -> None:
+        """Change parameters of one step, e.g. set_step(3, uph=80, yield_=0.97).
+
+        Use the `yield_` keyword for the (reserved) yield parameter.
+        """
+        for key, value in values.items():
+            self.packed[key.rstrip("_")][step_idx] = value
+        idx = np.union1d([step_idx], self._reprice()) if {"yield", "yield_"} & values.keys() else np.array([step_idx])
+        self._update_steps(idx)
+        self._resume(int(idx[0]))
+
+    def set_component(self, comp_idx: int, **values) -> None:
+        """Change qty / price / scrap of one BOM line (flat component index)."""
+        for key, value in values.items():
+            self.packed[f"comp_{key}"][comp_idx] = value
+        step_idx = int(self.packed["comp_step"][comp_idx])
+        if "qty" in values or "scrap" in values:
+            self.factors[comp_idx] = material_factors({
+                key: self.packed[key][comp_idx:comp_idx + 1] for key in COMP_ARRAYS
+            })[0]
+        if "comp_tiers" in self.packed:
+            self.prices = component_prices(self.packed, self.volume)
+        self._update_material(step_idx)
+        self._update_steps(np.array([step_idx]))
+        self._resume(step_idx)
+
+    def set_volume(self, volume: float) -> None:
+        """Change the annual volume (FOH of every step)."""
+        self.volume = volume
+        self._reprice()
+        self._update_steps(np.arange(len(self.packed["uph"])))
+        self._resume(0)
+
+    def _sync_bom(self, step_idx: int, step: dict) -> np.ndarray:
+        """Repack one step's BOM if it changed; flat indexes of the changed lines.
+
+        Returns None when the step's lines or price tiers changed (rebuild).
+        """
+        key = _bom_key(step.get("bom", []))
+        old = self.bom_keys[step_idx]
+        if key == old:
+            return np.array([], dtype=int)
+        if len(key) != len(old) or any(a[-1] != b[-1] for a, b in zip(key, old)):
+            return None
+        lo, hi = self.bom_start[step_idx], self.bom_start[step_idx + 1]
+        columns = bom_columns([step])
+        changed = np.zeros(hi - lo, dtype=bool)
+        for field in BOM_FIELDS:
+            segment = self.packed[f"comp_{field}"][lo:hi]
+            changed |= columns[field] != segment
+            segment[:] = columns[field]
+        self.bom_keys[step_idx] = key
+        changed = lo + np.flatnonzero(changed)
+        tiers = self.packed.get("comp_tiers")
+        if tiers is not None:
+            # Column 0 of a tiered line is its base price
+            rows = np.searchsorted(tiers["line"], changed)
+            hit = rows < len(tiers["line"])
+            hit[hit] = tiers["line"][rows[hit]] == changed[hit]
+            tiers["prices"][rows[hit], 0] = self.packed["comp_price"][changed[hit]]
+        return changed
+
+    def sync(self, steps_data: list, volume: float, steps=None) -> int:
+        """Bring the state in line with steps_data / volume.
+
+        Diffs steps_data against the current state step by step (see module
+        docstring) and applies only the changed steps and BOM lines; a
+        structural change (steps or BOM lines added/removed, price tiers
+        edited) triggers a rebuild. steps, when given, lists the only step
+        indexes that may have changed since the last sync. Returns the first
+        step whose cascade was recomputed (N when nothing changed).
+        """
+        n_steps = len(steps_data)
+        if n_steps != len(self.packed["uph"]):
+            self.rebuild(steps_data, volume)
+            return 0
+        idx = np.arange(n_steps) if steps is None else np.unique(np.asarray(steps, dtype=int))
+
+        changed_steps = np.zeros(n_steps, dtype=bool)
+        changed_comps = []
+        for step_idx in idx.tolist():
+            step = steps_data[step_idx]
+            for key in STEP_PARAMS:
+                value = float(step.get(key, STEP_DEFAULTS[key]))
+                if value != self.packed[key][step_idx]:
+                    self.packed[key][step_idx] = value
+                    changed_steps[step_idx] = True
+            comps = self._sync_bom(step_idx, step)
+            if comps is None:
+                self.rebuild(steps_data, volume)
+                return 0
+            changed_comps.append(comps)
+        changed_comps = np.concatenate(changed_comps) if changed_comps else np.array([], dtype=int)
+
+        if volume != self.volume:
+            self.volume = volume
+            changed_steps[:] = True
+        changed_steps[self._reprice()] = True
+
+        if len(changed_comps):
+            self.factors[changed_comps] = material_factors({
+                key: self.packed[key][changed_comps] for key in COMP_ARRAYS
+            })
+            for step_idx in np.unique(self.packed["comp_step"][changed_comps]):
+                self._update_material(int(step_idx))
+            changed_steps[self.packed["comp_step"][changed_comps]] = True
+
+        idx = np.flatnonzero(changed_steps)
+        if not len(idx):
+            self.last_start = n_steps
+            return n_steps
+        self._update_steps(idx)
+        self._resume(int(idx[0]))
+        return int(idx[0])
+
+    # ── Results ──
+    def evaluation(self) -> dict:
+        """Same shape as evaluate_routing()."""
+        n_steps = len(self.packed["uph"])
+        rty = float(self.rty_prefix[-1]) if n_steps else 1.0
+        return {
+            **self.state,
+            "cogs_per_unit": float(self.state["yielded_cost"][-1]) if n_steps else 0.0,
+            "rty": rty,
+            "units_to_start": self.volume / rty if rty > 0 else self.volume,
+        }
+
+    def result(self, steps_data: list, lang: str = "fr") -> dict:
+        """Same dict as compute_cogs(steps_data, volume, lang)."""
+        return label_result(
+            format_payload(self.evaluation(), steps_data, self.volume), steps_data, lang,
+        )
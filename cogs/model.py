@@ -0,0 +1,168 @@
+"""Product model: parameter names, defaults, names and JSON loading.
+
+Pure Python (no NumPy) so it can be imported cheaply from the UI, the CLI and
+batch jobs alike.
+"""
+
+import json
+
+STEP_PARAMS = (
+    "uph", "availability", "performance", "yield",
+    "nb_operators", "dl_rate", "voh_rate", "foh_total",
+)
+STEP_DEFAULTS = {
+    "uph": 60, "availability": 0.90, "performance": 0.85, "yield": 0.95,
+    "nb_operators": 1, "dl_rate": 25.0, "voh_rate": 30.0, "foh_total": 50000,
+}
+RATIO_PARAMS = ("availability", "performance", "yield")
+SCENARIO_PARAMS = ("volume",) + STEP_PARAMS
+# Optional per-step data kept as-is: parameter distributions (Monte Carlo),
+# staffing curves ([[nb_operators, uph], ...], operator allocation), the
+# routing graph (id, next, rework, rework_to; see cogs.network), learning
+# curves / FOH schedules (see cogs.timephased), the shared resource the step
+# runs on with its installed stations (see cogs.capacity) and its candidate
+# equipment (see cogs.equipment)
+OPTIONAL_STEP_KEYS = (
+    "distributions", "staffing", "id", "next", "rework", "rework_to", "learning", "foh_schedule",
+    "resource", "stations", "equipment",
+)
+
+
+def step_name(step_data: dict, lang: str = "fr") -> str:
+    """Get step name in the given language."""
+    name = step_data.get("name", {})
+    if isinstance(name, dict):
+        return name.get(lang, name.get("fr", "Step"))
+    return str(name)
+
+
+def component_name(comp: dict, lang: str = "fr") -> str:
+    """Get component name in the given language."""
+    name = comp.get("name", {})
+    if isinstance(name, dict):
+        return name.get(lang, name.get("fr", "Component"))
+    return str(name)
+
+
+def new_step(number: int) -> dict:
+    """Default step appended when the routing grows."""
+    return {
+        "name": {"fr": f"Étape {number}", "en": f"Step {number}"},
+        **STEP_DEFAULTS,
+        "bom": [],
+    }
+
+
+def normalize_steps(steps: list) -> list:
+    """Fill step defaults and keep only the step keys the engine understands."""
+    out = []
+    for step in steps:
+        step_entry = {"name": step.get("name", {"fr": "Étape", "en": "Step"})}
+        step_entry.update({key: step.get(key, STEP_DEFAULTS[key]) for key in STEP_PARAMS})
+        step_entry["bom"] = step.get("bom", [])
+        for key in OPTIONAL_STEP_KEYS:
+            if key in step:
+                step_entry[key] = step[key]
+        out.append(step_entry)
+    return out
+
+
+def normalize_product(product: dict) -> dict:
+    """Fill step defaults and keep only the keys the engine understands.
+
+    Returns dict with name, volume, currency, steps, distributions,
+    subassemblies (id -> {name, steps}, see cogs.assemblies) and suppliers
+    (id -> {name, fixed}, see cogs.sourcing).
+    """
+    return {
+        "name": product.get("name", {"fr": "Produit", "en": "Product"}),
+        "volume": product.get("volume", 100000),
+        "currency": product.get("currency", "EUR"),
+        "steps": normalize_steps(product.get("steps", [])),
+        "distributions": product.get("distributions", {}),
+        "subassemblies": {
+            sub_id: {"name": sub.get("name", {"fr": sub_id, "en": sub_id}),
+                     "steps": normalize_steps(sub.get("steps", []))}
+            for sub_id, sub in product.get("subassemblies", {}).items()
+        },
+        "suppliers": product.get("suppliers", {}),
+    }
+
+
+def load_product(path: str) -> dict:
+    """Load and normalize a product JSON file."""
+    with open(path, encoding="utf-8") as f:
+        return normalize_product(json.load(f))
+
+
+def product_to_json(product: dict) -> str:
+    """Serialize a product (as returned by normalize_product) to JSON."""
+    data = {
+        "name": product.get("name", {"fr": "Export", "en": "Export"}),
+        "volume": product.get("volume", 100000),
+        "currency": product.get("currency", "EUR"),
+        "steps": product.get("steps", []),
+    }
+    if product.get("distributions"):
+        data["distributions"] = product["distributions"]
+    if product.get("subassemblies"):
+        data["subassemblies"] = product["subassemblies"]
+    if product.get("suppliers"):
+        data["suppliers"] = product["suppliers"]
+
+    # BOM lines are written from the columnar table (one compact line per
+    # component, each distinct name encoded once); NumPy is only loaded here
+    from .bom import bom_json, pack_bom
+
+    def routing(steps, indent):
+        """Steps array nested at indent, BOMs written by bom_json()."""
+        step_indent = indent + "  "
+        boms = bom_json(pack_bom(steps), len(steps), step_indent + "    ")
+        return _json_array([
+            _json_object([
+                (key, bom if key == "bom" else _json_text(value, step_indent + "  "))
+                for key, value in {**step, "bom": None}.items()
+            ], step_indent)
+            for step, bom in zip(steps, boms)
+        ], indent)
+
+    members = []
+    for key, value in data.items():
+        if key == "steps":
+            text = routing(value, "  ")
+        elif key == "subassemblies":
+            text = _json_object([
+                (sub_id, _json_object([
+                    (k, routing(v, "      ") if k == "steps" else _json_text(v, "      "))
+                    for k, v in {**sub, "steps": sub.get("steps", [])}.items()
+                ], "    "))
+                for sub_id, sub in value.items()
+            ], "  ")
+        else:
+            text = _json_text(value, "  ")
+        members.append((key, text))
+    return _json_object(members, "")
+
+
+def _json_text(value, indent: str) -> str:
+    """json.dumps(value, indent=2) of a value whose first line is at `indent`."""
+    # Newlines within strings are escaped, so every newline is layout
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + indent)
+
+
+def _json_object(members: list, indent: str) -> str:
+    """JSON object of (key, value text) members, as laid out by json.dumps(indent=2)."""
+    if not members:
+        return "{}"
+    inner = indent + "  "
+    return "{\n" + ",\n".join(
+        f"{inner}{json.dumps(key, ensure_ascii=False)}: {text}" for key, text in members
+    ) + "\n" + indent + "}"
+
+
+def _json_array(items: list, indent: str) -> str:
+    """JSON array of value texts, as laid out by json.dumps(indent=2)."""
+    if not items:
+        return "[]"
+    inner = indent + "  "
+    return "[\n" + ",\n".join(inner + text for text in items) + "\n" + indent + "]"
@@ -0,0 +1,111 @@
+"""Monte Carlo propagation of parameter distributions to COGS/unit and RTY."""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index, param_vector
+from .model import RATIO_PARAMS, STEP_PARAMS
+
+
+def _sample_pert(spec: dict, base: float, n: int, rng) -> np.ndarray:
+    low, high = spec["min"], spec["max"]
+    mode = spec.get("mode", base)
+    lam = spec.get("lambda", 4.0)
+    span = high - low
+    if span <= 0:
+        return np.full(n, float(mode))
+    alpha = 1 + lam * (mode - low) / span
+    beta = 1 + lam * (high - mode) / span
+    return low + rng.beta(alpha, beta, n) * span
+
+
+DISTRIBUTIONS = {
+    "triangular": lambda spec, base, n, rng: rng.triangular(
+        spec["min"], spec.get("mode", base), spec["max"], n),
+    "pert": _sample_pert,
+    "beta": lambda spec, base, n, rng: spec.get("min", 0.0) + rng.beta(
+        spec["alpha"], spec["beta"], n) * (spec.get("max", 1.0) - spec.get("min", 0.0)),
+    "lognormal": lambda spec, base, n, rng: rng.lognormal(
+        np.log(spec.get("median", base)), spec["sigma"], n),
+    "uniform": lambda spec, base, n, rng: rng.uniform(spec["min"], spec["max"], n),
+}
+
+
+def collect_distributions(steps_data: list, packed: dict, volume_dist: dict = None) -> list:
+    """Gather the `distributions` attached to steps, components and volume.
+
+    Returns a list of (column, key, step_idx, spec) where column indexes the
+    flat parameter vector (see param_columns) and is -1 for the volume.
+    """
+    specs = []
+    if volume_dist:
+        specs.append((-1, "volume", -1, volume_dist))
+    comp_idx = 0
+    for step_idx, step in enumerate(steps_data):
+        for key, spec in step.get("distributions", {}).items():
+            if key in STEP_PARAMS:
+                specs.append((param_index(packed, key, step_idx), key, step_idx, spec))
+        for comp in step.get("bom", []):
+            spec = comp.get("distributions", {}).get("price")
+            if spec:
+                specs.append((param_index(packed, "price", comp_idx), "price", step_idx, spec))
+            comp_idx += 1
+    return specs
+
+
+def draw_samples(spec: dict, key: str, base: float, n: int, rng) -> np.ndarray:
+    """Draw n values of one parameter, clipped to its admissible range."""
+    kind = spec.get("type", "")
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution type: {kind!r}")
+    values = DISTRIBUTIONS[kind](spec, base, n, rng)
+    if key in RATIO_PARAMS:
+        return np.clip(values, 0.0, 1.0)
+    return np.maximum(values, 0.0)
+
+
+def run_monte_carlo(packed: dict, volume: float, specs: list, n_samples: int,
+                    seed: int = None, chunk_size: int = 50000) -> dict:
+    """Propagate parameter distributions to COGS/unit and RTY.
+
+    Draws are generated and evaluated chunk by chunk through
+    compute_cogs_batch(), so working memory is bounded by chunk_size rows of
+    the uncertain columns only. Same seed and chunk_size give the same draws.
+    Returns dict with (n_samples,) arrays: cogs_per_unit, rty.
+    """
+    rng = np.random.default_rng(seed)
+    base = param_vector(packed)
+    columns = [col for col, _, _, _ in specs if col >= 0]
+    cogs = np.empty(n_samples)
+    rty = np.empty(n_samples)
+
+    for start in range(0, n_samples, chunk_size):
+        size = min(chunk_size, n_samples - start)
+        volumes = np.full(size, float(volume))
+        draws = np.empty((size, len(columns)))
+        pos = 0
+        for col, key, _, spec in specs:
+            if col < 0:
+                volumes = np.maximum(draw_samples(spec, key, volume, size, rng), 1.0)
+            else:
+                draws[:, pos] = draw_samples(spec, key, base[col], size, rng)
+                pos += 1
+        res = compute_cogs_batch(packed, draws, volumes, columns)
+        cogs[start:start + size] = res["cogs_per_unit"]
+        rty[start:start + size] = res["rty"]
+
+    return {"cogs_per_unit": cogs, "rty": rty}
+
+
+def summarize_samples(values: np.ndarray, target: float = None) -> dict:
+    """Mean, standard deviation, P5/P50/P95 and P(value > target)."""
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    summary = {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+    }
+    if target is not None:
+        summary["prob_exceed"] = float((values > target).mean())
+    return summary
@@ -0,0 +1,252 @@
+"""Non-linear routings: feeder branches, merges and rework loops.
+
+Each step may name its successor (`next`: a step id or 1-based number, null
+for the exit; default: the following step, the last step being the exit) and
+send a fraction `rework` of its failures to step `rework_to` (default: itself),
+the other failures being scrapped. A step with several predecessors is a
+merge: each unit it starts consumes one good unit of every feeder branch.
+
+A unit moving through the routing is an absorbing Markov chain (absorbed as
+a good unit or as scrap). Rather than simulate it, the expected number of
+visits a_i of each step per good unit leaving the exit solves one sparse
+linear system, with m_i the new units (kits) started at step i:
+
+    a_i = m_i + sum_{k: rework_to_k = i} r_k (1 - y_k) a_k
+    y_j a_j = m_{next_j}        (every j but the exit)
+    y_e a_e = 1                 (exit)
+
+Each visit costs the step's cost added c_i, so COGS/unit = sum_i a_i c_i.
+For a plain chain a_i = Π_{j>=i} 1 / y_j, the cascade weights, and the result
+equals the cascade.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import spsolve
+
+from .engine import (
+    component_prices, material_factors, pack_routing, process_costs, step_material,
+)
+from .model import RATIO_PARAMS, STEP_PARAMS, component_name, step_name
+
+
+def _resolve(steps_data: list, ids: dict, ref, owner: int, key: str) -> int:
+    """Index of the step a reference points to: its id, else its 1-based number."""
+    if ref in ids:
+        return ids[ref]
+    if isinstance(ref, int) and 1 <= ref <= len(steps_data):
+        return ref - 1
+    raise ValueError(
+        f"Step '{step_name(steps_data[owner], 'en')}': unknown {key} step {ref!r}"
+    )
+
+
+def routing_graph(steps_data: list) -> dict:
+    """Successor and rework arrays of a routing.
+
+    Returns dict with next ((N,) int, -1 for the exit), rework ((N,) fraction
+    of failures reworked) and rework_to ((N,) int). Raises ValueError on an
+    unknown reference, a rework fraction outside [0, 1], a routing without
+    exactly one exit or a loop of `next` links.
+    """
+    n_steps = len(steps_data)
+    nxt = np.empty(n_steps, dtype=int)
+    rework = np.zeros(n_steps)
+    rework_to = np.arange(n_steps)
+    ids = {step["id"]: i for i, step in enumerate(steps_data) if step.get("id") is not None}
+    for i, step in enumerate(steps_data):
+        if "next" in step:
+            nxt[i] = -1 if step["next"] is None else _resolve(steps_data, ids, step["next"], i, "next")
+        else:
+            nxt[i] = i + 1 if i + 1 < n_steps else -1
+        rework[i] = float(step.get("rework", 0) or 0)
+        if not 0 <= rework[i] <= 1:
+            raise ValueError(f"Step '{step_name(step, 'en')}': rework must be within [0, 1]")
+        if step.get("rework_to") is not None:
+            rework_to[i] = _resolve(steps_data, ids, step["rework_to"], i, "rework_to")
+
+    exits = np.flatnonzero(nxt < 0)
+    if n_steps and len(exits) != 1:
+        raise ValueError(f"The routing must have exactly one exit step, found {len(exits)}")
+    # Every step must reach the exit through `next` links (pointer doubling)
+    target = np.where(nxt < 0, np.arange(n_steps), nxt)
+    for _ in range(int(np.ceil(np.log2(max(n_steps, 2)))) + 1):
+        target = target[target]
+    reach = nxt[target] < 0
+    if not reach.all():
+        loop = [step_name(steps_data[i], "en") for i in np.flatnonzero(~reach)]
+        raise ValueError("Routing loop through 'next' (use rework for loops): " + ", ".join(loop))
+    return {"next": nxt, "rework": rework, "rework_to": rework_to}
+
+
+def is_linear(graph: dict) -> bool:
+    """True for a plain chain without rework (the cascade model)."""
+    n_steps = len(graph["next"])
+    chain = np.append(np.arange(1, n_steps), -1) if n_steps else graph["next"]
+    return bool(np.array_equal(graph["next"], chain) and not graph["rework"].any())
+
+
+def expected_visits(graph: dict, yld: np.ndarray) -> tuple:
+    """Visits a and new starts m of each step per good unit leaving the exit.
+
+    Steps with yield <= 0 do not lose units (as in the cascade). Raises
+    ValueError when no good unit can ever come out.
+    """
+    n_steps = len(yld)
+    nxt, rework, rework_to = graph["next"], graph["rework"], graph["rework_to"]
+    y = np.where(yld > 0, yld, 1.0)
+    idx = np.arange(n_steps)
+    back = np.flatnonzero(rework > 0)
+    inner = nxt >= 0
+
+    # Unknowns [a, m]; rows 0..N-1 balance visits, rows N..2N-1 link passes to starts
+    rows = np.concatenate([idx, idx, rework_to[back], n_steps + idx, n_steps + idx[inner]])
+    cols = np.concatenate([idx, n_steps + idx, back, idx, n_steps + nxt[inner]])
+    vals = np.concatenate([
+        np.ones(n_steps), -np.ones(n_steps), -rework[back] * (1 - y[back]),
+        y, -np.ones(inner.sum()),
+    ])
+    system = coo_matrix((vals, (rows, cols)), shape=(2 * n_steps, 2 * n_steps)).tocsc()
+    rhs = np.zeros(2 * n_steps)
+    rhs[n_steps + np.flatnonzero(~inner)] = 1.0
+    with np.errstate(all="ignore"):
+        solution = np.atleast_1d(spsolve(system, rhs))
+    if not np.isfinite(solution).all() or (solution[:n_steps] < -1e-9).any():
+        raise ValueError("The routing never completes a good unit (rework loop without exit)")
+    return solution[:n_steps], solution[n_steps:]
+
+
+def evaluate_network(packed: dict, graph: dict, volume: float) -> dict:
+    """Expected cost and throughput of a routing graph.
+
+    Returns dict with per-step arrays (visits per good unit, starts, cost_added
+    per visit, contribution = visits * cost_added, hours = visits / effective
+    UPH, 0 for steps that do not run) and scalars cogs_per_unit, rty (product of first-pass yields),
+    scrap_cost_per_unit, units_to_start, total_cogs, throughput (good units
+    per hour of the bottleneck) and bottleneck (step index).
+    """
+    costs = process_costs(packed, volume)
+    visits, starts = expected_visits(graph, packed["yield"])
+    material = step_material(packed, component_prices(packed, volume, visits))
+    cost_added = material + costs["dl"] + costs["voh"] + costs["foh"]
+    contribution = visits * cost_added
+    cogs = float(contribution.sum())
+
+    effective = costs["effective_uph"]
+    hours = np.where(effective > 0, visits / np.where(effective > 0, effective, 1.0), 0.0)
+    bottleneck = int(np.argmax(hours)) if len(hours) else -1
+    throughput = float(1.0 / hours[bottleneck]) if len(hours) and hours[bottleneck] > 0 else 0.0
+    is_start = np.ones(len(visits), dtype=bool)
+    is_start[graph["next"][graph["next"] >= 0]] = False
+    return {
+        "visits": visits,
+        "starts": np.where(is_start, starts, 0.0),
+        "cost_added": cost_added,
+        "contribution": contribution,
+        "hours": hours,
+        "cogs_per_unit": cogs,
+        "rty": float(np.prod(packed["yield"])),
+        "scrap_cost_per_unit": cogs - float(cost_added.sum()),
+        "units_to_start": float(volume * starts[is_start].sum()),
+        "total_cogs": cogs * volume,
+        "throughput": throughput,
+        "bottleneck": bottleneck,
+    }
+
+
+def network_summary(ev: dict) -> dict:
+    """Global figures of evaluate_network() rounded as in compute_cogs()."""
+    return {
+        "cogs_per_unit": round(ev["cogs_per_unit"], 4),
+        "rty": round(ev["rty"], 4),
+        "units_to_start": round(ev["units_to_start"], 0),
+        "scrap_cost_per_unit": round(ev["scrap_cost_per_unit"], 4),
+        "total_cogs": round(ev["total_cogs"], 2),
+    }
+
+
+def network_sensitivity(steps_data: list, graph: dict, volume: float, delta: float = 0.10,
+                        lang: str = "fr") -> list:
+    """±delta sensitivity of the network COGS/unit (same entries as run_sensitivity).
+
+    Only yields move the visits: each yield and the volume is a full
+    evaluate_network(). Any other parameter changes the cost per visit of
+    its own step only, COGS/unit moving by visits_i * (new - old cost added),
+    so every step is perturbed at once per field (and every BOM line at once
+    for prices). Ratios are clamped to 1; elasticities are central
+    differences over a small unclamped step.
+    """
+    packed = pack_routing(steps_data)
+    ev = evaluate_network(packed, graph, volume)
+    base_cogs = ev["cogs_per_unit"]
+    visits = ev["visits"]
+    costs = process_costs(packed, volume)
+    prices = component_prices(packed, volume, visits)
+    step_names = [step_name(step, lang) for step in steps_data]
+
+    def entry(key, step_idx, comp_idx, component, high, low, elasticity):
+        return {
+            "key": key,
+            "step_idx": step_idx,
+            "comp_idx": comp_idx,
+            "step": step_names[step_idx] if step_idx >= 0 else "-",
+            "component": component,
+            "impact_high": round(float(high - base_cogs), 4),
+            "impact_low": round(float(low - base_cogs), 4),
+            "impact": round(float(abs(high - low)), 4),
+            "elasticity": round(float(elasticity), 4),
+        }
+
+    def scaled(factor, clamp=True):
+        """COGS/unit with each parameter alone scaled: {key: (N,), "price": (M,)}."""
+        out = {}
+        for key in STEP_PARAMS:
+            value = packed[key] * factor
+            if clamp and key in RATIO_PARAMS:
+                value = np.minimum(value, 1.0)
+            if key == "yield":
+                out[key] = np.array([
+                    evaluate_network({**packed, "yield": np.where(np.arange(len(visits)) == i,
+                                                                  value, packed["yield"])},
+                                     graph, volume)["cogs_per_unit"]
+                    for i in range(len(visits))
+                ])
+                continue
+            new = process_costs({**packed, key: value}, volume)
+            change = sum(new[part] - costs[part] for part in ("dl", "voh", "foh"))
+            out[key] = base_cogs + visits * change
+        moved = component_prices({**packed, "comp_price": packed["comp_price"] * factor},
+                                 volume, visits)
+        out["price"] = base_cogs + (visits[packed["comp_step"]] * material_factors(packed)
+                                    * (moved - prices))
+        return out
+
+    eps = 1e-6
+    high, low = scaled(1 + delta), scaled(1 - delta)
+    up, down = scaled(1 + eps, clamp=False), scaled(1 - eps, clamp=False)
+    scale = 2 * eps * base_cogs if base_cogs else np.inf
+
+    def cogs_at(v):
+        return evaluate_network(packed, graph, v)["cogs_per_unit"]
+
+    impacts = [entry(
+        "volume", -1, -1, "",
+        cogs_at(max(1, int(volume * (1 + delta)))), cogs_at(max(1, int(volume * (1 - delta)))),
+        (cogs_at(volume * (1 + eps)) - cogs_at(volume * (1 - eps))) / scale,
+    )]
+    for step_idx in range(len(steps_data)):
+        for key in STEP_PARAMS:
+            if packed[key][step_idx] != 0:
+                impacts.append(entry(
+                    key, step_idx, -1, "", high[key][step_idx], low[key][step_idx],
+                    (up[key][step_idx] - down[key][step_idx]) / scale,
+                ))
+    comps = [(i, comp) for i, step in enumerate(steps_data) for comp in step.get("bom", [])]
+    for j, (step_idx, comp) in enumerate(comps):
+        if packed["comp_price"][j] != 0:
+            impacts.append(entry(
+                "price", step_idx, j, component_name(comp, lang), high["price"][j],
+                low["price"][j], (up["price"][j] - down["price"][j]) / scale,
+            ))
+    impacts.sort(key=lambda x: x["impact"], reverse=True)
+    return impacts
@@ -0,0 +1,345 @@
+"""Portfolio: several products packed as one table of routings.
+
+The steps of every product are concatenated into one packed routing (see
+engine.pack_routing), cut into segments: each product, then the
+sub-assemblies it uses (see cogs.assemblies), which run on the same lines.
+A step may name the `resource` (line, cell, machine) it runs on: steps of any
+product naming the same resource share it. Steps without one get a private
+resource.
+
+Everything per step is then a segmented array operation, with no Python loop
+over products x steps: the units entering step i of a segment are
+
+    V_s * w_i        w_i = Π_{j>=i, same segment} 1 / y_j
+
+computed as exp of a reversed cumulative sum of -log(y) minus its value at
+the segment end. V_s is the product volume times the segment's units per
+product unit (1 for products, the sub-assembly demand otherwise).
+
+A shared resource's annual FOH F_r is allocated to the steps running on it
+in proportion to a driver d_i = V_s k_i: machine hours (k_i = w_i / effective
+UPH) or volume (k_i = 1). As in the single-product engine, a step's FOH per
+unit is its allocated FOH over its segment volume:
+
+    foh_i = F_r * d_i / D_r / V_s = F_r * k_i / D_r        D_r = sum_r d_i
+
+so a private resource gives back foh_total / V. COGS/unit of every segment is
+one bincount of w_i * cost added; sub-assembly prices are then fed to the
+lines using them until the tree is settled (one pass per nesting level).
+Quantity-break prices are resolved from the quantity each line buys a year,
+V_s * w_i * qty / (1 - scrap) (see engine.component_prices).
+A product's volume change only moves D_r of the resources it uses and the
+quantities of its own lines: PortfolioCosting updates the steps on those
+resources, re-prices the product's tiered lines and re-costs their products.
+"""
+
+import numpy as np
+
+from .assemblies import evaluate_assemblies, pack_assemblies, resolve_subassemblies
+from .bom import tier_prices
+from .engine import material_factors, pack_routing, process_costs
+from .network import expected_visits, is_linear, routing_graph
+
+ALLOCATION_DRIVERS = ("hours", "volume", "standalone")
+
+
+def pack_portfolio(products: list, resources: dict = None) -> dict:
+    """Pack normalized products (see model.load_product) into one table.
+
+    resources optionally maps shared resource ids to {foh_total, stations}:
+    the resource's annual FOH (default: the largest foh_total of its steps)
+    and installed stations (default: the most of its steps).
+
+    Returns pack_routing() of all steps (comp_step indexes all steps) plus:
+    segment ((T,) segment of each step), bounds ((S+1,) first step of each
+    segment), owner ((S,) product of each segment), per_unit ((S,) units per
+    product unit), sub_id ((S,) sub-assembly id, None for products), labels
+    ((S,) names), step_names ((T,)), volume ((P,) product volumes), resource
+    ((T,) resource index), resources (one key per resource: the resource id,
+    or (segment, step) for a private one), resource_foh and
+    resource_stations ((R,)), stations ((T,) installed stations, default 1),
+    product_segment ((P,) segment of each product), comp_ref ((M,) segment of
+    the sub-assembly a BOM line uses, -1 for purchased parts) and graphs
+    ({segment: routing graph} of the non-linear segments).
+    """
+    steps, owner, per_unit, sub_id, labels, refs = [], [], [], [], [], []
+    product_segment = []
+    for p, product in enumerate(products):
+        product = resolve_subassemblies(product)
+        subassemblies = product.get("subassemblies") or {}
+        ids, demand = [], []
+        if subassemblies:
+            tree = pack_assemblies(product["steps"], subassemblies)
+            ids, demand = tree["ids"], evaluate_assemblies(tree, 1.0)["demand"].tolist()
+        position = {node: len(steps) + 1 + k for k, node in enumerate(ids)}
+        product_segment.append(len(steps))
+        steps.append(product["steps"])
+        owner.append(p)
+        per_unit.append(1.0)
+        sub_id.append(None)
+        labels.append(product["name"])
+        for node, units in zip(ids, demand):
+            steps.append(subassemblies[node]["steps"])
+            owner.append(p)
+            per_unit.append(units)
+            sub_id.append(node)
+            labels.append(subassemblies[node]["name"])
+        refs.extend(
+            position[comp["ref"]] if comp.get("ref") is not None else -1
+            for segment_steps in steps[product_segment[-1]:]
+            for step in segment_steps for comp in step.get("bom", [])
+        )
+
+    flat = [step for segment_steps in steps for step in segment_steps]
+    packed = pack_routing(flat)
+    counts = np.array([len(segment_steps) for segment_steps in steps], dtype=int)
+    packed["segment"] = np.repeat(np.arange(len(steps), dtype=np.int32), counts)
+    packed["bounds"] = np.concatenate([[0], np.cumsum(counts)])
+    packed["owner"] = np.array(owner, dtype=int)
+    packed["per_unit"] = np.array(per_unit, dtype=float)
+    packed["sub_id"] = sub_id
+    packed["labels"] = labels
+    packed["step_names"] = [step.get("name") for step in flat]
+    packed["volume"] = np.array([float(product["volume"]) for product in products])
+    packed["product_segment"] = np.array(product_segment, dtype=int)
+    packed["comp_ref"] = np.array(refs, dtype=int)
+
+    # Interned resources: a shared id, or a private (segment, step) key
+    keys = [
+        step["resource"] if step.get("resource") is not None else (s, i)
+        for s, segment_steps in enumerate(steps) for i, step in enumerate(segment_steps)
+    ]
+    index = {}
+    packed["resource"] = np.array([index.setdefault(key, len(index)) for key in keys], dtype=int)
+    packed["resources"] = list(index)
+    packed["stations"] = np.array([float(step.get("stations", 1) or 1) for step in flat])
+    n_resources = len(index)
+    packed["resource_foh"] = np.zeros(n_resources)
+    np.maximum.at(packed["resource_foh"], packed["resource"], packed["foh_total"])
+    packed["resource_stations"] = np.ones(n_resources)
+    np.maximum.at(packed["resource_stations"], packed["resource"], packed["stations"])
+    for key, values in (resources or {}).items():
+        if key in index:
+            if values.get("foh_total") is not None:
+                packed["resource_foh"][index[key]] = float(values["foh_total"])
+            if values.get("stations") is not None:
+                packed["resource_stations"][index[key]] = float(values["stations"])
+
+    packed["graphs"] = {}
+    for s, segment_steps in enumerate(steps):
+        if any(key in step for step in segment_steps for key in ("next", "rework")):
+            graph = routing_graph(segment_steps)
+            if not is_linear(graph):
+                packed["graphs"][s] = graph
+    return packed
+
+
+def segment_volumes(portfolio: dict, volume: np.ndarray = None) -> np.ndarray:
+    """Annual volume of every segment: product volume x units per product unit."""
+    volume = portfolio["volume"] if volume is None else np.asarray(volume, dtype=float)
+    return volume[portfolio["owner"]] * portfolio["per_unit"]
+
+
+def flow_weights(portfolio: dict) -> np.ndarray:
+    """Units entering each step per good unit out of its segment: (T,) array.
+
+    The cascade weights w_i of each segment (expected visits for the
+    non-linear ones, see network.expected_visits).
+    """
+    yld = portfolio["yield"]
+    log_gain = -np.log(np.where(yld > 0, yld, 1.0))
+    tail = np.append(np.cumsum(log_gain[::-1])[::-1], 0.0)
+    weights = np.exp(tail[:-1] - tail[portfolio["bounds"][1:]][portfolio["segment"]])
+    bounds = portfolio["bounds"]
+    for s, graph in portfolio["graphs"].items():
+        lo, hi = bounds[s], bounds[s + 1]
+        weights[lo:hi] = expected_visits(graph, yld[lo:hi])[0]
+    return weights
+
+
+def allocation_basis(portfolio: dict, driver: str = "hours", weights: np.ndarray = None) -> tuple:
+    """(resource, foh, k) of the FOH allocation: (T,) resource index, (R,)
+    annual FOH and (T,) driver per unit of segment volume.
+
+    driver is "hours" (machine hours; resources where no step runs fall back
+    to volume), "volume" or "standalone" (every step keeps its own foh_total,
+    as when each product is costed alone).
+    """
+    if driver == "standalone":
+        n_steps = len(portfolio["uph"])
+        return np.arange(n_steps), portfolio["foh_total"], np.ones(n_steps)
+    if driver not in ALLOCATION_DRIVERS:
+        raise ValueError(f"Unknown allocation driver {driver!r} (use one of {ALLOCATION_DRIVERS})")
+    resource = portfolio["resource"]
+    k = np.ones(len(resource))
+    if driver == "hours":
+        if weights is None:
+            weights = flow_weights(portfolio)
+        effective = portfolio["uph"] * portfolio["availability"] * portfolio["performance"]
+        hours = np.where(effective > 0, weights / np.where(effective > 0, effective, 1.0), 0.0)
+        running = np.bincount(resource, weights=hours > 0, minlength=len(portfolio["resources"]))
+        k = np.where(running[resource] > 0, hours, 1.0)
+    return resource, portfolio["resource_foh"], k
+
+
+def _foh_per_unit(foh: np.ndarray, k: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """F_r * k_i / D_r (0 where the resource carries no volume)."""
+    return np.where(total > 0, foh * k / np.where(total > 0, total, 1.0), 0.0)
+
+
+class PortfolioCosting:
+    """Live costing of a packed portfolio under a FOH allocation driver.
+
+    set_volume() re-costs only the steps on the resources a product uses and
+    the products running on them; refresh() re-evaluates from scratch.
+    """
+
+    def __init__(self, portfolio: dict, driver: str = "hours"):
+        self.portfolio = portfolio
+        self.driver = driver
+        self.weights = flow_weights(portfolio)
+        self.resource, self.resource_foh, self.k = allocation_basis(portfolio, driver, self.weights)
+        n_resources = len(self.resource_foh)
+
+        # Steps of each product (with its sub-assemblies) and of each resource
+        step_owner = portfolio["owner"][portfolio["segment"]]
+        self.by_owner = np.argsort(step_owner, kind="stable")
+        self.owner_start = np.searchsorted(step_owner[self.by_owner],
+                                           np.arange(len(portfolio["volume"]) + 1))
+        self.by_resource = np.argsort(self.resource, kind="stable")
+        self.resource_start = np.searchsorted(self.resource[self.by_resource],
+                                              np.arange(n_resources + 1))
+
+        # Sub-assembly lines: their price is the COGS/unit of the segment they use
+        self.factors = material_factors(portfolio)
+        self.ref_lines = np.flatnonzero(portfolio["comp_ref"] >= 0)
+        # Tiered lines (positions in comp_tiers) of each product
+        if "comp_tiers" in portfolio:
+            tier_owner = step_owner[portfolio["comp_step"][portfolio["comp_tiers"]["line"]]]
+            self.tier_by_owner = np.argsort(tier_owner, kind="stable")
+            self.tier_start = np.searchsorted(tier_owner[self.tier_by_owner],
+                                              np.arange(len(portfolio["volume"]) + 1))
+        costs = process_costs(portfolio, 1.0)
+        self.labor = costs["dl"] + costs["voh"]
+        self.refresh(portfolio["volume"])
+
+    def refresh(self, volume: np.ndarray = None) -> None:
+        """Full evaluation (optionally at new product volumes)."""
+        portfolio = self.portfolio
+        if volume is not None:
+            self.volume = np.array(volume, dtype=float)
+        segment = portfolio["segment"]
+        seg_volume = segment_volumes(portfolio, self.volume)
+        self.total = np.bincount(self.resource, weights=seg_volume[segment] * self.k,
+                                 minlength=len(self.resource_foh))
+        self.foh = _foh_per_unit(self.resource_foh[self.resource], self.k, self.total[self.resource])
+
+        self.prices = portfolio["comp_price"].copy()
+        if "comp_tiers" in portfolio:
+            lines = np.arange(len(portfolio["comp_tiers"]["line"]))
+            self.prices[portfolio["comp_tiers"]["line"]] = self._tier_prices(lines)
+        purchased = self.factors * np.where(portfolio["comp_ref"] >= 0, 0.0, self.prices)
+        material = np.bincount(portfolio["comp_step"], weights=purchased, minlength=len(segment))
+        base = np.bincount(segment, weights=self.weights * (material + self.labor + self.foh),
+                           minlength=len(portfolio["per_unit"]))
+        self.segment_cogs = base
+        for _ in range(len(base)):  # one pass per nesting level
+            cogs = base + self._ref_cost(self.segment_cogs)
+            if np.array_equal(cogs, self.segment_cogs):
+                break
+            self.segment_cogs = cogs
+
+    def _tier_prices(self, lines: np.ndarray) -> np.ndarray:
+        """Prices of tiered lines (positions in comp_tiers) at the current volumes."""
+        portfolio = self.portfolio
+        tiers = portfolio["comp_tiers"]
+        comp = tiers["line"][lines]
+        step = portfolio["comp_step"][comp]
+        seg_volume = segment_volumes(portfolio, self.volume)
+        quantity = seg_volume[portfolio["segment"][step]] * self.weights[step] * self.factors[comp]
+        return tier_prices({"breaks": tiers["breaks"][lines], "prices": tiers["prices"][lines]},
+                           quantity)
+
+    def _ref_cost(self, segment_cogs: np.ndarray) -> np.ndarray:
+        """Yielded cost of the sub-assembly lines of every segment at the given prices."""
+        lines = self.ref_lines
+        step = self.portfolio["comp_step"][lines]
+        used = self.factors[lines] * segment_cogs[self.portfolio["comp_ref"][lines]]
+        return np.bincount(self.portfolio["segment"][step], weights=self.weights[step] * used,
+                           minlength=len(segment_cogs))
+
+    def set_volume(self, product: int, volume: float) -> np.ndarray:
+        """Change one product's annual volume; returns the products whose COGS changed."""
+        portfolio = self.portfolio
+        delta = float(volume) - self.volume[product]
+        self.volume[product] = float(volume)
+        if delta == 0:
+            return np.array([], dtype=int)
+        own = self.by_owner[self.owner_start[product]:self.owner_start[product + 1]]
+        segment = portfolio["segment"]
+        touched = np.unique(self.resource[own])
+        self.total += np.bincount(
+            self.resource[own], weights=delta * portfolio["per_unit"][segment[own]] * self.k[own],
+            minlength=len(self.total),
+        )
+
+        # Steps on the touched resources get their new FOH per unit
+        starts, ends = self.resource_start[touched], self.resource_start[touched + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        idx = self.by_resource[np.arange(lengths.sum()) + offsets]
+        foh = _foh_per_unit(self.resource_foh[self.resource[idx]], self.k[idx],
+                            self.total[self.resource[idx]])
+        change = np.bincount(segment[idx], weights=self.weights[idx] * (foh - self.foh[idx]),
+                             minlength=len(self.segment_cogs))
+        self.foh[idx] = foh
+
+        # The product's tiered lines buy new quantities
+        if "comp_tiers" in portfolio:
+            lines = self.tier_by_owner[self.tier_start[product]:self.tier_start[product + 1]]
+            comp = portfolio["comp_tiers"]["line"][lines]
+            price = self._tier_prices(lines)
+            moved = (price != self.prices[comp]) & (portfolio["comp_ref"][comp] < 0)
+            step = portfolio["comp_step"][comp[moved]]
+            change += np.bincount(
+                segment[step],
+                weights=self.weights[step] * self.factors[comp[moved]]
+                * (price - self.prices[comp])[moved],
+                minlength=len(self.segment_cogs),
+            )
+            self.prices[comp] = price
+
+        # Sub-assembly cost changes flow up to the lines using them
+        changed = np.zeros(len(self.segment_cogs), dtype=bool)
+        while change.any():
+            self.segment_cogs += change
+            changed |= change != 0
+            change = self._ref_cost(change)
+        return np.unique(portfolio["owner"][changed])
+
+    def result(self) -> dict:
+        """Current costing: see evaluate_portfolio()."""
+        portfolio = self.portfolio
+        cogs = self.segment_cogs[portfolio["product_segment"]]
+        seg_volume = segment_volumes(portfolio, self.volume)
+        return {
+            "cogs_per_unit": cogs,
+            "total_cogs": cogs * self.volume,
+            "segment_cogs": self.segment_cogs.copy(),
+            "foh": self.foh.copy(),
+            "allocated_foh": self.foh * seg_volume[portfolio["segment"]],
+            "driver_total": self.total.copy(),
+        }
+
+
+def evaluate_portfolio(portfolio: dict, driver: str = "hours", volume: np.ndarray = None) -> dict:
+    """Cost every product of a portfolio with shared FOH allocated by `driver`.
+
+    Returns dict with (P,) arrays cogs_per_unit and total_cogs, (S,)
+    segment_cogs, (T,) foh (per unit of segment volume) and allocated_foh
+    (annual), and driver_total ((R,) sum of the driver per resource).
+    """
+    costing = PortfolioCosting(portfolio, driver)
+    if volume is not None:
+        costing.refresh(volume)
+    return costing.result()
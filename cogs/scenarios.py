@@ -0,0 +1,156 @@
+"""What-if scenarios expressed as sparse modifications of a base routing."""
+
+import csv
+import io
+import json
+
+import numpy as np
+
+from .engine import compute_cogs, compute_cogs_batch
+from .model import SCENARIO_PARAMS, STEP_PARAMS
+
+
+def apply_modifications(steps_data: list, volume: int, mods: list) -> tuple:
+    """Apply scenario modifications to a base routing.
+
+    Each modification is {param_key, step_idx, new_value}; "volume" ignores
+    step_idx. Only the modified steps are shallow-copied, BOMs are shared with
+    the base, so the base routing is never deep-copied nor mutated.
+    Returns (steps_data, volume).
+    """
+    steps = list(steps_data)
+    for mod in mods:
+        pkey = mod["param_key"]
+        sidx = mod["step_idx"]
+        nval = mod["new_value"]
+
+        if pkey == "volume":
+            volume = max(1, int(nval))
+        elif sidx >= 0 and sidx < len(steps):
+            if steps[sidx] is steps_data[sidx]:
+                steps[sidx] = dict(steps[sidx])
+            steps[sidx][pkey] = nval
+    return steps, volume
+
+
+def evaluate_scenario(steps_data: list, volume: int, mods: list, lang: str = "fr") -> dict:
+    """Compute COGS of the base routing with scenario modifications applied."""
+    return compute_cogs(*apply_modifications(steps_data, volume, mods), lang=lang)
+
+
+# ─── Scenario files ──────────────────────────────────────────────────────────────
+SCENARIO_FIELDS = ("scenario", "param", "step", "new_value")
+
+
+def read_scenario_rows(text: str, fmt: str = None) -> list:
+    """Parse a scenario file (CSV with a header, or NDJSON) into row dicts.
+
+    Rows carry the SCENARIO_FIELDS keys; fmt ("csv" / "ndjson") is guessed
+    from the first character when omitted.
+    """
+    text = text.lstrip("﻿")
+    if fmt is None:
+        fmt = "ndjson" if text.lstrip().startswith("{") else "csv"
+    if fmt == "ndjson":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    sample = text[:4096]
+    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t") if sample.strip() else csv.excel
+    return list(csv.DictReader(io.StringIO(text), dialect=dialect))
+
+
+def _step_lookup(steps_data: list) -> dict:
+    """Step reference (1-based number or name in any language) -> step index."""
+    lookup = {}
+    for i, step in enumerate(steps_data):
+        name = step.get("name", {})
+        names = name.values() if isinstance(name, dict) else [name]
+        for n in names:
+            lookup.setdefault(str(n).strip().casefold(), i)
+    for i in range(len(steps_data)):
+        lookup[str(i + 1)] = i
+    return lookup
+
+
+def compile_scenarios(steps_data: list, packed: dict, volume: float, rows: list) -> dict:
+    """Turn scenario rows into sparse deltas over the base parameter vector.
+
+    `step` is a 1-based step number or a step name; it is ignored for
+    "volume". Only the parameter columns touched by the file are kept, so
+    the scenarios form an (S, C) matrix over those C columns plus an (S,)
+    volume vector; the base routing is never copied. Invalid rows are
+    reported in `errors` as (row, message), data rows numbered from 1, and
+    their scenario is dropped.
+    Returns dict with names, n_mods, columns, values, volumes, errors.
+    """
+    steps = _step_lookup(steps_data)
+    n_steps = len(packed["uph"])
+    scenarios = {}
+    errors = []
+    invalid = set()
+    for line, row in enumerate(rows, start=1):
+        name = str(row.get("scenario", "")).strip()
+        try:
+            key = str(row.get("param", "")).strip()
+            if not name:
+                raise ValueError("missing scenario name")
+            if key not in SCENARIO_PARAMS:
+                raise ValueError(f"unknown param {key!r}")
+            value = float(row.get("new_value"))
+            if key == "volume":
+                col = -1
+                value = max(1, int(value))
+            else:
+                ref = str(row.get("step", "")).strip()
+                if ref.endswith(".0"):
+                    ref = ref[:-2]
+                step_idx = steps.get(ref.casefold())
+                if step_idx is None:
+                    raise ValueError(f"unknown step {ref!r}")
+                col = STEP_PARAMS.index(key) * n_steps + step_idx
+        except (TypeError, ValueError) as exc:
+            errors.append((line, f"{name or '?'}: {exc}"))
+            invalid.add(name)
+            continue
+        # Later rows override earlier ones for the same parameter
+        scenarios.setdefault(name, {})[col] = value
+
+    names = [name for name in scenarios if name not in invalid]
+    mods = [scenarios[name] for name in names]
+    columns = sorted({col for m in mods for col in m if col >= 0})
+    position = {col: pos for pos, col in enumerate(columns)}
+
+    base = np.concatenate([packed[key] for key in STEP_PARAMS])
+    values = np.tile(base[columns], (len(names), 1))
+    volumes = np.full(len(names), float(volume))
+    sc_idx, col_pos, vals = [], [], []
+    for s, m in enumerate(mods):
+        for col, value in m.items():
+            if col < 0:
+                volumes[s] = value
+            else:
+                sc_idx.append(s)
+                col_pos.append(position[col])
+                vals.append(value)
+    values[sc_idx, col_pos] = vals
+    return {
+        "names": names,
+        "n_mods": np.array([len(m) for m in mods], dtype=int),
+        "columns": columns,
+        "values": values,
+        "volumes": volumes,
+        "errors": errors,
+    }
+
+
+def iter_scenario_results(packed: dict, compiled: dict, chunk_size: int = 2000):
+    """Evaluate compiled scenarios chunk by chunk.
+
+    Yields (start, result) with result the compute_cogs_batch() arrays of
+    scenarios start .. start + chunk_size, so callers can stream them.
+    """
+    for start in range(0, len(compiled["names"]), chunk_size):
+        stop = start + chunk_size
+        yield start, compute_cogs_batch(
+            packed, compiled["values"][start:stop], compiled["volumes"][start:stop],
+            compiled["columns"],
+        )
@@ -0,0 +1,308 @@
+"""Local (adjoint, one-at-a-time) and global (Sobol) sensitivity analysis."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .bom import tier_index
+from .engine import (
+    batch_fields,
+    compute_cogs_batch,
+    evaluate_routing,
+    material_factors,
+    pack_routing,
+    param_index,
+    param_vector,
+    process_costs,
+    tier_quantities,
+    yielded_cascade,
+)
+from .model import RATIO_PARAMS, STEP_PARAMS, component_name, step_name
+
+
+def _base_priced(packed: dict, volume: float) -> np.ndarray:
+    """1 for BOM lines paying their own price at the volume, 0 past a quantity break."""
+    out = np.ones(len(packed["comp_price"]))
+    if "comp_tiers" in packed:
+        tiers = packed["comp_tiers"]
+        out[tiers["line"]] = tier_index(tiers, tier_quantities(packed, volume)) == 0
+    return out
+
+
+def cogs_adjoint(packed: dict, volume: float) -> dict:
+    """Exact gradient of COGS/unit from one forward and one reverse pass.
+
+    Reverse pass of Y_i = (Y_{i-1} + c_i) / y_i: the adjoint of Y_i is
+    lambda_i = prod_{j>i} 1/y_j and dCOGS/dc_i = lambda_i / y_i. Returns the
+    forward arrays, the adjoints, the gradient over the flat parameter vector
+    (see param_columns), the volume derivative and the elasticities
+    (dCOGS/dx * x / COGS).
+    """
+    ev = evaluate_routing(packed, volume)
+    yld = packed["yield"]
+    gain = 1.0 / np.where(yld > 0, yld, 1.0)
+    weight = np.cumprod(gain[::-1])[::-1]  # dCOGS/dc_i
+    adjoint = weight / gain  # dCOGS/dY_i
+
+    effective_uph = ev["effective_uph"]
+    running = effective_uph > 0
+    safe_uph = np.where(running, effective_uph, 1.0)
+    hourly = ev["dl"] + ev["voh"]
+
+    def inverse(key):
+        value = packed[key]
+        return np.where(running, -hourly / np.where(value > 0, value, 1.0), 0.0)
+
+    d_cost = {
+        "uph": inverse("uph"),
+        "availability": inverse("availability"),
+        "performance": inverse("performance"),
+        "nb_operators": np.where(running, packed["dl_rate"] / safe_uph, 0.0),
+        "dl_rate": np.where(running, packed["nb_operators"] / safe_uph, 0.0),
+        "voh_rate": np.where(running, 1.0 / safe_uph, 0.0),
+        "foh_total": np.full(len(yld), 1.0 / volume if volume > 0 else 0.0),
+    }
+    grads = {key: weight * d_cost[key] for key in d_cost}
+    grads["yield"] = np.where(yld > 0, -adjoint * ev["yielded_cost"] * gain, 0.0)
+    grad_price = weight[packed["comp_step"]] * material_factors(packed) * _base_priced(packed, volume)
+    grad = np.concatenate([grads[key] for key in STEP_PARAMS] + [grad_price])
+
+    cogs = ev["cogs_per_unit"]
+    grad_volume = -float(weight @ ev["foh"]) / volume if volume > 0 else 0.0
+    scale = 1.0 / cogs if cogs else 0.0
+    return {
+        "evaluation": ev,
+        "weight": weight,
+        "adjoint": adjoint,
+        "grad": grad,
+        "grad_volume": grad_volume,
+        "elasticity": grad * param_vector(packed) * scale,
+        "elasticity_volume": grad_volume * volume * scale,
+    }
+
+
+def one_at_a_time(packed: dict, volume: float, adj: dict, mult: float) -> np.ndarray:
+    """Exact COGS/unit after scaling each parameter alone by `mult`.
+
+    Downstream of step i the cascade is affine in Y_i (COGS = lambda_i Y_i +
+    const), so every one-at-a-time perturbation is closed-form from the
+    forward and adjoint arrays, except for tiered routings, where a step
+    change can reprice upstream lines: their step parameters are evaluated
+    in one compute_cogs_batch() call per key. Ratios are clamped to 1.
+    Returns a (P,) array aligned with param_columns().
+    """
+    ev = adj["evaluation"]
+    cogs = ev["cogs_per_unit"]
+    prev_yielded = np.concatenate([[0.0], ev["yielded_cost"][:-1]])
+    material = ev["material"]
+
+    out = []
+    for key in STEP_PARAMS:
+        new_val = packed[key] * mult
+        if key in RATIO_PARAMS:
+            new_val = np.minimum(new_val, 1.0)
+        if "comp_tiers" in packed:
+            n_steps = len(new_val)
+            params = np.repeat(packed[key][None, :], n_steps, axis=0)
+            params[np.arange(n_steps), np.arange(n_steps)] = new_val
+            columns = param_index(packed, key, 0) + np.arange(n_steps)
+            out.append(compute_cogs_batch(packed, params, volume, columns)["cogs_per_unit"])
+            continue
+        fields = dict(packed, **{key: new_val})
+        costs = process_costs(fields, volume)
+        cost_added = material + costs["dl"] + costs["voh"] + costs["foh"]
+        new_yld = fields["yield"]
+        yielded = (prev_yielded + cost_added) / np.where(new_yld > 0, new_yld, 1.0)
+        out.append(cogs + adj["adjoint"] * (yielded - ev["yielded_cost"]))
+
+    d_price = packed["comp_price"] * (mult - 1) * material_factors(packed) * _base_priced(packed, volume)
+    out.append(cogs + adj["weight"][packed["comp_step"]] * d_price)
+    return np.concatenate(out)
+
+
+def run_sensitivity(steps_data: list, volume: int, delta: float = 0.10, lang: str = "fr") -> list:
+    """Run sensitivity analysis on all parameters.
+
+    Exact ±delta impacts and elasticities come from one adjoint pass
+    (cogs_adjoint) instead of one full recompute per perturbation.
+    Returns list of {key, step_idx, comp_idx, step, component, impact_high,
+    impact_low, impact, elasticity}; step_idx and comp_idx are -1 when not
+    applicable.
+    """
+    packed = pack_routing(steps_data)
+    adj = cogs_adjoint(packed, volume)
+    base_cogs = adj["evaluation"]["cogs_per_unit"]
+    base = param_vector(packed)
+    cogs_high = one_at_a_time(packed, volume, adj, 1 + delta)
+    cogs_low = one_at_a_time(packed, volume, adj, 1 - delta)
+    step_names = [step_name(step, lang) for step in steps_data]
+
+    def entry(key, step_idx, comp_idx, component, high, low, elasticity):
+        return {
+            "key": key,
+            "step_idx": step_idx,
+            "comp_idx": comp_idx,
+            "step": step_names[step_idx] if step_idx >= 0 else "-",
+            "component": component,
+            "impact_high": round(float(high - base_cogs), 4),
+            "impact_low": round(float(low - base_cogs), 4),
+            "impact": round(float(abs(high - low)), 4),
+            "elasticity": round(float(elasticity), 4),
+        }
+
+    # Volume
+    high = evaluate_routing(packed, max(1, int(volume * (1 + delta))))["cogs_per_unit"]
+    low = evaluate_routing(packed, max(1, int(volume * (1 - delta))))["cogs_per_unit"]
+    impacts = [entry("volume", -1, -1, "", high, low, adj["elasticity_volume"])]
+
+    # Per-step parameters
+    for step_idx in range(len(steps_data)):
+        for key in STEP_PARAMS:
+            col = param_index(packed, key, step_idx)
+            if base[col] == 0:
+                continue
+            impacts.append(entry(
+                key, step_idx, -1, "",
+                cogs_high[col], cogs_low[col], adj["elasticity"][col],
+            ))
+
+    # BOM components
+    comp_idx = 0
+    for step_idx, step in enumerate(steps_data):
+        for comp in step.get("bom", []):
+            col = param_index(packed, "price", comp_idx)
+            comp_idx += 1
+            if base[col] == 0:
+                continue
+            impacts.append(entry(
+                "price", step_idx, comp_idx - 1, component_name(comp, lang),
+                cogs_high[col], cogs_low[col], adj["elasticity"][col],
+            ))
+
+    impacts.sort(key=lambda x: x["impact"], reverse=True)
+    return impacts
+
+
+# ─── Global sensitivity (Sobol) ─────────────────────────────────────────────
+def _saltelli_block(packed: dict, volume: float, factors: np.ndarray, low: np.ndarray,
+                    high: np.ndarray, n_rows: int, rng) -> dict:
+    """Evaluate one block of the Saltelli design A, B, AB_i.
+
+    Each AB_i differs from A in one factor, which touches a single step (or
+    only FOH for the volume). Downstream of that step the cascade is affine
+    in its yielded cost, so f(AB_i) follows exactly from A's forward and
+    adjoint arrays. Tiered component prices break that (a yield or volume
+    change reprices upstream lines), so such routings evaluate every AB_i in
+    full. Returns fA, fB (n_rows,) and fAB (n_rows, d).
+    """
+    n_steps = len(packed["uph"])
+    n_step_cols = len(STEP_PARAMS) * n_steps
+    base = param_vector(packed)
+    columns = np.arange(len(base))
+    vol_pos = np.flatnonzero(factors < 0)
+    par_pos = np.flatnonzero(factors >= 0)
+    par_cols = factors[par_pos]
+
+    def design():
+        u = rng.random((n_rows, len(factors)))
+        values = low + u * (high - low)
+        params = np.repeat(base[None, :], n_rows, axis=0)
+        params[:, par_cols] = values[:, par_pos]
+        volumes = values[:, vol_pos[0]] if len(vol_pos) else np.full(n_rows, float(volume))
+        return params, volumes
+
+    params_a, vol_a = design()
+    params_b, vol_b = design()
+    f_b = compute_cogs_batch(packed, params_b, vol_b, columns)["cogs_per_unit"]
+    if "comp_tiers" in packed:
+        f_a = compute_cogs_batch(packed, params_a, vol_a, columns)["cogs_per_unit"]
+        f_ab = np.empty((n_rows, len(factors)))
+        for i, col in enumerate(factors):
+            params, volumes = params_a.copy(), vol_a
+            if col < 0:
+                volumes = vol_b
+            else:
+                params[:, col] = params_b[:, col]
+            f_ab[:, i] = compute_cogs_batch(packed, params, volumes, columns)["cogs_per_unit"]
+        return {"f_a": f_a, "f_b": f_b, "f_ab": f_ab}
+
+    # Forward and adjoint arrays of A
+    fields, material = batch_fields(packed, params_a, columns)
+    costs = process_costs(fields, vol_a[:, None])
+    cost_added = material + costs["dl"] + costs["voh"] + costs["foh"]
+    gain = 1.0 / np.where(fields["yield"] > 0, fields["yield"], 1.0)
+    yielded = yielded_cascade(cost_added, fields["yield"])
+    prev_yielded = np.concatenate([np.zeros((n_rows, 1)), yielded[:, :-1]], axis=1)
+    weight = np.cumprod(gain[:, ::-1], axis=1)[:, ::-1]
+    adjoint = weight / gain
+    f_a = yielded[:, -1] if n_steps else np.zeros(n_rows)
+
+    f_ab = np.empty((n_rows, len(factors)))
+    for f, key in enumerate(STEP_PARAMS):
+        sel = (par_cols >= f * n_steps) & (par_cols < (f + 1) * n_steps)
+        if not sel.any():
+            continue
+        step_idx = par_cols[sel] - f * n_steps
+        swapped = dict(fields, **{key: params_b[:, f * n_steps:(f + 1) * n_steps]})
+        new_costs = process_costs(swapped, vol_a[:, None])
+        new_added = material + new_costs["dl"] + new_costs["voh"] + new_costs["foh"]
+        new_gain = 1.0 / np.where(swapped["yield"] > 0, swapped["yield"], 1.0)
+        new_yielded = (prev_yielded + new_added) * new_gain
+        delta = adjoint * (new_yielded - yielded)
+        f_ab[:, par_pos[sel]] = f_a[:, None] + delta[:, step_idx]
+
+    sel = par_cols >= n_step_cols
+    if sel.any():
+        comp = par_cols[sel] - n_step_cols
+        d_price = (params_b[:, par_cols[sel]] - params_a[:, par_cols[sel]]) \
+            * material_factors(packed)[comp]
+        f_ab[:, par_pos[sel]] = f_a[:, None] + weight[:, packed["comp_step"][comp]] * d_price
+
+    if len(vol_pos):
+        new_foh = process_costs(fields, vol_b[:, None])["foh"]
+        f_ab[:, vol_pos[0]] = f_a + (weight * (new_foh - costs["foh"])).sum(axis=1)
+
+    return {"f_a": f_a, "f_b": f_b, "f_ab": f_ab}
+
+
+def run_sobol(packed: dict, volume: float, n_samples: int = 1024, delta: float = 0.10,
+              seed: int = None, block_size: int = 512, n_jobs: int = None) -> dict:
+    """First-order and total-order Sobol indices over the ±delta box.
+
+    Factors are the volume and every non-zero parameter of the flat vector,
+    each uniform on [x (1 - delta), x (1 + delta)] (ratios capped at 1).
+    Uses the Saltelli design with the Saltelli (2010) first-order and Jansen
+    total-order estimators. The n_samples rows are split into blocks with
+    their own seeded generator and evaluated on a thread pool, so results do
+    not depend on n_jobs and runtime is linear in n_samples.
+    Returns dict with factors (column, -1 for volume), first_order,
+    total_order, variance.
+    """
+    base = param_vector(packed)
+    factors = np.concatenate([[-1], np.flatnonzero(base != 0)])
+    values = np.concatenate([[float(volume)], base[factors[1:]]])
+    low = values * (1 - delta)
+    high = values * (1 + delta)
+    ratio_cols = [param_index(packed, key, i) for key in RATIO_PARAMS
+                  for i in range(len(packed["uph"]))]
+    high = np.where(np.isin(factors, ratio_cols), np.minimum(high, 1.0), high)
+
+    sizes = [min(block_size, n_samples - start) for start in range(0, n_samples, block_size)]
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(sizes))]
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        blocks = list(pool.map(
+            lambda args: _saltelli_block(packed, volume, factors, low, high, *args),
+            zip(sizes, rngs),
+        ))
+
+    f_a = np.concatenate([b["f_a"] for b in blocks])
+    f_b = np.concatenate([b["f_b"] for b in blocks])
+    f_ab = np.concatenate([b["f_ab"] for b in blocks])
+    variance = float(np.var(np.concatenate([f_a, f_b])))
+    if variance <= 0:
+        zeros = np.zeros(len(factors))
+        return {"factors": factors, "first_order": zeros, "total_order": zeros, "variance": 0.0}
+    first = np.mean(f_b[:, None] * (f_ab - f_a[:, None]), axis=0) / variance
+    total = 0.5 * np.mean((f_a[:, None] - f_ab) ** 2, axis=0) / variance
+    return {"factors": factors, "first_order": first, "total_order": total, "variance": variance}
@@ -0,0 +1,183 @@
+"""Supplier selection: one quote per BOM line at the planned volume.
+
+A BOM line may hold `quotes`, each {supplier, price, moq, tiers, fixed}:
+unit price `price` below the first quantity break of `tiers` ([[min_qty,
+price], ...]), minimum order quantity `moq` and a fixed charge per year for
+that part (tooling, ...). The product's `suppliers` table gives each supplier's
+fixed charge per year (qualification, logistics), paid once whichever parts
+it supplies.
+
+A line buys Q = V * w_i * qty / (1 - scrap) units per year (w_i the cascade
+weight of its step, the scrap inflation of compute_cogs), so a quote costs
+
+    max(Q, moq) * price(max(Q, moq)) + fixed
+
+Once the set S of suppliers engaged is fixed, every line takes its cheapest
+quote among S, so the search is over S: minimize sum_{s in S} F_s +
+sum_lines min_{s in S} cost(line, s), optionally with |S| <= K. This is a
+facility-location problem, solved exactly by branch and bound over the
+suppliers (include / exclude), with the lower bound
+
+    sum_{s included} F_s + sum_lines min over included or undecided suppliers
+
+computed from the running row minima of the included suppliers and suffix
+minima of the undecided ones: O(lines) per node. A greedy drop heuristic
+gives the first upper bound.
+"""
+
+import numpy as np
+
+from .bom import pack_tiers, tier_prices
+from .engine import entering_weights, material_factors
+
+
+def annual_quantities(packed: dict, volume: float, weights: np.ndarray = None) -> np.ndarray:
+    """Units bought per year of every BOM line: V * w_i * qty / (1 - scrap)."""
+    if weights is None:
+        weights = entering_weights(packed["yield"])
+    return volume * weights[packed["comp_step"]] * material_factors(packed)
+
+
+def pack_quotes(steps_data: list, suppliers: dict = None) -> dict:
+    """Flat quote table of a routing's BOM.
+
+    Returns dict with (Q,) arrays line (flat BOM line index), supplier
+    (index into `suppliers`), moq and fixed; tiers (see bom.pack_tiers);
+    suppliers (ids) and supplier_fixed ((n,) fixed charge per supplier).
+    """
+    comps = [comp for step in steps_data for comp in step.get("bom", [])]
+    rows = [(j, quote) for j, comp in enumerate(comps) for quote in comp.get("quotes") or []]
+    ids = {}
+    for _, quote in rows:
+        ids.setdefault(quote.get("supplier"), len(ids))
+    for supplier in suppliers or {}:
+        ids.setdefault(supplier, len(ids))
+    return {
+        "line": np.array([j for j, _ in rows], dtype=int),
+        "supplier": np.array([ids[quote.get("supplier")] for _, quote in rows], dtype=int),
+        "moq": np.array([float(quote.get("moq", 0) or 0) for _, quote in rows]),
+        "fixed": np.array([float(quote.get("fixed", 0) or 0) for _, quote in rows]),
+        "tiers": pack_tiers([quote.get("tiers") or [] for _, quote in rows],
+                            [float(quote.get("price", 0) or 0) for _, quote in rows]),
+        "suppliers": list(ids),
+        "supplier_fixed": np.array([
+            float(((suppliers or {}).get(supplier) or {}).get("fixed", 0) or 0) for supplier in ids
+        ]),
+    }
+
+
+def quote_costs(quotes: dict, quantity: np.ndarray) -> np.ndarray:
+    """Annual cost of every quote for the annual quantity of its line."""
+    bought = np.maximum(quantity[quotes["line"]], quotes["moq"])
+    return bought * tier_prices(quotes["tiers"], bought) + quotes["fixed"]
+
+
+def _cost_matrix(quotes: dict, cost: np.ndarray, lines: np.ndarray) -> tuple:
+    """(lines x suppliers) best quote cost (inf: no quote) and its quote index."""
+    row = np.searchsorted(lines, quotes["line"])
+    matrix = np.full((len(lines), len(quotes["suppliers"])), np.inf)
+    np.minimum.at(matrix, (row, quotes["supplier"]), cost)
+    best = np.full(matrix.shape, -1)
+    match = cost == matrix[row, quotes["supplier"]]
+    best[row[match], quotes["supplier"][match]] = np.flatnonzero(match)
+    return matrix, best
+
+
+def _greedy(matrix: np.ndarray, fixed: np.ndarray, limit: int) -> tuple:
+    """Drop heuristic: start from every supplier, drop while it pays or exceeds the limit."""
+    engaged = np.isfinite(matrix).any(axis=0)
+
+    def total(mask):
+        row_min = matrix[:, mask].min(axis=1) if mask.any() else np.full(len(matrix), np.inf)
+        return fixed[mask].sum() + row_min.sum()
+
+    best = total(engaged)
+    while engaged.any():
+        trials = []
+        for s in np.flatnonzero(engaged):
+            mask = engaged.copy()
+            mask[s] = False
+            trials.append((total(mask), s))
+        cost, s = min(trials)
+        if cost < best or (engaged.sum() > limit and np.isfinite(cost)):
+            engaged[s] = False
+            best = cost
+        else:
+            break
+    if engaged.sum() > limit:
+        return np.inf, engaged
+    return best, engaged
+
+
+def select_suppliers(quotes: dict, quantity: np.ndarray, max_suppliers: int = None) -> dict:
+    """Cheapest choice of one quote per quoted line, with at most max_suppliers.
+
+    Returns dict with lines (flat BOM indexes of the quoted lines), quote
+    ((L,) chosen quote per line), cost ((L,) annual cost of the chosen quotes),
+    unit_price ((L,) cost plus the supplier fixed charges split by spend, per
+    unit bought), suppliers (indexes engaged), material, fixed_charges,
+    total (annual) and nodes (branch-and-bound nodes explored); None when
+    no choice covers every line within the supplier limit.
+    """
+    cost = quote_costs(quotes, quantity)
+    lines = np.unique(quotes["line"])
+    matrix, best_quote = _cost_matrix(quotes, cost, lines)
+    fixed = quotes["supplier_fixed"]
+    n_suppliers = matrix.shape[1]
+    limit = n_suppliers if not max_suppliers else min(int(max_suppliers), n_suppliers)
+
+    # Suppliers ordered by the number of lines they are cheapest for
+    if len(lines):
+        wins = np.bincount(np.argmin(matrix, axis=1), minlength=n_suppliers)
+    else:
+        wins = np.zeros(n_suppliers, dtype=int)
+    order = np.argsort(-wins, kind="stable")
+    suffix = np.full((n_suppliers + 1, len(lines)), np.inf)
+    for d in range(n_suppliers - 1, -1, -1):
+        suffix[d] = np.minimum(suffix[d + 1], matrix[:, order[d]])
+
+    upper, incumbent = _greedy(matrix, fixed, limit)
+    nodes = 0
+    # Depth-first: (depth, included mask, running row minima of the included, their fixed)
+    stack = [(0, np.zeros(n_suppliers, dtype=bool), np.full(len(lines), np.inf), 0.0)]
+    while stack:
+        depth, included, row_min, paid = stack.pop()
+        nodes += 1
+        full = included.sum() >= limit or depth == n_suppliers
+        reach = row_min if full else np.minimum(row_min, suffix[depth])
+        bound = paid + reach.sum()
+        if not bound < upper:  # also prunes infeasible (inf) nodes
+            continue
+        if full:
+            upper, incumbent = bound, included
+            continue
+        s = order[depth]
+        stack.append((depth + 1, included, row_min, paid))
+        with_s = included.copy()
+        with_s[s] = True
+        stack.append((depth + 1, with_s, np.minimum(row_min, matrix[:, s]), paid + fixed[s]))
+
+    if not np.isfinite(upper):
+        return None
+    engaged = np.flatnonzero(incumbent)
+    pick = engaged[np.argmin(matrix[:, engaged], axis=1)] if len(lines) else engaged[:0]
+    chosen = best_quote[np.arange(len(lines)), pick]
+    chosen_cost = cost[chosen]
+    used = np.unique(quotes["supplier"][chosen])
+    spend = np.bincount(quotes["supplier"][chosen], weights=chosen_cost, minlength=n_suppliers)
+    share = np.where(spend[quotes["supplier"][chosen]] > 0,
+                     chosen_cost / np.where(spend > 0, spend, 1.0)[quotes["supplier"][chosen]], 0.0)
+    loaded = chosen_cost + share * fixed[quotes["supplier"][chosen]]
+    bought = quantity[lines]
+    return {
+        "lines": lines,
+        "quote": chosen,
+        "cost": chosen_cost,
+        "unit_price": np.where(bought > 0, loaded / np.where(bought > 0, bought, 1.0),
+                               quotes["tiers"]["prices"][chosen, 0]),
+        "suppliers": used,
+        "material": float(chosen_cost.sum()),
+        "fixed_charges": float(fixed[used].sum()),
+        "total": float(chosen_cost.sum() + fixed[used].sum()),
+        "nodes": nodes,
+    }
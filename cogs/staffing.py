@@ -0,0 +1,137 @@
+"""Operator allocation: integer nb_operators per step under a total headcount.
+
+A step's staffing curve lists (nb_operators, uph) points; UPH is linearly
+interpolated between them and the step may be staffed anywhere in the
+curve's range. Steps without a curve keep their nb_operators and UPH.
+
+Staffing changes DL/VOH per unit only, and the cascade weights w_i (the
+product of downstream 1/yield) do not depend on them, so COGS/unit is
+separable: COGS = const + sum_i w_i (DL_i(n_i) + VOH_i(n_i)). The optimal
+allocation is a dynamic program over (step, operators used), vectorized over
+headcount and options: O(N * H * K) with K options per step. Line throughput
+(good units per hour of the bottleneck) is maximized with the same DP in
+max-min form, then COGS is minimized among the allocations reaching it.
+"""
+
+import numpy as np
+
+from .engine import evaluate_routing
+
+
+def staffing_options(steps_data: list, packed: dict) -> list:
+    """(nb_operators, uph) option arrays of every step."""
+    options = []
+    for i, step in enumerate(steps_data):
+        curve = step.get("staffing")
+        if curve:
+            points = np.array(sorted(curve), dtype=float)
+            n = np.arange(int(np.ceil(points[0, 0])), int(np.floor(points[-1, 0])) + 1)
+            options.append((n, np.interp(n, points[:, 0], points[:, 1])))
+        else:
+            options.append((np.array([int(round(packed["nb_operators"][i]))]),
+                            np.array([packed["uph"][i]])))
+    return options
+
+
+def _tail_yield(packed: dict) -> np.ndarray:
+    """Fraction of the units entering each step that come out good at the end."""
+    yld = np.where(packed["yield"] > 0, packed["yield"], 1.0)
+    return np.cumprod(yld[::-1])[::-1]
+
+
+def line_throughput(packed: dict) -> float:
+    """Good units per hour of the line: min over steps of effective UPH x tail yield."""
+    effective = packed["uph"] * packed["availability"] * packed["performance"]
+    if not len(effective):
+        return 0.0
+    return float(np.min(effective * _tail_yield(packed)))
+
+
+def _option_tables(packed: dict, options: list) -> tuple:
+    """Per-step weighted labor cost and throughput of every staffing option."""
+    yld = packed["yield"]
+    gain = 1.0 / np.where(yld > 0, yld, 1.0)
+    weight = np.cumprod(gain[::-1])[::-1]  # dCOGS/dc_i
+    tail = _tail_yield(packed)
+    costs, rates = [], []
+    for i, (n, uph) in enumerate(options):
+        effective = uph * packed["availability"][i] * packed["performance"][i]
+        safe = np.where(effective > 0, effective, 1.0)
+        labor = np.where(
+            effective > 0, (n * packed["dl_rate"][i] + packed["voh_rate"][i]) / safe, np.inf,
+        )
+        costs.append(weight[i] * labor)
+        rates.append(effective * tail[i])
+    return costs, rates
+
+
+def _dp(options: list, values: list, headcount: int, maximize_min: bool = False) -> tuple:
+    """Best total per operators used, with back-pointers.
+
+    Sum of values (min) or min of values (max) over steps, each step taking
+    one option. Returns (best, choices) with best of shape (headcount + 1,)
+    and choices one (headcount + 1,) option index array per step.
+    """
+    used = np.arange(headcount + 1)
+    worst = -np.inf if maximize_min else np.inf
+    best = np.full(headcount + 1, worst)
+    best[0] = np.inf if maximize_min else 0.0
+    choices = []
+    for (n, _), value in zip(options, values):
+        prev = used[:, None] - n[None, :]
+        valid = prev >= 0
+        carried = np.where(valid, best[np.clip(prev, 0, None)], worst)
+        if maximize_min:
+            total = np.minimum(carried, value[None, :])
+            pick = np.argmax(total, axis=1)
+        else:
+            total = carried + value[None, :]
+            pick = np.argmin(total, axis=1)
+        best = total[used, pick]
+        choices.append(pick)
+    return best, choices
+
+
+def _backtrack(options: list, choices: list, used: int) -> np.ndarray:
+    picks = np.empty(len(options), dtype=int)
+    for i in range(len(options) - 1, -1, -1):
+        picks[i] = choices[i][used]
+        used -= int(options[i][0][picks[i]])
+    return picks
+
+
+def allocate_operators(packed: dict, volume: float, options: list, headcount: int,
+                       objective: str = "cogs") -> dict:
+    """Integer operator allocation using at most `headcount` operators.
+
+    objective is "cogs" (min COGS/unit) or "throughput" (max line
+    throughput, ties broken by min COGS/unit). Returns dict with
+    nb_operators and uph (N,) arrays, cogs_per_unit, throughput and
+    operators (used), or None when no allocation fits the headcount.
+    """
+    headcount = int(headcount)
+    costs, rates = _option_tables(packed, options)
+    if objective == "throughput":
+        best_rate, _ = _dp(options, rates, headcount, maximize_min=True)
+        target = best_rate.max()
+        if not np.isfinite(target) or target <= 0:
+            return None
+        # Options below the best bottleneck rate are ruled out
+        costs = [np.where(r >= target * (1 - 1e-12), c, np.inf) for c, r in zip(costs, rates)]
+
+    best, choices = _dp(options, costs, headcount)
+    if not np.isfinite(best).any():
+        return None
+    used = int(np.argmin(best))
+    picks = _backtrack(options, choices, used)
+
+    allocated = dict(packed)
+    allocated["nb_operators"] = np.array([n[k] for (n, _), k in zip(options, picks)], dtype=float)
+    allocated["uph"] = np.array([u[k] for (_, u), k in zip(options, picks)], dtype=float)
+    return {
+        "nb_operators": allocated["nb_operators"].astype(int),
+        "uph": allocated["uph"],
+        "cogs_per_unit": evaluate_routing(allocated, volume)["cogs_per_unit"],
+        "throughput": line_throughput(allocated),
+        "operators": used,
+    }
@@ -0,0 +1,135 @@
+"""Time-phased COGS: monthly or quarterly periods with learning curves.
+
+Each step may carry `learning` ({"uph": rate, "yield": rate, "uph_max": cap})
+and `foh_schedule` (annual FOH for year 1, 2, ...; the last value holds
+afterwards). With Wright's law, each doubling of cumulative volume x
+multiplies the time per unit, and the defect rate 1 - yield, by the learning
+rate L: f(x) = (x / R)^b with b = log2(L), R being the cumulative volume at
+which the step's current values hold.
+
+A period producing V units from cumulative volume a gets the exact average
+of f over [a, a + V]:
+
+    ((a + V)^(b+1) - a^(b+1)) / ((b + 1) V R^b)
+
+so time per unit (1 / UPH) and defect rate are the period averages. FOH per
+unit is the year's FOH over the annualized period volume. All periods are
+then a single compute_cogs_batch() call, one row per period.
+"""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, param_index
+
+PERIODS_PER_YEAR = {"month": 12, "quarter": 4}
+
+
+def period_grid(annual_volumes: list, periods_per_year: int) -> dict:
+    """Split each year's volume evenly over its periods.
+
+    Returns dict with (P,) arrays volumes, year (0-based) and labels.
+    """
+    annual = np.asarray(annual_volumes, dtype=float)
+    volumes = np.repeat(annual / periods_per_year, periods_per_year)
+    year = np.repeat(np.arange(len(annual)), periods_per_year)
+    prefix, width = ("M", 2) if periods_per_year == 12 else ("Q", 1)
+    labels = [f"Y{y + 1}-{prefix}{k + 1:0{width}d}"
+              for y in range(len(annual)) for k in range(periods_per_year)]
+    return {"volumes": volumes, "year": year, "labels": labels}
+
+
+def learning_exponents(steps_data: list, key: str) -> np.ndarray:
+    """Wright exponent b = log2(rate) of every step for "uph" or "yield" (0: no learning)."""
+    rates = np.array([float((step.get("learning") or {}).get(key, 1.0) or 1.0)
+                      for step in steps_data])
+    if ((rates <= 0.5) | (rates > 1)).any():
+        raise ValueError(f"Learning rates ({key}) must be within (0.5, 1]")
+    return np.log2(rates)
+
+
+def wright_average(start: np.ndarray, volumes: np.ndarray, exponent: np.ndarray,
+                   reference: float) -> np.ndarray:
+    """Average of (x / reference)^b over each period: (P, N) array.
+
+    start and volumes are (P,) cumulative volume before each period and the
+    period volumes; exponent is (N,). Periods without volume take the value
+    at their start.
+    """
+    a = start[:, None]
+    v = volumes[:, None]
+    b = exponent[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = ((a + v) ** (b + 1) - a ** (b + 1)) / ((b + 1) * np.where(v > 0, v, 1.0))
+        point = np.where(a > 0, a, 1.0) ** b
+    return np.where(v > 0, average, point) / reference ** b
+
+
+def foh_schedule(steps_data: list, packed: dict, n_years: int) -> np.ndarray:
+    """Annual FOH of every step for every year: (Y, N) array."""
+    out = np.repeat(packed["foh_total"][None, :], n_years, axis=0)
+    for i, step in enumerate(steps_data):
+        schedule = step.get("foh_schedule") or []
+        for y in range(min(len(schedule), n_years)):
+            out[y, i] = schedule[y]
+        if schedule and len(schedule) < n_years:
+            out[len(schedule):, i] = schedule[-1]
+    return out
+
+
+def time_phased_cogs(steps_data: list, packed: dict, annual_volumes: list,
+                     periods_per_year: int = 12, reference: float = None) -> dict:
+    """COGS/unit of every period of a multi-year program.
+
+    reference is the cumulative volume at which the step values hold
+    (default: the first year's volume). Returns dict with labels, (P,)
+    arrays volumes, cogs_per_unit, cost, cumulative_cost, cumulative_volume,
+    average_to_date and rty; (P, N) arrays uph and yield; and scalars
+    total_cost, total_volume and life_average.
+    """
+    grid = period_grid(annual_volumes, periods_per_year)
+    volumes = grid["volumes"]
+    if reference is None:
+        reference = float(annual_volumes[0]) if len(annual_volumes) else 1.0
+    reference = max(float(reference), 1.0)
+    start = np.concatenate([[0.0], np.cumsum(volumes)[:-1]])
+
+    time_factor = wright_average(start, volumes, learning_exponents(steps_data, "uph"), reference)
+    uph = packed["uph"][None, :] / time_factor
+    caps = np.array([float((step.get("learning") or {}).get("uph_max") or np.inf)
+                     for step in steps_data])
+    uph = np.minimum(uph, caps[None, :])
+    defect_factor = wright_average(start, volumes, learning_exponents(steps_data, "yield"), reference)
+    yld = np.clip(1 - (1 - packed["yield"][None, :]) * defect_factor, 1e-3, 1.0)
+    yld = np.where(packed["yield"][None, :] > 0, yld, packed["yield"][None, :])
+    foh = foh_schedule(steps_data, packed, len(annual_volumes))[grid["year"]]
+
+    n_steps = len(packed["uph"])
+    columns = np.concatenate([
+        param_index(packed, key, 0) + np.arange(n_steps) for key in ("uph", "yield", "foh_total")
+    ])
+    res = compute_cogs_batch(
+        packed, np.hstack([uph, yld, foh]), volumes * periods_per_year, columns,
+    )
+    cogs = res["cogs_per_unit"]
+    cost = cogs * volumes
+    cumulative_cost = np.cumsum(cost)
+    cumulative_volume = np.cumsum(volumes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = np.where(cumulative_volume > 0, cumulative_cost / cumulative_volume, cogs)
+    total_volume = float(cumulative_volume[-1]) if len(volumes) else 0.0
+    total_cost = float(cumulative_cost[-1]) if len(volumes) else 0.0
+    return {
+        "labels": grid["labels"],
+        "volumes": volumes,
+        "cogs_per_unit": cogs,
+        "cost": cost,
+        "cumulative_cost": cumulative_cost,
+        "cumulative_volume": cumulative_volume,
+        "average_to_date": average,
+        "rty": res["rty"],
+        "uph": uph,
+        "yield": yld,
+        "total_cost": total_cost,
+        "total_volume": total_volume,
+        "life_average": total_cost / total_volume if total_volume > 0 else 0.0,
+    }
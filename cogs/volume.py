@@ -0,0 +1,114 @@
+"""Volume sweep and break-even analysis.
+
+Only FOH depends on the annual volume (foh_total / V), and the cascade is
+linear in the cost added per step, so for V > 0:
+
+    COGS/unit(V) = variable + fixed / V
+
+with `variable` the yielded COGS/unit without FOH and `fixed` the yielded
+annual FOH. Two evaluations of the routing give both terms; any volume grid is
+then evaluated in one vectorized expression.
+
+With quantity-break prices, `variable` is a step function of V: a tiered
+line crosses break b at V = b / (w_i * qty / (1 - scrap)). Sorting those
+volumes splits the axis into ranges of constant prices, whose variable costs
+come from one compute_cogs_batch() call; any volume then finds its range by
+searchsorted.
+"""
+
+import numpy as np
+
+from .engine import compute_cogs_batch, entering_weights, evaluate_routing, material_factors
+
+
+def volume_cost_terms(packed: dict) -> dict:
+    """Split COGS/unit into its volume-independent and FOH (÷ volume) terms.
+
+    Returns dict with variable (per unit, at the lowest volumes), fixed (per
+    year) and rty; breaks ((B,) sorted volumes at which a tiered price
+    changes, empty without tiers) and variables ((B + 1,) variable cost from
+    0 and from each break on).
+    """
+    no_foh = {**packed, "foh_total": np.zeros_like(packed["foh_total"])}
+    variable = evaluate_routing(no_foh, 0.0)
+    full = evaluate_routing(packed, 1.0)
+    breaks = price_breaks(packed)
+    variables = np.array([variable["cogs_per_unit"]])
+    if len(breaks):
+        # One volume inside each range: geometric midpoints, 2x past the last break
+        inside = np.sqrt(breaks[:-1] * breaks[1:]) if len(breaks) > 1 else np.empty(0)
+        inside = np.concatenate([inside, [2.0 * breaks[-1]]])
+        rows = compute_cogs_batch(no_foh, np.empty((len(inside), 0)), inside)["cogs_per_unit"]
+        variables = np.concatenate([variables, rows])
+    return {
+        "variable": variable["cogs_per_unit"],
+        "fixed": full["cogs_per_unit"] - evaluate_routing(no_foh, 1.0)["cogs_per_unit"],
+        "rty": full["rty"],
+        "breaks": breaks,
+        "variables": variables,
+    }
+
+
+def price_breaks(packed: dict) -> np.ndarray:
+    """Sorted annual volumes at which some tiered component changes price."""
+    if "comp_tiers" not in packed:
+        return np.empty(0)
+    tiers = packed["comp_tiers"]
+    line = tiers["line"]
+    per_unit = entering_weights(packed["yield"])[packed["comp_step"][line]] * material_factors(packed)[line]
+    with np.errstate(divide="ignore"):
+        volumes = tiers["breaks"][:, 1:] / per_unit[:, None]
+    volumes = volumes[np.isfinite(volumes) & (volumes > 0)]
+    return np.unique(volumes)
+
+
+def variable_cost(terms: dict, volumes) -> np.ndarray:
+    """Variable COGS/unit at each volume (its price range's, see volume_cost_terms)."""
+    return terms["variables"][np.searchsorted(terms["breaks"], volumes, side="right")]
+
+
+def cogs_at_volumes(terms: dict, volumes) -> np.ndarray:
+    """COGS/unit at each volume (> 0): variable cost of its range + fixed / V."""
+    volumes = np.asarray(volumes, dtype=float)
+    return variable_cost(terms, volumes) + terms["fixed"] / volumes
+
+
+def volume_sweep(packed: dict, v_min: float, v_max: float, n_points: int = 10_000) -> dict:
+    """COGS/unit, total COGS and required starts over a log-spaced volume grid.
+
+    Returns dict of (n_points,) arrays: volumes, cogs_per_unit, total_cogs,
+    units_to_start; plus the variable / fixed / rty terms.
+    """
+    terms = volume_cost_terms(packed)
+    volumes = np.geomspace(max(v_min, 1.0), max(v_max, v_min, 1.0), n_points)
+    cogs = cogs_at_volumes(terms, volumes)
+    rty = terms["rty"]
+    return {
+        **terms,
+        "volumes": volumes,
+        "cogs_per_unit": cogs,
+        "total_cogs": cogs * volumes,
+        "units_to_start": volumes / rty if rty > 0 else volumes,
+    }
+
+
+def breakeven_volume(terms: dict, price: float, margin: float = 0.0):
+    """Smallest annual volume at which price covers COGS/unit with a margin.
+
+    Margin is a fraction of the selling price (0.25 = 25%). Each range of
+    constant prices solves fixed / (allowed - variable) in closed form; the
+    answer is the first range that holds its own solution. Returns None when
+    the price never reaches it (variable cost above the allowed cost).
+    """
+    allowed = price * (1 - margin)
+    variables = terms.get("variables", np.array([terms["variable"]]))
+    breaks = terms.get("breaks", np.empty(0))
+    lower = np.concatenate([[0.0], breaks])
+    upper = np.concatenate([breaks, [np.inf]])
+    reachable = allowed > variables
+    with np.errstate(divide="ignore"):
+        solution = np.maximum(terms["fixed"] / np.where(reachable, allowed - variables, 1.0), lower)
+    ok = reachable & (solution < upper)
+    if not ok.any():
+        return None
+    return float(solution[np.argmax(ok)])